@@ -5,9 +5,14 @@ from flask import Flask, request
 from flask_socketio import SocketIO
 from flask_cors import CORS
 from dotenv import load_dotenv
+import wire
+from bus import client_manager_from_env
+from log_config import engineio_logger, get_logger, setup_logging, socketio_logger
 
 # Load environment variables
 load_dotenv()
+setup_logging()
+log = get_logger('server')
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -27,12 +32,14 @@ socketio = SocketIO(
     app,
     cors_allowed_origins=cors_allowed,
     async_mode='eventlet',
-    logger=True,
-    engineio_logger=True
+    json=wire,
+    client_manager=client_manager_from_env(),
+    logger=socketio_logger(),
+    engineio_logger=engineio_logger()
 )
 
 # Register socket event handlers
-from socket_handlers import register_socket_handlers
+from socket_handlers import lag_monitor, metrics as handler_metrics, register_socket_handlers
 register_socket_handlers(socketio)
 
 
@@ -51,10 +58,27 @@ def health():
     return {'status': 'healthy'}, 200
 
 
+@app.route('/ready')
+def ready():
+    """Readiness for new rooms: 503 while the event loop is lagging."""
+    status, lag = lag_monitor.status()
+    body = {
+        'status': status,
+        'loop_lag_ms': {key: round(value * 1000, 2) for key, value in lag.items() if key != 'samples'},
+        'samples': lag['samples']
+    }
+    return body, 200 if status == 'ready' else 503
+
+
+@app.route('/metrics')
+def metrics():
+    """Handler and room metrics in Prometheus text format."""
+    return handler_metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
-    print(f"🚀 Server starting on port {port}")
-    print(f"📡 Socket.IO ready for connections")
+    log.info('server starting', extra={'port': port})
     
     socketio.run(
         app,
@@ -0,0 +1,84 @@
+"""
+The game server on asyncio, as an ASGI application.
+
+Runs the same handlers as app.py on a socketio.AsyncServer instead of
+Flask-SocketIO under eventlet (see socket_handlers.py and outbox.py), with
+asyncio tasks for the background work:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Serves /, /health, /ready and /metrics like app.py.
+"""
+
+import json
+import os
+
+import socketio
+from dotenv import load_dotenv
+
+import wire
+from bus import async_client_manager_from_env
+from log_config import engineio_logger, get_logger, setup_logging, socketio_logger
+
+load_dotenv()
+setup_logging()
+log = get_logger('server')
+
+cors_origins = os.getenv('CORS_ORIGINS', 'http://localhost:3000')
+cors_allowed = '*' if cors_origins == '*' else cors_origins.split(',')
+
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins=cors_allowed,
+    json=wire,
+    client_manager=async_client_manager_from_env(),
+    logger=socketio_logger(),
+    engineio_logger=engineio_logger()
+)
+
+from socket_handlers import lag_monitor, metrics as handler_metrics, register_async_handlers
+
+# Register socket event handlers; their background tasks start with the app
+start_background_tasks = register_async_handlers(sio)
+
+
+def ready():
+    """Readiness for new rooms: 503 while the event loop is lagging."""
+    status, lag = lag_monitor.status()
+    body = {
+        'status': status,
+        'loop_lag_ms': {key: round(value * 1000, 2) for key, value in lag.items() if key != 'samples'},
+        'samples': lag['samples']
+    }
+    return body, 200 if status == 'ready' else 503
+
+
+# {path: () -> (JSON body or text, status)}
+ROUTES = {
+    '/': lambda: ({'status': 'ok', 'message': 'Undercover game server is running'}, 200),
+    '/health': lambda: ({'status': 'healthy'}, 200),
+    '/ready': ready,
+    '/metrics': lambda: (handler_metrics.render(), 200)
+}
+
+
+async def http_app(scope, receive, send):
+    """The plain HTTP endpoints, for requests that are not Socket.IO."""
+    route = ROUTES.get(scope['path']) if scope['type'] == 'http' else None
+    if route is None:
+        body, status, content_type = 'Not Found', 404, 'text/plain'
+    else:
+        body, status = route()
+        if isinstance(body, str):
+            content_type = 'text/plain; version=0.0.4'
+        else:
+            body, content_type = json.dumps(body), 'application/json'
+    headers = [(b'content-type', content_type.encode())]
+    origin = dict(scope.get('headers', [])).get(b'origin', b'').decode()
+    if origin and (cors_allowed == '*' or origin in cors_allowed):
+        headers.append((b'access-control-allow-origin', origin.encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body.encode()})
+
+
+app = socketio.ASGIApp(sio, other_asgi_app=http_app, on_startup=start_background_tasks)
@@ -0,0 +1,134 @@
+"""Measure a join storm with and without broadcast coalescing (coalescer.py).
+
+Rooms fill up with players joining back to back, as when a streamer shares
+a room code, then half of them leave. Every join and leave is a
+state-change broadcast to the whole room, so the room's traffic grows with
+the square of its size. With a coalescing window, the broadcasts asked for
+within one window go out as one. Windows are closed every few joins here,
+as the coalescer's background task would.
+
+Each client rebuilds the room's state from the snapshot in its reply and
+the patches it then receives; once the storm is over, every client must
+hold exactly the server's public state, with or without coalescing.
+
+Run from the backend directory:
+    python benchmarks/bench_broadcast_storm.py [--rooms N] [--players N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loopback import LoopbackServer
+from socket_handlers import coalescer, game_manager
+from state_patch import apply_patch
+
+
+class View:
+    """A room's public state as one client has pieced it together."""
+
+    def __init__(self, client, data):
+        self.client = client
+        self.state = json.loads(data['game_state']) if isinstance(data['game_state'], str) else data['game_state']
+        self.version = data['version']
+        self.packets = 0
+        self.bytes = 0
+
+    def drain(self):
+        for event, data in self.client.events():
+            self.packets += 1
+            self.bytes += len(json.dumps([event, data], separators=(',', ':')))
+            if not isinstance(data, dict) or 'version' not in data:
+                continue
+            if 'game_state' in data:
+                state = data['game_state']
+                self.state = json.loads(state) if isinstance(state, str) else state
+            for version, ops in data.get('patch', ()):
+                if version > self.version:
+                    self.state = apply_patch(self.state, ops)
+            self.version = max(self.version, data['version'])
+
+
+def storm(loopback, players, flush_every):
+    """One room filled and half emptied; returns (packets, bytes, state problems)."""
+    host = loopback.connect()
+    host.emit('create_room', {'player_name': 'Host'})
+    reply = next(data for event, data in host.events() if event == 'room_created')
+    room_code = reply['room_code']
+    views = [View(host, reply)]
+
+    def joined(view):
+        views.append(view)
+        if len(views) % flush_every == 0:
+            loopback.flush_broadcasts(time.monotonic() + 1)
+
+    for i in range(1, players):
+        client = loopback.connect()
+        client.emit('join_room', {'room_code': room_code, 'player_name': f"Player {i}"})
+        reply = next(data for event, data in client.events() if event == 'room_joined')
+        joined(View(client, reply))
+    for i, view in enumerate(views[players // 2:], 1):
+        view.drain()
+        view.client.emit('leave_room', {'room_code': room_code})
+        view.drain()
+        if i % flush_every == 0:
+            loopback.flush_broadcasts(time.monotonic() + 1)
+    staying = views[:players // 2]
+    # Let the last windows close
+    loopback.flush_broadcasts(time.monotonic() + 1)
+    loopback.flush_broadcasts(time.monotonic() + 2)
+
+    room = game_manager.get_room(room_code)
+    expected = room.get_public_state()
+    problems = 0
+    for view in staying:
+        view.drain()
+        problems += view.state != expected
+    packets = sum(view.packets for view in views)
+    size = sum(view.bytes for view in views)
+    for view in views:
+        view.client.disconnect()
+    return packets, size, problems
+
+
+def measure(rooms, players, window, flush_every):
+    coalescer.window = window
+    loopback = LoopbackServer()
+    merged = coalescer.merged
+    packets = size = problems = 0
+    start = time.perf_counter()
+    for _ in range(rooms):
+        p, b, bad = storm(loopback, players, flush_every)
+        packets += p
+        size += b
+        problems += bad
+    return packets, size, problems, coalescer.merged - merged, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--flush-every', type=int, default=5, help='joins or leaves per coalescing window')
+    args = parser.parse_args()
+
+    window = coalescer.window or 0.03
+    results = {}
+    for label, seconds in (('each', 0), ('coalesced', window)):
+        packets, size, problems, merged, elapsed = measure(args.rooms, args.players, seconds, args.flush_every)
+        assert problems == 0, f"{problems} clients out of step with the server ({label})"
+        results[label] = packets, size
+        print(f"{label:>10}: {packets:>7} packets, {size / 1e6:6.2f} MB to clients, {merged:>5} merged, "
+              f"{elapsed:.2f}s, every client in step")
+    (packets, size), (fewer, smaller) = results['each'], results['coalesced']
+    print(f"\n{args.players} players per room, {args.flush_every} per window: "
+          f"{1 - fewer / packets:.0%} fewer packets, {1 - smaller / size:.0%} fewer bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Check the worker message bus, and measure load-test throughput across sharded workers.
+
+First, two Socket.IO servers share a bus: an emit on one must reach a
+client on the other, and an emit to a room with clients on the same
+server must be delivered there without touching the bus. This is run over
+the in-process bus and over the socket relay, and for the asyncio server
+over the relay too.
+
+Then load_test.py runs once as a single process, and once as N worker
+processes that split the games, shard room codes, and share a relay, as
+cluster.py would run them. Aggregate events/s only grows with the number
+of cores the machine has.
+
+Run from the backend directory:
+    python benchmarks/bench_cluster.py [--workers N] [--games N]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socketio
+from socketio import packet
+
+from bus import AsyncBusManager, AsyncSocketBus, BusManager, InProcessBus, Relay, SocketBus
+from game_manager import GameManager
+from sharding import Shard
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def connect(server, received):
+    """Connect a fake client straight to a server; its packets go to `received`."""
+    eio_sid = f"client-{len(server.environ)}"
+    server.eio.send_packet = lambda sid, pkt: received.append(pkt.data)
+    server.environ[eio_sid] = {}
+    server._handle_eio_connect(eio_sid, {})
+    server._handle_eio_message(eio_sid, packet.Packet(packet.CONNECT, namespace='/').encode())
+    return server.manager.sid_from_eio_sid(eio_sid, '/')
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for the bus'
+        time.sleep(0.001)
+
+
+def check_bus(make_bus):
+    """Emits cross between two servers on a bus, and stay local when they can."""
+    here, there = [socketio.Server(async_mode='threading', client_manager=BusManager(make_bus()))
+                   for _ in range(2)]
+    received_here, received_there = [], []
+    sid_here = connect(here, received_here)
+    sid_there = connect(there, received_there)
+    there.enter_room(sid_there, 'ROOM01')
+    here.enter_room(sid_here, 'ROOM02')
+    time.sleep(0.05)  # let both listeners subscribe
+    received_here.clear()
+    received_there.clear()
+
+    # A room on the other server, a client on it, and everyone
+    here.emit('to_room', {'n': 1}, to='ROOM01')
+    here.emit('to_client', {'n': 2}, to=sid_there)
+    here.emit('to_all', {'n': 3})
+    wait_for(lambda: len(received_there) == 3)
+    assert [p.split('"')[1] for p in received_there] == ['to_room', 'to_client', 'to_all']
+    assert len(received_here) == 1  # its own copy of the broadcast
+
+    # A room with clients here goes straight to them
+    published = here.manager.published
+    for i in range(1000):
+        here.emit('local', {'n': i}, to='ROOM02')
+    assert here.manager.published == published
+    assert len(received_here) == 1001
+
+
+async def connect_async(server, received):
+    """connect() for a socketio.AsyncServer."""
+    eio_sid = f"client-{len(server.environ)}"
+
+    async def send_packet(sid, pkt):
+        received.append(pkt.data)
+
+    server.eio.send_packet = send_packet
+    server.environ[eio_sid] = {}
+    await server._handle_eio_connect(eio_sid, {})
+    await server._handle_eio_message(eio_sid, packet.Packet(packet.CONNECT, namespace='/').encode())
+    return server.manager.sid_from_eio_sid(eio_sid, '/')
+
+
+async def check_async_bus(address):
+    """check_bus for two asyncio servers on the relay."""
+    here, there = [socketio.AsyncServer(async_mode='asgi', client_manager=AsyncBusManager(AsyncSocketBus(address)))
+                   for _ in range(2)]
+    received_here, received_there = [], []
+    sid_here = await connect_async(here, received_here)
+    sid_there = await connect_async(there, received_there)
+    await there.enter_room(sid_there, 'ROOM01')
+    await here.enter_room(sid_here, 'ROOM02')
+    await asyncio.sleep(0.05)  # let both listeners subscribe
+    received_here.clear()
+    received_there.clear()
+
+    async def wait_for_async(condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            assert time.monotonic() < deadline, 'timed out waiting for the bus'
+            await asyncio.sleep(0.001)
+
+    await here.emit('to_room', {'n': 1}, to='ROOM01')
+    await here.emit('to_client', {'n': 2}, to=sid_there)
+    await here.emit('to_all', {'n': 3})
+    await wait_for_async(lambda: len(received_there) == 3)
+    assert [p.split('"')[1] for p in received_there] == ['to_room', 'to_client', 'to_all']
+    assert len(received_here) == 1
+
+    published = here.manager.published
+    for i in range(1000):
+        await here.emit('local', {'n': i}, to='ROOM02')
+    assert here.manager.published == published
+    assert len(received_here) == 1001
+
+
+def run_load_test(games, env_for, workers):
+    """Run load_test.py as `workers` processes splitting `games`; (events, seconds including start-up)."""
+    start = time.perf_counter()
+    processes = [
+        subprocess.Popen(
+            [sys.executable, os.path.join(HERE, 'load_test.py'),
+             '--games', str(games // workers), '--concurrent', '100', '--seed', str(i + 1)],
+            env=env_for(i), stdout=subprocess.PIPE, text=True)
+        for i in range(workers)
+    ]
+    events = 0
+    for process in processes:
+        output, _ = process.communicate()
+        assert process.returncode == 0, output
+        events += int(re.search(r'(\d+) events in', output).group(1))
+    return events, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=max(os.cpu_count() or 1, 2))
+    parser.add_argument('--games', type=int, default=1000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    address = 'unix:' + os.path.join(directory, 'bus.sock')
+    relay = Relay(address)
+    threading.Thread(target=relay.serve_forever, daemon=True).start()
+
+    in_process = InProcessBus()
+    check_bus(lambda: in_process)
+    check_bus(lambda: SocketBus(address))
+    asyncio.run(check_async_bus(address))
+    print("bus:              emits cross workers, local rooms skip the bus")
+
+    # Room codes a worker hands out are its own, and the ring is balanced
+    shard = Shard(0, ['w0', 'w1', 'w2', 'w3'])
+    owners = [shard.owner(f"{i:06d}") for i in range(40_000)]
+    shares = [owners.count(i) / len(owners) for i in range(4)]
+    assert max(shares) < 0.28, shares
+    manager = GameManager(owns=shard.owns)
+    assert all(shard.owns(manager.new_room_code()) for _ in range(1000))
+    print(f"ring:             4 workers own {', '.join(f'{s:.0%}' for s in shares)} of rooms")
+
+    urls = ','.join(f"http://localhost:{5000 + i}" for i in range(args.workers))
+
+    def worker_env(index):
+        return dict(os.environ, WORKERS=str(args.workers), WORKER_INDEX=str(index),
+                    WORKER_URLS=urls, BUS_ADDRESS=address)
+
+    single_events, single_time = run_load_test(args.games, lambda i: dict(os.environ), 1)
+    events, elapsed = run_load_test(args.games, worker_env, args.workers)
+    print(f"1 process:        {single_events / single_time:,.0f} events/s")
+    print(f"{args.workers} workers:        {events / elapsed:,.0f} events/s in total "
+          f"({os.cpu_count()} cores)")
+
+
+if __name__ == '__main__':
+    main()
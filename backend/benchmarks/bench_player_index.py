@@ -0,0 +1,67 @@
+"""Benchmark the cost of a disconnect as the number of live rooms grows.
+
+Run from the backend directory:
+    python benchmarks/bench_player_index.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_manager import GameManager
+
+ROOM_COUNTS = [10, 100, 1_000, 10_000, 100_000]
+PLAYERS_PER_ROOM = 4
+DISCONNECTS = 20_000
+SCAN_DISCONNECTS = 1_000  # the linear scan is too slow to repeat as often
+
+
+def build_manager(room_count):
+    """Create a manager with room_count lobbies of PLAYERS_PER_ROOM players."""
+    manager = GameManager()
+    for i in range(room_count):
+        code = f"{i:06d}"
+        room = manager.create_room(code, f"{code}-0", "host")
+        for seat in range(1, PLAYERS_PER_ROOM):
+            room.add_player(f"{code}-{seat}", f"player{seat}")
+    return manager
+
+
+def scan_room_by_player(manager, player_id):
+    """The previous lookup: check every room's players dict."""
+    for room in manager.rooms.values():
+        if player_id in room.players:
+            return room
+    return None
+
+
+def time_disconnects(manager, room_count, lookup, count):
+    """Average seconds per disconnect (lookup, remove, rejoin) over the last rooms."""
+    # Target the most recently created rooms, the worst case for a linear scan
+    player_ids = [f"{room_count - 1 - (i % room_count):06d}-1" for i in range(count)]
+    start = time.perf_counter()
+    for player_id in player_ids:
+        room = lookup(player_id)
+        room.remove_player(player_id)
+        room.add_player(player_id, "player1")
+    return (time.perf_counter() - start) / len(player_ids)
+
+
+def main():
+    print(f"{'rooms':>8} {'indexed (us)':>14} {'scan (us)':>12}")
+    for room_count in ROOM_COUNTS:
+        manager = build_manager(room_count)
+        indexed = time_disconnects(
+            manager, room_count, manager.get_room_by_player, DISCONNECTS
+        )
+        scan = time_disconnects(
+            manager, room_count, lambda pid: scan_room_by_player(manager, pid),
+            SCAN_DISCONNECTS
+        )
+        print(f"{room_count:>8} {indexed * 1e6:>14.2f} {scan * 1e6:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Check the rate limits and caps (rate_limit.py) against misbehaving clients.
+
+Through the real handlers, on both servers:
+- a player flooding a room with settings changes gets no more through
+  than its bucket allows, and the rest of the room is spared the
+  broadcasts;
+- a client creating rooms in a loop, alone or from many connections on
+  one address, opens only as many as the per-connection and per-address
+  buckets allow;
+- an address opening connections in a loop is refused past its burst;
+- past MAX_CONNECTIONS and MAX_ROOMS, connections and rooms are refused
+  with a clear reason;
+- once everyone has gone, no limiter state is left behind.
+
+Then the cost of one check, which is paid by every event.
+
+Run from the backend directory:
+    python benchmarks/bench_rate_limit.py [--flood N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PROXY_HOPS', '0')  # turns the per-address limits on, see socket_handlers.py
+
+from socketio import packet
+
+from loopback import AsyncLoopbackServer, LoopbackServer
+from rate_limit import DEFAULT_IP_LIMITS, DEFAULT_LIMITS, RateLimiter, parse_limits
+from socket_handlers import game_manager, limiter
+
+
+def refused(client):
+    """The reason a client's connection was refused, or None if it was accepted."""
+    for encoded in client.received:
+        if isinstance(encoded, str) and encoded.startswith(str(packet.CONNECT_ERROR)):
+            return packet.Packet(encoded_packet=encoded).data['message']
+    return None
+
+
+def errors(client):
+    return [data['message'] for event, data in client.events() if event == 'error']
+
+
+def check(loopback, flood):
+    """Every scenario on one server; returns what was seen, for printing."""
+    seen = {}
+    limits = limiter.limits
+
+    # A room of four, one of whom changes the settings as fast as it can
+    host = loopback.connect()
+    host.emit('create_room', {'player_name': 'Host'})
+    room_code = game_manager.get_room_by_player(host.sid).room_code
+    others = [loopback.connect() for _ in range(3)]
+    for i, client in enumerate(others):
+        client.emit('join_room', {'room_code': room_code, 'player_name': f"Player {i}"})
+        client.events()
+    host.events()
+    start = time.monotonic()
+    for i in range(flood):
+        host.emit('update_settings', {'room_code': room_code, 'early_vote_close': i % 2 == 0})
+    elapsed = time.monotonic() - start
+    loopback.flush_broadcasts(time.monotonic() + 1)
+    rate, burst = limits['update_settings']
+    rejected = errors(host).count('Too many requests, slow down')
+    handled = flood - rejected
+    assert handled <= burst + rate * elapsed + 1, (handled, burst, rate, elapsed)
+    broadcasts = sum(event == 'settings_updated' for event, _ in others[0].events())
+    assert 0 < broadcasts <= handled, (broadcasts, handled)
+    seen['settings flood'] = f"{handled} of {flood} handled, {broadcasts} broadcasts to each other player"
+
+    # Rooms created in a loop from one connection, then from many on one address
+    spammer = loopback.connect()
+    for _ in range(flood):
+        spammer.emit('create_room', {'player_name': 'Spam'})
+        spammer.emit('leave_room', {'room_code': game_manager.player_rooms.get(spammer.sid, '')})
+    created = sum(event == 'room_created' for event, _ in spammer.events())
+    assert created <= limits['create_room'][1] + 1, created
+    ip_burst = limiter.ip_limits['create_room'][1]
+    clients = [loopback.connect(address='192.0.2.1') for _ in range(int(ip_burst) * 2)]
+    for client in clients:
+        client.emit('create_room', {'player_name': 'Spam'})
+    created_from_address = sum(event == 'room_created' for c in clients for event, _ in c.events())
+    assert created_from_address <= ip_burst + 1, created_from_address
+    seen['room spam'] = (f"{created} rooms from {flood} tries on one connection, "
+                         f"{created_from_address} from {len(clients)} connections on one address")
+
+    # Connections opened in a loop from one address
+    burst = limiter.ip_limits['connect'][1]
+    flooders = [loopback.connect(address='192.0.2.2') for _ in range(int(burst) * 3)]
+    reasons = [refused(client) for client in flooders]
+    accepted = reasons.count(None)
+    assert accepted <= burst + 1 and set(reasons) == {None, 'Too many connections, slow down'}, reasons
+    seen['connection flood'] = f"{accepted} of {len(flooders)} accepted from one address"
+
+    # Global caps
+    limiter.max_connections = len(limiter.sids) + 1
+    last, over = loopback.connect(), loopback.connect()
+    assert refused(last) is None and refused(over) == 'Server is full, try again later', refused(over)
+    limiter.max_connections = 0
+    limiter.max_rooms = len(game_manager.rooms)
+    last.emit('create_room', {'player_name': 'Late'})
+    assert errors(last) == ['Too many rooms open, try again later']
+    limiter.max_rooms = 0
+    seen['caps'] = 'connections and rooms refused at the cap'
+
+    # Nothing kept for connections that have gone
+    for client in [host, spammer, last, over] + others + clients + flooders:
+        client.disconnect()
+    assert not limiter.sids, len(limiter.sids)
+    limiter.tick(time.monotonic() + 3600)
+    assert not limiter.addresses and not limiter.idle, limiter.addresses
+    seen['cleanup'] = 'no state left once everyone disconnected'
+    return seen
+
+
+def time_checks(count):
+    """Seconds per allow() for a connection under its limits, and one over them."""
+    checker = RateLimiter(parse_limits(DEFAULT_LIMITS), parse_limits(DEFAULT_IP_LIMITS))
+    checker.connect('calm', {'REMOTE_ADDR': '192.0.2.3'})
+    checker.connect('flood', {'REMOTE_ADDR': '192.0.2.4'})
+    results = []
+    for sid, step in (('calm', 1.0), ('flood', 0.0)):
+        now = 0.0
+        start = time.perf_counter()
+        for _ in range(count):
+            now += step
+            checker.allow(sid, 'submit_clue', now)
+        results.append((time.perf_counter() - start) / count)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--flood', type=int, default=200, help='events per misbehaving client')
+    parser.add_argument('--checks', type=int, default=200000)
+    args = parser.parse_args()
+
+    for name, server_class in (('Flask', LoopbackServer), ('asyncio', AsyncLoopbackServer)):
+        for scenario, result in check(server_class(), args.flood).items():
+            print(f"{name:>8} {scenario:>16}: {result}")
+    calm, flood = time_checks(args.checks)
+    print(f"\nallow(): {calm * 1e9:.0f} ns under the limit, {flood * 1e9:.0f} ns over it")
+
+
+if __name__ == '__main__':
+    main()
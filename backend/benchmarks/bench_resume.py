@@ -0,0 +1,157 @@
+"""Check and size session resumes after dropped sockets, through the real handlers.
+
+Players drop their socket in the middle of games, miss a few events, and
+resume on a new socket with their session token. Each resume must restore
+the seat and private state and send only the patches missed, and the game
+must carry on. Seats that are never resumed are expired by the reaper
+mid-game, and the game must still finish.
+
+Run from the backend directory:
+    python benchmarks/bench_resume.py
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loopback import LoopbackServer
+from socket_handlers import game_manager, reaper
+
+GAMES = 300
+PLAYERS = 6
+
+
+class Seat:
+    """A player as the client sees it: token, last version, and current socket."""
+
+    def __init__(self, client, data):
+        self.client = client
+        self.player_id = data['player_id']
+        self.token = data['session_token']
+        self.version = data['version']
+        self.player_data = data['player_data']
+
+    def drain(self):
+        for event, data in self.client.events():
+            if data and 'version' in data:
+                self.version = max(self.version, data['version'])
+            if event == 'role_assigned':
+                self.player_data = data['player_data']
+
+
+def move(room, seats, rng):
+    """Make one legal move from a connected player. Returns False when the game is over."""
+    by_id = {seat.player_id: seat for seat in seats if seat.client}
+    if room.phase == 'playing':
+        seat = by_id.get(room.get_current_player())
+        if seat:
+            seat.client.emit('submit_clue', {'room_code': room.room_code, 'clue': 'warm'})
+            return True
+    elif room.phase == 'voting':
+        alive = [pid for pid, p in room.players.items() if p.is_alive]
+        for pid in alive:
+            if pid in by_id and pid not in room.votes:
+                by_id[pid].client.emit('submit_vote', {'room_code': room.room_code,
+                                                       'voted_for_id': rng.choice(alive)})
+                return True
+    elif room.phase == 'mr_white_guess':
+        seat = by_id.get(room.eliminated_player_id)
+        if seat:
+            seat.client.emit('mr_white_guess', {'room_code': room.room_code, 'guess': 'nope'})
+            return True
+    return False
+
+
+def main():
+    rng = random.Random(1)
+    random.seed(1)
+    loopback = LoopbackServer()
+    resumes = patch_bytes = snapshot_bytes = patch_entries = expired = finished = 0
+
+    for game in range(GAMES):
+        host = loopback.connect()
+        host.emit('create_room', {'player_name': 'Host'})
+        (_, created), = [e for e in host.events() if e[0] == 'room_created']
+        room_code = created['room_code']
+        seats = [Seat(host, created)]
+        for i in range(1, PLAYERS):
+            client = loopback.connect()
+            client.emit('join_room', {'room_code': room_code, 'player_name': f"P{i}"})
+            (_, joined), = [e for e in client.events() if e[0] == 'room_joined']
+            seats.append(Seat(client, joined))
+        host.emit('start_game', {'room_code': room_code})
+        for seat in seats:
+            seat.drain()
+        room = game_manager.get_room(room_code)
+
+        # In every third game a player drops for good and loses their seat;
+        # in every game another drops for a few moves and comes back
+        if game % 3 == 0:
+            gone = rng.choice(seats[1:])
+            seats.remove(gone)
+            gone.client.disconnect()
+            loopback.sweep(time.monotonic() + reaper.seat_grace + 1)
+            assert gone.player_id not in room.players
+            assert room.phase == 'results' or gone.player_id not in room.turn_order
+            expired += 1
+            for seat in seats:
+                seat.drain()
+        dropped = rng.choice(seats[1:])
+        dropped.client.disconnect()
+        dropped.client = None
+
+        for _ in range(rng.randint(1, 4)):
+            if not move(room, seats, rng):
+                break
+            for seat in seats:
+                if seat.client:
+                    seat.drain()
+
+        client = loopback.connect()
+        client.emit('resume_session', {'session_token': dropped.token, 'version': dropped.version})
+        (_, resumed), = [e for e in client.events() if e[0] == 'session_resumed']
+        assert resumed['player_id'] == dropped.player_id
+        assert resumed['player_data'] == room.get_player_private_state(dropped.player_id)
+        assert 'game_state' not in resumed, 'resume sent a full state'
+        assert [v for v, _ in resumed['patch']] == list(range(dropped.version + 1, resumed['version'] + 1))
+        resumes += 1
+        patch_entries += len(resumed['patch'])
+        patch_bytes += len(json.dumps(resumed['patch'], separators=(',', ':')))
+        snapshot_bytes += len(room.get_public_state_json())
+        dropped.client = client
+        dropped.version = resumed['version']
+        assert game_manager.player_id_for(client.sid) == dropped.player_id
+
+        for _ in range(200):
+            if room.phase == 'results':
+                break
+            assert move(room, seats, rng), f"game stuck in {room.phase}"
+            for seat in seats:
+                if seat.client:
+                    seat.drain()
+        assert room.phase == 'results'
+        finished += 1
+
+        for seat in seats:
+            if seat.client:
+                seat.client.disconnect()
+        loopback.sweep(time.monotonic() + reaper.seat_grace + reaper.empty_grace + 1)
+        assert room_code not in game_manager.rooms
+
+    # A stale or unknown token gets nothing
+    client = loopback.connect()
+    client.emit('resume_session', {'session_token': dropped.token, 'version': 0})
+    assert [e for e in client.events() if e[0] == 'session_expired']
+
+    print(f"games:            {finished} finished, {expired} seats expired mid-game")
+    print(f"resumes:          {resumes}, {patch_entries / resumes:.1f} patch entries each")
+    print(f"resume payload:   {patch_bytes / resumes:.0f} bytes of patch vs {snapshot_bytes / resumes:.0f} "
+          f"bytes for a full state")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Time room code allocation at high occupancy.
+
+The allocator is compared against the old generate-and-retry loop as a
+small 3-character code space fills up. That it never collides is checked
+by tests/test_room_codes.py.
+
+Run from the backend directory:
+    python benchmarks/bench_room_codes.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from room_codes import RoomCodeAllocator
+from utils import ROOM_CODE_ALPHABET
+
+SMALL_LENGTH = 3
+OCCUPANCIES = [0.5, 0.9, 0.99, 0.999]
+SAMPLES = 2_000
+
+
+def retry_allocate(taken, length):
+    """The old approach: random codes until one is free. Returns attempts used."""
+    attempts = 1
+    while ''.join(random.choices(ROOM_CODE_ALPHABET, k=length)) in taken:
+        attempts += 1
+    return attempts
+
+
+def time_allocation():
+    print(f"{'occupancy':>10} {'retry tries':>12} {'retry (us)':>11} {'allocator (us)':>15}")
+    for occupancy in OCCUPANCIES:
+        allocator = RoomCodeAllocator(length=SMALL_LENGTH, seed=5)
+        fill = int(allocator.size * occupancy)
+        taken = {allocator.allocate() for _ in range(fill)}
+        samples = min(SAMPLES, allocator.size - fill)
+
+        start = time.perf_counter()
+        attempts = sum(retry_allocate(taken, SMALL_LENGTH) for _ in range(samples))
+        retry_time = (time.perf_counter() - start) / samples
+
+        start = time.perf_counter()
+        for _ in range(samples):
+            allocator.allocate()
+        allocator_time = (time.perf_counter() - start) / samples
+
+        print(f"{occupancy:>10.1%} {attempts / samples:>12.1f} "
+              f"{retry_time * 1e6:>11.2f} {allocator_time * 1e6:>15.2f}")
+
+
+def main():
+    time_allocation()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Report memory per room with slotted records versus the previous dict layout.
+
+Only what each room holds is counted: the word bank its deck deals from
+and the game manager are shared by every room, and left out.
+
+Run from the backend directory:
+    python benchmarks/bench_room_memory.py
+"""
+
+import os
+import random
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_manager import GameManager, Room
+from word_bank import DEFAULT_BANK
+
+PLAYER_COUNTS = [4, 6, 10]
+ROUNDS = 2
+
+
+class LegacyRoom:
+    """The previous layout: attributes in an instance __dict__."""
+
+
+def build_room(player_count):
+    """A room in the middle of a game after ROUNDS rounds of clues."""
+    random.seed(player_count)
+    room = GameManager().create_room('ABC123', 'sid-0', 'Player 0')
+    for i in range(1, player_count):
+        room.add_player(f"sid-{i}", f"Player {i}")
+    room.start_game()
+    for _ in range(ROUNDS):
+        while room.phase == 'playing':
+            room.submit_clue(room.get_current_player(), 'clue')
+        room.phase = 'playing'  # skip voting to keep everyone seated
+        room.current_turn_index = 0
+        room.round_number += 1
+    manager, room.manager = room.manager, None
+    return room, manager
+
+
+def to_legacy(room):
+    """Copy a room into the dict-per-player, dict-per-clue layout."""
+    legacy = LegacyRoom()
+    for name in Room.__slots__:
+        if name != 'seats':
+            setattr(legacy, name, getattr(room, name))
+    legacy.players = {
+        p.id: {
+            'id': p.id,
+            'name': p.name,
+            'is_host': p.is_host,
+            'role': p.role,
+            'word': p.word,
+            'is_alive': p.is_alive,
+            'joined_at': datetime.fromtimestamp(p.joined_at)
+        }
+        for p in room.players.values()
+    }
+    legacy.clues = [
+        {
+            'player_id': room.seats[c.seat].id,
+            'player_name': room.seats[c.seat].name,
+            'clue': c.clue,
+            'round': c.round
+        }
+        for c in room.clues
+    ]
+    return legacy
+
+
+def deep_size(obj, seen=None):
+    """Bytes of obj and everything it references, counting shared objects once and skipping those in seen."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or obj is None or isinstance(obj, (bool, type)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)) or type(obj).__name__ == 'deque':
+        size += sum(deep_size(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_size(vars(obj), seen)
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(obj, name):
+                size += deep_size(getattr(obj, name), seen)
+    return size
+
+
+def main():
+    print(f"{'players':>8} {'before (B)':>12} {'after (B)':>11} {'saved':>7}")
+    for player_count in PLAYER_COUNTS:
+        room, manager = build_room(player_count)
+        shared = {id(manager)}  # not walked: it reaches every room
+        deep_size(DEFAULT_BANK, shared)
+        before = deep_size(to_legacy(room), set(shared))
+        after = deep_size(room, set(shared))
+        print(f"{player_count:>8} {before:>12} {after:>11} {1 - after / before:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Check that concurrent events for one room are handled one at a time.
+
+Rooms are played up to their vote with in-process clients, then every
+living player votes at once, each from its own thread, as under a
+threaded server. With the room queues, exactly one player is eliminated
+per vote, no handler fails, and no client sees the room's version go
+backwards. The same votes are then cast with the queues bypassed,
+to show what they prevent: a vote processed twice, handler errors, or
+broadcasts overtaking each other.
+
+Python switches threads every few milliseconds, which would hide most
+races; the switch interval is lowered so that threads interleave inside
+the handlers.
+
+Run from the backend directory:
+    python benchmarks/bench_room_queue.py [--rooms N] [--players N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socket_handlers
+from loopback import LoopbackServer
+from socket_handlers import game_manager, room_queues
+
+
+def play_to_vote(loopback, players, rng):
+    """A room in its voting phase; returns (room code, {player_id: client})."""
+    host = loopback.connect()
+    host.emit('create_room', {'player_name': 'Player 0'})
+    room_code = game_manager.get_room_by_player(host.sid).room_code
+    clients = {host.sid: host}
+    for i in range(1, players):
+        client = loopback.connect()
+        client.emit('join_room', {'room_code': room_code, 'player_name': f"Player {i}"})
+        clients[client.sid] = client
+    host.emit('start_game', {'room_code': room_code})
+    room = game_manager.get_room(room_code)
+    while room.phase == 'playing':
+        clients[room.get_current_player()].emit('submit_clue', {
+            'room_code': room_code,
+            'clue': rng.choice(['old', 'loud'])
+        })
+    for client in clients.values():
+        client.events()
+    return room_code, clients
+
+
+def vote_at_once(room_code, clients):
+    """Every living player votes for the same one, concurrently; returns the handler errors."""
+    room = game_manager.get_room(room_code)
+    alive = [player_id for player_id, player in room.players.items() if player.is_alive]
+    target = alive[-1]
+    start = threading.Barrier(len(alive))
+    errors = []
+
+    def vote(client):
+        start.wait()
+        try:
+            client.emit('submit_vote', {'room_code': room_code, 'voted_for_id': target})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=vote, args=(clients[player_id],)) for player_id in alive]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(alive), errors
+
+
+def check(loopback, rooms, players, rng):
+    """Contested votes in `rooms` rooms; returns (problems found, votes cast, seconds, queue batches)."""
+    problems = {'processed twice': 0, 'handler errors': 0, 'error events': 0, 'out of order': 0}
+    votes = 0
+    elapsed = 0.0
+    batches = 0
+    for _ in range(rooms):
+        room_code, clients = play_to_vote(loopback, players, rng)
+        room = game_manager.get_room(room_code)
+        dead = sum(not player.is_alive for player in room.players.values())
+
+        start = time.perf_counter()
+        batches -= room_queues.batches
+        cast, errors = vote_at_once(room_code, clients)
+        batches += room_queues.batches
+        elapsed += time.perf_counter() - start
+        votes += cast
+
+        if sum(not player.is_alive for player in room.players.values()) - dead != 1:
+            problems['processed twice'] += 1
+        problems['handler errors'] += len(errors)
+        for client in clients.values():
+            versions = []
+            for event, data in client.events():
+                if event == 'error':
+                    problems['error events'] += 1
+                elif isinstance(data, dict) and 'version' in data:
+                    versions.append(data['version'])
+            if versions != sorted(versions):
+                problems['out of order'] += 1
+            client.disconnect()
+        if room_code in game_manager.rooms:
+            game_manager.delete_room(room_code)
+    return problems, votes, elapsed, batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--players', type=int, default=8)
+    args = parser.parse_args()
+    sys.setswitchinterval(1e-6)
+
+    problems, votes, elapsed, batches = check(LoopbackServer(), args.rooms, args.players, random.Random(1))
+    assert not any(problems.values()), problems
+    print(f"queued:   {votes} concurrent votes in {args.rooms} rooms, no problems, "
+          f"{votes / batches:.1f} votes per batch, {votes / elapsed:,.0f} votes/s")
+
+    # The same with every handler run straight from its thread
+    for event in socket_handlers.ROOMS:
+        socket_handlers.ROOMS[event] = None
+    problems, votes, elapsed, _ = check(LoopbackServer(), args.rooms, args.players, random.Random(1))
+    found = ', '.join(f"{count} {problem}" for problem, count in problems.items() if count) or 'none seen'
+    print(f"unqueued: {votes} concurrent votes in {args.rooms} rooms, {found}, {votes / elapsed:,.0f} votes/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Compare game throughput with rooms in memory and in SQLite.
+
+The same workload runs on each store: rooms are created and filled, then
+random rooms make random legal moves (see bench_recovery.play), with the
+occasional player leaving and room closing. Every move looks its room up
+through GameManager, as a socket handler does, so a room that fell out of
+the SQLite cache is loaded again. SQLite is flushed on the same interval
+as the server's background task, and its time is included.
+
+After every change a room's updates are taken as a broadcast would take
+them, and a client view of each room is rebuilt from those updates alone:
+patches while they follow on, the full state when one is sent. Every view
+must hold its room's public state at the end, whether or not the room went
+through the database in between.
+
+SQLite runs twice: with every room cached, and with a cache of a tenth of
+the rooms, so most moves load their room from the database. Afterwards the
+database is reopened by a fresh GameManager and every room must match the
+one it saved.
+
+Run from the backend directory:
+    python benchmarks/bench_room_store.py [--rooms N] [--moves N]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_recovery import fingerprint, play
+from game_manager import GameManager
+from room_store import MemoryRoomStore, SQLiteRoomStore
+from state_patch import apply_patch
+
+FLUSH_INTERVAL = 0.1  # the server default
+
+
+class View:
+    """A room's public state as its clients piece it together from broadcasts."""
+
+    def __init__(self, room):
+        self.state = json.loads(room.get_public_state_json())
+        self.version = room.state_version
+        room.take_broadcast_patch()  # what the view already holds
+
+    def receive(self, room):
+        """Take the room's next broadcast, as socket_handlers.state_update does."""
+        patch = room.take_broadcast_patch()
+        if patch is None:
+            self.state = json.loads(room.get_public_state_json())
+        else:
+            for version, ops in patch:
+                if version > self.version:
+                    self.state = apply_patch(self.state, ops)
+        self.version = room.state_version
+
+    def in_step(self, room):
+        return self.state == json.loads(room.get_public_state_json()) and self.version == room.state_version
+
+
+def workload(store, rooms, moves):
+    """Play on a store; returns (manager, seconds, seconds spent flushing, {room_code: View})."""
+    rng = random.Random(1)
+    random.seed(1)
+    manager = GameManager(store=store)
+    flush_time = 0.0
+    next_flush = time.perf_counter() + FLUSH_INTERVAL
+
+    start = time.perf_counter()
+    codes = []
+    views = {}
+    for i in range(rooms):
+        room = manager.create_room(manager.new_room_code(), f"r{i}-p0", 'Player 0')
+        views[room.room_code] = View(room)
+        for j in range(1, rng.randint(4, 8)):
+            room.add_player(f"r{i}-p{j}", f"Player {j}")
+            views[room.room_code].receive(room)
+        codes.append(room.room_code)
+    joiners = itertools.count()
+    for _ in range(moves):
+        room_code = rng.choice(codes)
+        room = manager.get_room(room_code)
+        roll = rng.random()
+        if roll < 0.002:
+            manager.delete_room(room_code)
+            codes.remove(room_code)
+            del views[room_code]
+        elif roll < 0.01 and len(room.players) > 1:
+            room.remove_player(rng.choice(list(room.players)))
+        elif room.phase == 'lobby' and len(room.players) < 4:
+            room.add_player(f"{room_code}-p{next(joiners)}", 'Late joiner')
+        else:
+            play(room, rng, 1)
+        if room_code in views:
+            views[room_code].receive(room)
+        if time.perf_counter() >= next_flush:
+            flush_start = time.perf_counter()
+            store.flush()
+            flush_time += time.perf_counter() - flush_start
+            next_flush = time.perf_counter() + FLUSH_INTERVAL
+    flush_start = time.perf_counter()
+    store.flush()
+    flush_time += time.perf_counter() - flush_start
+    return manager, time.perf_counter() - start, flush_time, views
+
+
+def check_views(manager, views):
+    out_of_step = [code for code, view in views.items() if not view.in_step(manager.get_room(code))]
+    assert not out_of_step, f"{len(out_of_step)} client views out of step, e.g. {out_of_step[0]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=5000)
+    parser.add_argument('--moves', type=int, default=100_000)
+    args = parser.parse_args()
+    operations = args.rooms + args.moves
+
+    directory = tempfile.mkdtemp()
+    try:
+        manager, elapsed, _, views = workload(MemoryRoomStore(), args.rooms, args.moves)
+        check_views(manager, views)
+        print(f"memory:           {operations / elapsed:,.0f} ops/s")
+
+        for label, cache_size in (('sqlite, all hot', args.rooms), ('sqlite, 10% hot', args.rooms // 10)):
+            path = os.path.join(directory, f"rooms-{cache_size}.db")
+            store = SQLiteRoomStore(path, cache_size=cache_size, flush_interval=FLUSH_INTERVAL)
+            manager, elapsed, flush_time, views = workload(store, args.rooms, args.moves)
+            check_views(manager, views)
+            loads = store.loads
+            expected = {room_code: fingerprint(room) for room_code, room in store.items()}
+            token = store[next(iter(expected))].seats[0].token
+            store.close()
+            size = sum(os.path.getsize(os.path.join(directory, name))
+                       for name in os.listdir(directory) if name.startswith(f"rooms-{cache_size}.db"))
+
+            # Everything survives a restart
+            reopened = GameManager(store=SQLiteRoomStore(path))
+            assert reopened.rooms.keys() == expected.keys()
+            for room_code, room in reopened.rooms.items():
+                assert fingerprint(room) == expected[room_code], room_code
+            room, player = reopened.find_session(token)
+            assert room is not None and player.token == token
+            reopened.rooms.close()
+
+            print(f"{label + ':':<18}{operations / elapsed:,.0f} ops/s, {flush_time / elapsed:.0%} of it "
+                  f"flushing, {loads} rooms loaded, {size / 1e6:.1f} MB")
+        print("clients:          every view rebuilt from broadcasts matches its room, on each store")
+        print(f"restart:          {len(expected)} rooms reloaded from SQLite, all identical")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Compare the eventlet server (app.py) with the asyncio one (asgi.py) over real WebSockets.
+
+Each server runs in its own process, as it would be deployed:
+
+    gunicorn --worker-class eventlet -w 1 app:app
+    uvicorn asgi:app
+
+Clients speak Engine.IO and Socket.IO directly over simple-websocket,
+which python-engineio already depends on. Rooms fill up, then every host
+keeps changing a setting. Each change goes through update_settings and is
+broadcast to the room; its latency is the time until the last player has
+received it. All rooms do this at once, and the clients share the
+machine with the server.
+
+Run from the backend directory:
+    python benchmarks/bench_server_modes.py [--rooms N] [--players N] [--rounds N]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from simple_websocket import AioClient
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'eventlet': lambda port: [sys.executable, '-m', 'gunicorn', '--worker-class', 'eventlet', '-w', '1',
+                              '--bind', f"127.0.0.1:{port}", 'app:app'],
+    'asyncio': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+                             '--log-level', 'warning']
+}
+
+
+class Client:
+    """A Socket.IO client on the default namespace, answering pings as it reads."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.events = asyncio.Queue()  # (event, data, arrival time)
+        self.reader = asyncio.ensure_future(self.read())
+
+    @classmethod
+    async def connect(cls, port):
+        ws = await AioClient.connect(f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket")
+        # A frame that came in with the handshake response is left in the
+        # parser until more data arrives (the server's ping, 25s later)
+        ws.connected = await ws._handle_events()
+        await ws.receive()  # Engine.IO open
+        client = cls(ws)
+        await ws.send('40')
+        await client.wait('connected')
+        return client
+
+    async def read(self):
+        while True:
+            message = await self.ws.receive()
+            if message == '2':
+                await self.ws.send('3')
+            elif message.startswith('42'):
+                event, *data = json.loads(message[2:])
+                self.events.put_nowait((event, data[0] if data else None, time.perf_counter()))
+
+    async def emit(self, event, data):
+        await self.ws.send('42' + json.dumps([event, data]))
+
+    async def wait(self, name):
+        """(data, arrival time) of the next `name` event, skipping others."""
+        while True:
+            event, data, arrived = await self.events.get()
+            if event == name:
+                return data, arrived
+
+    async def close(self):
+        self.reader.cancel()
+        await self.ws.close()
+
+
+class Run:
+    """What the rooms of one run share."""
+
+    def __init__(self, rooms):
+        self.unseated = rooms
+        self.all_seated = asyncio.Event()  # broadcasts start once every room is full
+        self.latencies = []  # seconds per broadcast
+
+    def seated(self):
+        self.unseated -= 1
+        if not self.unseated:
+            self.all_seated.set()
+
+
+async def play_room(port, players, rounds, run):
+    host = await Client.connect(port)
+    await host.emit('create_room', {'player_name': 'Host'})
+    created, _ = await host.wait('room_created')
+    room_code = created['room_code']
+    clients = [host]
+    for i in range(1, players):
+        client = await Client.connect(port)
+        await client.emit('join_room', {'room_code': room_code, 'player_name': f"Player {i}"})
+        await client.wait('room_joined')
+        clients.append(client)
+    run.seated()
+    await run.all_seated.wait()
+    for client in clients:
+        while not client.events.empty():
+            client.events.get_nowait()
+
+    for i in range(rounds):
+        sent = time.perf_counter()
+        await host.emit('update_settings', {'room_code': room_code, 'early_vote_close': i % 2 == 0})
+        arrivals = await asyncio.gather(*(client.wait('settings_updated') for client in clients))
+        run.latencies.append(max(arrived for _, arrived in arrivals) - sent)
+    await asyncio.gather(*(client.close() for client in clients))
+
+
+async def drive(port, args):
+    """(seconds to seat everyone, seconds for the broadcasts, sorted latencies)."""
+    run = Run(args.rooms)
+    start = time.perf_counter()
+    rooms = asyncio.gather(*(play_room(port, args.players, args.rounds, run) for _ in range(args.rooms)))
+    await run.all_seated.wait()
+    seat_time = time.perf_counter() - start
+    start = time.perf_counter()
+    await rooms
+    return seat_time, time.perf_counter() - start, sorted(run.latencies)
+
+
+def wait_until_up(port, process):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        assert process.poll() is None, 'server exited'
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError('server did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--players', type=int, default=6)
+    parser.add_argument('--rounds', type=int, default=100)
+    parser.add_argument('--port', type=int, default=5600)
+    args = parser.parse_args()
+
+    # Every client connects from localhost, faster than people play
+    env = dict(os.environ, LOG_LEVEL='WARNING', RATE_LIMITS='', IP_RATE_LIMITS='')
+    for mode, command in SERVERS.items():
+        process = subprocess.Popen(command(args.port), cwd=BACKEND, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up(args.port, process)
+            seat_time, elapsed, latencies = asyncio.run(drive(args.port, args))
+        finally:
+            process.terminate()
+            process.wait()
+        broadcasts = len(latencies)
+        assert broadcasts == args.rooms * args.rounds
+        print(f"{mode + ':':<10} {args.rooms * args.players} clients seated in {seat_time:.2f}s, "
+              f"{broadcasts / elapsed:,.0f} broadcasts/s ({broadcasts * args.players / elapsed:,.0f} deliveries/s), "
+              f"latency p50 {latencies[len(latencies) // 2] * 1e3:.1f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Time game start, including private role delivery, for different room sizes.
+
+Players are connected in-process through the real handlers. The first
+table is the whole start_game handler; the second isolates role delivery,
+comparing one emit per player (the previous code) with send_private.
+
+Run from the backend directory:
+    python benchmarks/bench_start_game.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loopback import LoopbackServer
+from delivery import send_private
+from socket_handlers import game_manager
+
+PLAYER_COUNTS = [4, 10, 50]
+GAMES = 200
+
+
+def seat_room(loopback, player_count):
+    """Create a room through the handlers and fill it. Returns (room, clients)."""
+    host = loopback.connect()
+    host.emit('create_room', {'player_name': 'Player 0'})
+    room_code = dict(host.events())['room_created']['room_code']
+    clients = [host]
+    for i in range(1, player_count):
+        client = loopback.connect()
+        client.emit('join_room', {'room_code': room_code, 'player_name': f"Player {i}"})
+        clients.append(client)
+    for client in clients:
+        client.received = []
+    return game_manager.get_room(room_code), clients
+
+
+def check_roles(room, clients):
+    """Every player gets exactly one role_assigned, carrying their own role."""
+    for client in clients:
+        roles = [data for event, data in client.events() if event == 'role_assigned']
+        assert len(roles) == 1, f"{client.sid} got {len(roles)} role_assigned"
+        assert roles[0]['player_data'] == room.get_player_private_state(client.sid)
+
+
+def emit_each(socketio, room):
+    """The previous delivery: one emit, room lookup and encode per player."""
+    for player_id in room.players:
+        socketio.emit('role_assigned', {
+            'player_data': room.get_player_private_state(player_id)
+        }, to=player_id)
+
+
+def send_batch(socketio, room):
+    send_private(socketio.server, 'role_assigned', {
+        player_id: {'player_data': private}
+        for player_id, private in room.get_private_states().items()
+    })
+
+
+def time_start(loopback, player_count):
+    """Mean seconds for the start_game handler, from the host's emit."""
+    total = 0
+    for _ in range(GAMES):
+        room, clients = seat_room(loopback, player_count)
+        start = time.perf_counter()
+        clients[0].emit('start_game', {'room_code': room.room_code})
+        total += time.perf_counter() - start
+        check_roles(room, clients)
+        for client in clients:
+            client.disconnect()
+    return total / GAMES
+
+
+def time_delivery(loopback, player_count, deliver):
+    room, clients = seat_room(loopback, player_count)
+    clients[0].emit('start_game', {'room_code': room.room_code})
+    for client in clients:
+        client.received = []
+    start = time.perf_counter()
+    for _ in range(GAMES):
+        deliver(loopback.socketio, room)
+    elapsed = (time.perf_counter() - start) / GAMES
+    for client in clients:
+        client.received = client.received[:len(client.received) // GAMES]
+    check_roles(room, clients)
+    for client in clients:
+        client.disconnect()
+    return elapsed
+
+
+def main():
+    loopback = LoopbackServer()
+    print(f"{'players':>8} {'start_game (us)':>16}")
+    for player_count in PLAYER_COUNTS:
+        print(f"{player_count:>8} {time_start(loopback, player_count) * 1e6:>16.1f}")
+
+    print(f"\n{'players':>8} {'emit each (us)':>15} {'batched (us)':>13} {'speedup':>8}")
+    for player_count in PLAYER_COUNTS:
+        before = time_delivery(loopback, player_count, emit_each)
+        after = time_delivery(loopback, player_count, send_batch)
+        print(f"{player_count:>8} {before * 1e6:>15.1f} {after * 1e6:>13.1f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
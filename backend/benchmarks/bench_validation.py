@@ -0,0 +1,220 @@
+"""Compare the compiled event schemas (schemas.py) with the parsing they replaced.
+
+Each handler used to read its data itself, with data.get(...) calls and
+checks spread through its body, after the room code had already been read
+once to pick the room's queue. BEFORE below is that parsing, copied from
+the handlers up to the point where they looked up the room, plus the
+queue's. Both are timed on the payloads a client sends, best of several
+rounds, then on malformed payloads: the old parsing raises on many of
+them, while the validators must reject every one with an error message.
+
+Last, the malformed payloads go through the real handlers, where each must
+be answered with one error reply and nothing else.
+
+Run from the backend directory:
+    python benchmarks/bench_validation.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loopback import LoopbackServer
+from socket_handlers import VALIDATORS, game_manager, limiter
+from utils import sanitize_string, validate_player_name, validate_room_code
+
+
+def before_room_in_data(data):
+    room_code = data.get('room_code') if isinstance(data, dict) else None
+    return room_code.upper() if isinstance(room_code, str) else None
+
+
+def before_create_room(data):
+    player_name = sanitize_string(data.get('player_name', 'Player'), 20)
+    return validate_player_name(player_name) and player_name
+
+
+def before_join_room(data):
+    room_code = data.get('room_code', '').upper()
+    player_name = sanitize_string(data.get('player_name', 'Player'), 20)
+    return validate_room_code(room_code) and validate_player_name(player_name) and (room_code, player_name)
+
+
+def before_resume_session(data):
+    token = data.get('session_token')
+    version = data.get('version')
+    return (token if isinstance(token, str) else None), (version if isinstance(version, int) else None)
+
+
+def before_room_only(data):
+    return data.get('room_code', '').upper()
+
+
+def before_update_settings(data):
+    room_code = data.get('room_code', '').upper()
+    settings = {}
+    if 'word_categories' in data:
+        categories = data['word_categories']
+        if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+            return None
+        settings['word_categories'] = categories
+    if 'undercover_count' in data:
+        settings['undercover_count'] = int(data['undercover_count'])
+    if 'early_vote_close' in data:
+        settings['early_vote_close'] = bool(data['early_vote_close'])
+    return room_code, settings
+
+
+def before_submit_clue(data):
+    room_code = data.get('room_code', '').upper()
+    clue = sanitize_string(data.get('clue', ''), 50)
+    return clue and (room_code, clue)
+
+
+def before_submit_vote(data):
+    return data.get('room_code', '').upper(), data.get('voted_for_id')
+
+
+def before_mr_white_guess(data):
+    return data.get('room_code', '').upper(), sanitize_string(data.get('guess', ''), 50)
+
+
+BEFORE = {
+    'create_room': before_create_room,
+    'join_room': before_join_room,
+    'resume_session': before_resume_session,
+    'leave_room': before_room_only,
+    'update_settings': before_update_settings,
+    'start_game': before_room_only,
+    'submit_clue': before_submit_clue,
+    'submit_vote': before_submit_vote,
+    'mr_white_guess': before_mr_white_guess,
+    'play_again': before_room_only,
+    'sync_state': before_room_only,
+}
+
+
+def with_queue_key(parse):
+    def before(data):
+        return before_room_in_data(data), parse(data)
+    return before
+
+
+BEFORE = {event: parse if event in ('create_room', 'resume_session') else with_queue_key(parse)
+          for event, parse in BEFORE.items()}
+
+ROOM = {'room_code': 'abc123'}
+
+# What the frontend sends
+GOOD = {
+    'create_room': {'player_name': 'Alice'},
+    'join_room': {**ROOM, 'player_name': 'Bob'},
+    'resume_session': {'session_token': 'a' * 32, 'version': 41},
+    'leave_room': ROOM,
+    'update_settings': {**ROOM, 'undercover_count': 2},
+    'start_game': ROOM,
+    'submit_clue': {**ROOM, 'clue': 'warm'},
+    'submit_vote': {**ROOM, 'voted_for_id': 'f' * 20},
+    'mr_white_guess': {**ROOM, 'guess': 'pizza'},
+    'play_again': ROOM,
+    'sync_state': ROOM,
+}
+
+# What a broken or hostile client could send instead
+BAD = {
+    'create_room': [{'player_name': 5}, {'player_name': '   '}],
+    'join_room': [{'room_code': 5}, {'room_code': 'abc'}, {**ROOM, 'player_name': None}],
+    'resume_session': [{'session_token': 5}, {'session_token': 'x', 'version': '3'}, {'version': True}],
+    'leave_room': [{}, {'room_code': None}],
+    'update_settings': [{**ROOM, 'undercover_count': 'x'}, {**ROOM, 'undercover_count': None},
+                        {**ROOM, 'word_categories': 'food'}, {**ROOM, 'early_vote_close': 'no'}],
+    'start_game': [{'room_code': ['ABC123']}],
+    'submit_clue': [{**ROOM, 'clue': 5}, ROOM, {**ROOM, 'clue': '<>'}],
+    'submit_vote': [{**ROOM, 'voted_for_id': ['x']}, ROOM],
+    'mr_white_guess': [{'room_code': 7}],
+    'play_again': [{'room_code': 1.5}],
+    'sync_state': [{'room_code': {}}],
+}
+NOT_A_DICT = [None, 'ABC123', ['ABC123'], 5]
+
+
+def per_call(fn, payloads, repeat, rounds=5):
+    """Best seconds per call of fn over payloads; exceptions are caught, as the server would."""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat // rounds):
+            for data in payloads:
+                try:
+                    fn(data)
+                except Exception:
+                    pass
+        best = min(best, (time.perf_counter() - start) / (repeat // rounds) / len(payloads))
+    return best
+
+
+def raises(fn, data):
+    try:
+        fn(data)
+    except Exception:
+        return True
+    return False
+
+
+def through_handlers():
+    """Malformed payloads sent to the real handlers; returns how many were answered with one error."""
+    limiter.limits = limiter.ip_limits = {}  # many events from one client, on purpose
+    loopback = LoopbackServer()
+    host = loopback.connect()
+    host.emit('create_room', {'player_name': 'Host'})
+    room_code = game_manager.get_room_by_player(host.sid).room_code
+    client = loopback.connect()
+    client.events()
+    answered = 0
+    for event, payloads in BAD.items():
+        for data in payloads + NOT_A_DICT:
+            if isinstance(data, dict) and data.get('room_code') == ROOM['room_code']:
+                data = {**data, 'room_code': room_code}  # a room that exists
+            client.emit(event, data)
+            replies = client.events()
+            assert len(replies) == 1 and replies[0][0] == 'error', (event, data, replies)
+            answered += 1
+    assert len(game_manager.get_room(room_code).players) == 1
+    host.disconnect()
+    client.disconnect()
+    return answered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'':>15} {'good payloads (ns)':>20} {'bad payloads (ns)':>20} {'bad payloads':>24}")
+    print(f"{'event':>15} {'before':>9} {'schema':>10} {'before':>9} {'schema':>10} {'sent':>6} {'raised before':>17}")
+    totals = [0.0] * 4
+    for event, data in GOOD.items():
+        validate = VALIDATORS[event]
+        cleaned, error = validate(data)
+        assert error is None, (event, error)
+        bad = BAD[event] + NOT_A_DICT
+        for payload in bad:
+            cleaned, error = validate(payload)
+            assert cleaned is None and error, (event, payload)
+        crashed = sum(raises(BEFORE[event], payload) for payload in bad)
+
+        times = [per_call(BEFORE[event], [data], args.repeat), per_call(validate, [data], args.repeat),
+                 per_call(BEFORE[event], bad, args.repeat // 5), per_call(validate, bad, args.repeat // 5)]
+        totals = [total + t for total, t in zip(totals, times)]
+        print(f"{event:>15} " + ' '.join(f"{t * 1e9:>9.0f} " for t in times) + f"{len(bad):>6} {crashed:>17}")
+    print(f"{'all':>15} " + ' '.join(f"{t * 1e9:>9.0f} " for t in totals))
+    print("\nevery bad payload rejected by its schema with an error message")
+    print(f"through the handlers: {through_handlers()} malformed events, each answered with one error")
+
+
+if __name__ == '__main__':
+    main()
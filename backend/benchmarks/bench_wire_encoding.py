@@ -0,0 +1,121 @@
+"""Compare JSON and msgpack (msgpack_wire.py) payloads, per event type.
+
+Complete games are played with in-process clients (see load_test.py), and
+every payload the server emits is recorded with the number of clients it
+reaches. Each payload is then encoded both ways, as a Socket.IO packet
+ready for Engine.IO: JSON text, or a text header plus a binary attachment
+of msgpack. Bytes are counted as they go over a WebSocket, with the
+Engine.IO message type and the frame header of each message, and are
+multiplied by the recipients. Every packed payload must unpack to the
+data its JSON decodes to.
+
+Run from the backend directory:
+    python benchmarks/bench_wire_encoding.py [--games N] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet
+
+import msgpack_wire
+import outbox
+import wire
+from load_test import Game, Stats
+from loopback import LoopbackServer
+from socket_handlers import limiter
+
+
+def frame_bytes(message):
+    """Bytes of one server-to-client WebSocket message carrying an Engine.IO message."""
+    size = len(message.encode()) + 1 if isinstance(message, str) else len(message)  # text gets a '4' prefix
+    return size + (2 if size < 126 else 4 if size < 65536 else 10)
+
+
+def record_payloads(games, seed):
+    """Play games; returns [(event, data, recipients)] of everything sent."""
+    loopback = LoopbackServer()
+    limiter.limits = limiter.ip_limits = {}  # as in load_test.py
+    server = loopback.server
+    payloads = []
+    emit, deliver_private = server.emit, outbox.deliver_private
+
+    def recording_emit(event, data=None, to=None, **kwargs):
+        recipients = sum(1 for _ in server.manager.get_participants('/', to))
+        payloads.append((event, data, recipients))
+        emit(event, data, to=to, **kwargs)
+
+    def recording_private(server, event, private_payloads, namespace='/'):
+        payloads.extend((event, data, 1) for data in private_payloads.values())
+        deliver_private(server, event, private_payloads, namespace=namespace)
+
+    server.emit = recording_emit
+    outbox.deliver_private = recording_private
+    rng = random.Random(seed)
+    random.seed(seed)
+    stats = Stats()
+    for _ in range(games):
+        game = Game(loopback, stats, rng, rng.randint(4, 8), 1)
+        while not game.done:
+            game.step()
+    outbox.deliver_private = deliver_private
+    return payloads
+
+
+def encode_json(packet_class, event, data):
+    return [packet_class(packet.EVENT, data=[event, data]).encode()]
+
+
+def encode_msgpack(packet_class, event, data):
+    return packet_class(packet.EVENT, data=[event, msgpack_wire.pack(data)]).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=20, help='encodings per payload when timing')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    payloads = record_payloads(args.games, args.seed)
+    packet_class = packet.Packet  # encoding with wire.py, as set up by the server
+
+    totals = {}  # {event: [emits, deliveries, json bytes, msgpack bytes, json seconds, msgpack seconds]}
+    for event, data, recipients in payloads:
+        row = totals.setdefault(event, [0, 0, 0, 0, 0.0, 0.0])
+        row[0] += 1
+        row[1] += recipients
+        for column, encode in ((2, encode_json), (3, encode_msgpack)):
+            messages = encode(packet_class, event, data)
+            row[column] += recipients * sum(frame_bytes(message) for message in messages)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                encode(packet_class, event, data)
+            row[column + 2] += (time.perf_counter() - start) / args.repeat
+
+        expected = json.loads(wire.dumps(data)) if data is not None else None
+        assert msgpack_wire.unpack(msgpack_wire.pack(data)) == expected, (event, data)
+
+    print(f"{len(payloads)} payloads from {args.games} games, all unpacking to their JSON\n")
+    print(f"{'event':>15} {'emits':>7} {'JSON B':>8} {'msgpack B':>10} {'saved':>6} "
+          f"{'JSON us':>8} {'msgpack us':>11}")
+    for event, (emits, deliveries, json_bytes, packed_bytes, json_time, packed_time) in sorted(
+            totals.items(), key=lambda item: -item[1][2]):
+        print(f"{event:>15} {emits:>7} {json_bytes / deliveries:>8.0f} {packed_bytes / deliveries:>10.0f} "
+              f"{1 - packed_bytes / json_bytes:>6.0%} {json_time / emits * 1e6:>8.1f} "
+              f"{packed_time / emits * 1e6:>11.1f}")
+    json_bytes = sum(row[2] for row in totals.values())
+    packed_bytes = sum(row[3] for row in totals.values())
+    print(f"\n{'all':>15} {json_bytes / 1e6:.2f} MB as JSON, {packed_bytes / 1e6:.2f} MB as msgpack "
+          f"({1 - packed_bytes / json_bytes:.0%} less on the wire)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Compare the old rejection-sampling pair generator with enumeration.
+
+The old generator drew random pairs until it had enough distinct ones, which
+slows down sharply as the target approaches the number of pairs that exist
+(and never finishes past it). Enumeration samples pair numbers without
+replacement, so every draw is used. The last rows generate and load pairs
+from large synthetic categories.
+
+Run from the backend directory:
+    python benchmarks/bench_word_pairs.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from math import comb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_word_pairs import CATEGORIES, generate_pairs, write_pairs
+from word_bank import WordBank, load_word_pairs
+
+FILLS = [0.1, 0.5, 0.9, 0.99, 1.0]
+LARGE_TARGETS = [100_000, 1_000_000]
+LARGE_CATEGORIES = 20
+LARGE_WORDS = 2_000
+
+
+def rejection_pairs(categories, target):
+    """The old generator. Returns (pairs, draws used)."""
+    pairs = set()
+    cat_lists = list(categories.values())
+    draws = 0
+    while len(pairs) < target:
+        group = random.choice(cat_lists)
+        a, b = random.sample(group, 2)
+        pairs.add(tuple(sorted((a, b))))
+        draws += 1
+    return pairs, draws
+
+
+def check_distinct(categories, target):
+    pairs = list(generate_pairs(categories, target, random.Random(target)))
+    assert len(pairs) == target, len(pairs)
+    keys = {(c,) + tuple(sorted((a, b))) for c, a, b in pairs}
+    assert len(keys) == target, "duplicate pair"
+    for category, a, b in pairs:
+        assert a != b and a in categories[category] and b in categories[category]
+
+
+def time_small():
+    total = sum(comb(len(words), 2) for words in CATEGORIES.values())
+    print(f"built-in categories: {total} possible pairs")
+    print(f"\n{'target':>8} {'draws':>9} {'rejection (ms)':>15} {'enumeration (ms)':>17}")
+    for fill in FILLS:
+        target = int(total * fill)
+        check_distinct(CATEGORIES, target)
+
+        start = time.perf_counter()
+        _, draws = rejection_pairs(CATEGORIES, target)
+        rejection_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in generate_pairs(CATEGORIES, target):
+            pass
+        enumeration_time = time.perf_counter() - start
+
+        print(f"{target:>8} {draws:>9} {rejection_time * 1e3:>15.1f} {enumeration_time * 1e3:>17.1f}")
+
+
+def time_large():
+    categories = {
+        f"cat{c}": [f"word{c}_{i}" for i in range(LARGE_WORDS)]
+        for c in range(LARGE_CATEGORIES)
+    }
+    total = sum(comb(len(words), 2) for words in categories.values())
+    print(f"\nsynthetic: {LARGE_CATEGORIES} categories x {LARGE_WORDS} words, {total} possible pairs")
+    print(f"{'target':>10} {'generate (s)':>13} {'load (s)':>9} {'file (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'word_pairs.tsv')
+        for target in LARGE_TARGETS:
+            start = time.perf_counter()
+            write_pairs(generate_pairs(categories, target), path)
+            generate_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            pairs_by_category = {}
+            assert load_word_pairs(path, pairs_by_category) == target
+            WordBank(pairs_by_category).deck().draw()
+            load_time = time.perf_counter() - start
+
+            size = os.path.getsize(path) / 1e6
+            print(f"{target:>10} {generate_time:>13.2f} {load_time:>9.2f} {size:>10.1f}")
+
+
+def main():
+    time_small()
+    time_large()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""Play many complete games against the real Socket.IO handlers.
+
+Simulated clients connect in-process (see loopback.py) and play full
+games: create_room, join_room, start_game, submit_clue, submit_vote,
+mr_white_guess and play_again, then disconnect. Many games run at once,
+interleaved one event at a time, so the server holds many rooms the way
+it would under real traffic. Clients choose their moves from the room's
+state rather than by parsing what they receive; that keeps the driver
+simple and does not change what the server does.
+
+Reports events/sec, handler latency percentiles per event, and broadcast
+fan-out: packets and bytes delivered per event and time spent in emits.
+No network service is needed. With --asyncio the games run on the asyncio
+server of asgi.py instead of the Flask-SocketIO one of app.py.
+
+Run from the backend directory:
+    python benchmarks/load_test.py [--games N] [--concurrent N] [--players MIN MAX] [--rematches N] [--asyncio]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loopback import AsyncLoopbackServer, LoopbackServer
+from socket_handlers import coalescer, game_manager, limiter
+
+
+class Stats:
+    """Per-event latency samples and fan-out totals."""
+
+    def __init__(self):
+        self.latencies = {}  # {event: [seconds]}
+        self.packets = {}  # {event: packets delivered}
+        self.bytes = {}  # {event: bytes delivered}
+        self.emit_time = {}  # {event: seconds inside manager.emit}
+        self.current = None  # event whose handler is running
+
+    def record(self, event, seconds):
+        self.latencies.setdefault(event, []).append(seconds)
+
+    def add(self, table, amount):
+        table[self.current] = table.get(self.current, 0) + amount
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def instrument(loopback, stats):
+    """
+    Count what each handler delivers and time its emits. Packets are
+    counted and dropped, since clients play from the room's state.
+    """
+
+    def counted_send(eio_sid, data):
+        stats.add(stats.packets, 1)
+        stats.add(stats.bytes, len(data))
+
+    def counted_send_packet(eio_sid, eio_pkt):
+        stats.add(stats.packets, 1)
+        stats.add(stats.bytes, len(eio_pkt.data))
+
+    manager = loopback.server.manager
+    manager_emit = manager.emit
+
+    def timed_emit(*args, **kwargs):
+        start = time.perf_counter()
+        manager_emit(*args, **kwargs)
+        stats.add(stats.emit_time, time.perf_counter() - start)
+
+    async def counted_send_async(eio_sid, data):
+        counted_send(eio_sid, data)
+
+    async def counted_send_packet_async(eio_sid, eio_pkt):
+        counted_send_packet(eio_sid, eio_pkt)
+
+    async def timed_emit_async(*args, **kwargs):
+        start = time.perf_counter()
+        await manager_emit(*args, **kwargs)
+        stats.add(stats.emit_time, time.perf_counter() - start)
+
+    if loopback.server.is_asyncio_based():
+        loopback.server.eio.send = counted_send_async
+        loopback.server.eio.send_packet = counted_send_packet_async
+        manager.emit = timed_emit_async
+    else:
+        loopback.server.eio.send = counted_send
+        loopback.server.eio.send_packet = counted_send_packet
+        manager.emit = timed_emit
+
+
+class Game:
+    """One room's clients, stepped one event at a time."""
+
+    def __init__(self, loopback, stats, rng, player_count, rematches):
+        self.loopback = loopback
+        self.stats = stats
+        self.rng = rng
+        self.player_count = player_count
+        self.rematches = rematches  # play_again rounds left
+        self.clients = {}  # {sid: LoopbackClient}
+        self.room_code = None
+        self.done = False
+
+    def send(self, client, event, data):
+        self.stats.current = event
+        start = time.perf_counter()
+        client.emit(event, data)
+        self.stats.record(event, time.perf_counter() - start)
+
+    def step(self):
+        """Send the next event this game needs. Sets self.done when finished."""
+        # Looked up every step, as a room store may have reloaded it
+        room = game_manager.get_room(self.room_code) if self.room_code else None
+        if room is None:
+            host = self.loopback.connect()
+            self.clients[host.sid] = host
+            self.send(host, 'create_room', {'player_name': 'Player 0'})
+            self.room_code = game_manager.get_room_by_player(host.sid).room_code
+        elif room.phase == 'lobby' and len(room.players) < self.player_count:
+            client = self.loopback.connect()
+            self.clients[client.sid] = client
+            self.send(client, 'join_room', {
+                'room_code': room.room_code,
+                'player_name': f"Player {len(room.players)}"
+            })
+        elif room.phase == 'lobby':
+            self.send(self.clients[room.host_id], 'start_game', {'room_code': room.room_code})
+        elif room.phase == 'playing':
+            self.send(self.clients[room.get_current_player()], 'submit_clue', {
+                'room_code': room.room_code,
+                'clue': self.rng.choice(['round', 'sweet', 'loud', 'old', 'fast'])
+            })
+        elif room.phase == 'voting':
+            alive = [p.id for p in room.players.values() if p.is_alive]
+            voter = next(pid for pid in alive if pid not in room.votes)
+            self.send(self.clients[voter], 'submit_vote', {
+                'room_code': room.room_code,
+                'voted_for_id': self.rng.choice(alive)
+            })
+        elif room.phase == 'mr_white_guess':
+            self.send(self.clients[room.eliminated_player_id], 'mr_white_guess', {
+                'room_code': room.room_code,
+                'guess': self.rng.choice([room.civilian_word, 'no idea'])
+            })
+        elif room.phase == 'results' and self.rematches:
+            self.rematches -= 1
+            self.send(self.clients[room.host_id], 'play_again', {'room_code': room.room_code})
+        else:
+            for client in self.clients.values():
+                self.stats.current = 'disconnect'
+                start = time.perf_counter()
+                client.disconnect()
+                self.stats.record('disconnect', time.perf_counter() - start)
+            self.done = True
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    loopback = AsyncLoopbackServer() if args.asyncio else LoopbackServer()
+    # Bots play far faster than people; the rate limits would turn most of
+    # their moves away (see bench_rate_limit.py for those)
+    limiter.limits = limiter.ip_limits = {}
+    stats = Stats()
+    instrument(loopback, stats)
+
+    def new_game():
+        return Game(loopback, stats, rng, rng.randint(*args.players), args.rematches)
+
+    started = min(args.concurrent, args.games)
+    active = [new_game() for _ in range(started)]
+    completed = 0
+    peak_rooms = 0
+
+    start = last_sweep = last_flush = time.perf_counter()
+    while active:
+        # The reaper's and the coalescer's background tasks are paused by
+        # LoopbackServer; run them inline on the same schedule so empty
+        # rooms still go away and held broadcasts are still sent
+        if time.perf_counter() - last_sweep >= 1:
+            loopback.sweep()
+            last_sweep = time.perf_counter()
+        if time.perf_counter() - last_flush >= coalescer.interval:
+            loopback.flush_broadcasts()
+            last_flush = time.perf_counter()
+        game = active[rng.randrange(len(active))]
+        game.step()
+        if game.done:
+            completed += 1
+            active.remove(game)
+            if started < args.games:
+                active.append(new_game())
+                started += 1
+        peak_rooms = max(peak_rooms, len(game_manager.rooms))
+    elapsed = time.perf_counter() - start
+    return stats, elapsed, completed, peak_rooms
+
+
+def report(stats, elapsed, completed, peak_rooms):
+    events = sum(len(samples) for samples in stats.latencies.values())
+    print(f"{completed} games, {events} events in {elapsed:.2f}s: "
+          f"{events / elapsed:,.0f} events/s, peak {peak_rooms} rooms\n")
+    print(f"{'event':>15} {'count':>8} {'p50 (us)':>9} {'p99 (us)':>9} "
+          f"{'packets/ev':>11} {'bytes/ev':>9} {'emit (us)':>10}")
+    for event, samples in sorted(stats.latencies.items(), key=lambda item: -len(item[1])):
+        samples.sort()
+        count = len(samples)
+        print(f"{event:>15} {count:>8} {percentile(samples, 0.5) * 1e6:>9.1f} "
+              f"{percentile(samples, 0.99) * 1e6:>9.1f} "
+              f"{stats.packets.get(event, 0) / count:>11.1f} "
+              f"{stats.bytes.get(event, 0) / count:>9.0f} "
+              f"{stats.emit_time.get(event, 0) / count * 1e6:>10.1f}")
+
+    all_samples = sorted(s for samples in stats.latencies.values() for s in samples)
+    print(f"\n{'all':>15} {events:>8} {percentile(all_samples, 0.5) * 1e6:>9.1f} "
+          f"{percentile(all_samples, 0.99) * 1e6:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000, help='games to play in total')
+    parser.add_argument('--concurrent', type=int, default=200, help='games in progress at once')
+    parser.add_argument('--players', type=int, nargs=2, default=[4, 10], metavar=('MIN', 'MAX'),
+                        help='players per game')
+    parser.add_argument('--rematches', type=int, default=1, help='play_again rounds per room')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--asyncio', action='store_true', help='use the asyncio server of asgi.py')
+    parser.add_argument('--show-logs', action='store_true', help="keep the server's own output")
+    args = parser.parse_args()
+
+    if args.show_logs:
+        results = run(args)
+    else:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results = run(args)
+    report(*results)
+
+
+if __name__ == '__main__':
+    main()
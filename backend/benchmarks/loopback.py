@@ -0,0 +1,178 @@
+"""In-process Socket.IO clients for driving the real handlers in benchmarks.
+
+Builds a server with the game's handlers registered and connects clients
+straight to its packet entry points, skipping the network. Outgoing
+packets are encoded exactly as they would be for a real socket and queued
+on the receiving client.
+
+LoopbackServer is the Flask-SocketIO server of app.py; AsyncLoopbackServer
+is the socketio.AsyncServer of asgi.py, whose event loop runs for each
+call into it.
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socketio
+from flask import Flask
+from flask_socketio import SocketIO
+from socketio import packet
+from werkzeug.test import EnvironBuilder
+
+import msgpack_wire
+import outbox
+import wire
+from bus import async_client_manager_from_env, client_manager_from_env
+from socket_handlers import coalescer, reaper, register_async_handlers, register_socket_handlers
+
+# Each client comes from an address of its own unless told otherwise, as
+# players do, so that per-address rate limits see them apart
+addresses = (f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}" for n in itertools.count(1))
+
+
+class LoopbackServer:
+    """A Flask-SocketIO server whose clients live in the same process."""
+
+    def __init__(self):
+        self.app = Flask(__name__)
+        # A worker of a sharded cluster when BUS_ADDRESS is set, as in app.py
+        self.socketio = SocketIO(self.app, async_mode='threading', json=wire,
+                                 client_manager=client_manager_from_env())
+        # The reaper and the coalescer would run from their own threads
+        # mid-run; callers sweep and flush when they choose instead
+        reaper.interval = coalescer.interval = 3600
+        register_socket_handlers(self.socketio)
+
+        self.server = self.socketio.server
+        # Run handlers inline so every emit has been delivered when it returns
+        self.server.async_handlers = False
+        self.server.eio.async_handlers = False
+        self.clients = {}  # {eio_sid: LoopbackClient}
+        self.server.eio.send = self._send
+        self.server.eio.send_packet = self._send_packet
+
+    def _send(self, eio_sid, data):
+        client = self.clients.get(eio_sid)
+        if client:
+            client.received.append(data)
+
+    def _send_packet(self, eio_sid, eio_pkt):
+        client = self.clients.get(eio_sid)
+        if client:
+            client.received.append(eio_pkt.data)
+
+    def connect(self, auth=None, address=None):
+        """Connect a new client, passing `auth` as a Socket.IO client would, from `address`."""
+        return LoopbackClient(self, auth, address)
+
+    def environ(self):
+        environ = EnvironBuilder('/socket.io/').get_environ()
+        environ['flask.app'] = self.app
+        return environ
+
+    def run(self, result):
+        """The result of a call into the server, which is done when it returns."""
+        return result
+
+    def sweep(self, now=None):
+        """Sweep the reaper and send what it emits, as its background task would."""
+        _, box = outbox.collect(None, reaper.sweep, now)
+        outbox.send(self.server, box)
+
+    def flush_broadcasts(self, now=None):
+        """Send the broadcasts whose coalescing window has closed, as its background task would."""
+        _, box = outbox.collect(None, coalescer.tick, now)
+        outbox.send(self.server, box)
+
+
+class AsyncLoopbackServer(LoopbackServer):
+    """The asyncio server of asgi.py, with clients in the same process."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = socketio.AsyncServer(async_mode='asgi', json=wire, async_handlers=False,
+                                           client_manager=async_client_manager_from_env())
+        reaper.interval = coalescer.interval = 3600  # as for LoopbackServer
+        self.run(register_async_handlers(self.server)())
+
+        self.clients = {}
+
+        async def send(eio_sid, data):
+            self._send(eio_sid, data)
+
+        async def send_packet(eio_sid, eio_pkt):
+            self._send_packet(eio_sid, eio_pkt)
+
+        self.server.eio.send = send
+        self.server.eio.send_packet = send_packet
+
+    def environ(self):
+        return {}
+
+    def run(self, coroutine):
+        """Run the event loop until a call into the server is done."""
+        return self.loop.run_until_complete(coroutine)
+
+    def sweep(self, now=None):
+        _, box = outbox.collect(None, reaper.sweep, now)
+        self.run(outbox.send_async(self.server, box))
+
+    def flush_broadcasts(self, now=None):
+        _, box = outbox.collect(None, coalescer.tick, now)
+        self.run(outbox.send_async(self.server, box))
+
+
+class LoopbackClient:
+    """
+    One connected client. Received packets stay encoded until decoded.
+    Data that arrives packed (see msgpack_wire.py) is unpacked on decoding.
+    """
+
+    def __init__(self, loopback, auth=None, address=None):
+        self.loopback = loopback
+        self.server = loopback.server
+        self.eio_sid = uuid.uuid4().hex
+        self.received = []  # encoded Socket.IO packets, and the binary attachments after them
+        loopback.clients[self.eio_sid] = self
+
+        environ = loopback.environ()
+        environ['REMOTE_ADDR'] = address or next(addresses)
+        self.server.environ[self.eio_sid] = environ
+        loopback.run(self.server._handle_eio_connect(self.eio_sid, environ))
+        loopback.run(self.server._handle_eio_message(
+            self.eio_sid, packet.Packet(packet.CONNECT, data=auth, namespace='/').encode()))
+        self.sid = self.server.manager.sid_from_eio_sid(self.eio_sid, '/')
+
+    def emit(self, event, data):
+        """Send an event to the server, returning once its handler has run."""
+        self.loopback.run(self.server._handle_eio_message(
+            self.eio_sid, packet.Packet(packet.EVENT, data=[event, data], namespace='/').encode()))
+
+    def events(self):
+        """Decode and clear everything received, as [(event, data)]."""
+        events = []
+        pkt = None
+        for encoded in self.received:
+            if isinstance(encoded, bytes):
+                if not pkt.add_attachment(encoded):
+                    continue
+            else:
+                pkt = packet.Packet(encoded_packet=encoded)
+                if pkt.attachment_count:
+                    continue
+            if pkt.packet_type == packet.EVENT:
+                events.append((pkt.data[0], pkt.data[1] if len(pkt.data) > 1 else None))
+            elif pkt.packet_type == packet.BINARY_EVENT:
+                events.append((pkt.data[0], msgpack_wire.unpack(pkt.data[1])))
+        self.received = []
+        return events
+
+    def disconnect(self):
+        self.loopback.run(self.server._handle_eio_disconnect(self.eio_sid))
+        self.loopback.clients.pop(self.eio_sid, None)
@@ -0,0 +1,306 @@
+"""
+Message bus between worker processes, behind Socket.IO's client manager.
+
+BusManager is a python-socketio PubSubManager. Emits, room changes and
+disconnects for clients on other workers are published on a bus, and each
+worker applies what the others publish. Rooms live on the worker that owns
+them (see sharding.py), so an emit to a room or client connected here is
+delivered directly and never goes through the bus.
+
+A bus is any object with publish(message) and listen(), which yields the
+messages published by everyone, as bytes:
+
+    InProcessBus    workers in one process, for tests and benchmarks
+    SocketBus       workers on one machine, through a Relay on a Unix or
+                    loopback TCP socket
+
+Messages are msgpack, never pickle, so whatever reaches the bus can at
+worst be a bad message, not code run on every worker.
+
+Under eventlet the workers must be monkey patched (gunicorn's eventlet
+worker does this), so reading the bus socket does not block the loop.
+Workers on the asyncio server (asgi.py) use AsyncBusManager and
+AsyncSocketBus instead, whose publish() and listen() are coroutines.
+"""
+
+import asyncio
+import ipaddress
+import os
+import queue
+import socket
+import struct
+import threading
+
+import msgpack
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from log_config import get_logger
+from wire import RawJSON
+
+log = get_logger('bus')
+
+FRAME_HEADER = struct.Struct('>I')  # payload length
+
+# msgpack extension types, for what must arrive as it was sent
+TUPLE = 1  # emit() data with several arguments, and callback addresses
+RAW_JSON = 2  # pre-encoded payloads, see wire.py
+
+
+def encode_message(data):
+    """A client manager's message as msgpack bytes."""
+    return msgpack.packb(data, default=encode_extension, strict_types=True)
+
+
+def encode_extension(obj):
+    if isinstance(obj, tuple):
+        return msgpack.ExtType(TUPLE, encode_message(list(obj)))
+    if isinstance(obj, RawJSON):
+        return msgpack.ExtType(RAW_JSON, str(obj).encode())
+    raise TypeError(f"Cannot send {type(obj).__name__} over the bus")
+
+
+def decode_message(message):
+    return msgpack.unpackb(message, ext_hook=decode_extension, strict_map_key=False)
+
+
+def decode_extension(code, payload):
+    if code == TUPLE:
+        return tuple(decode_message(payload))
+    if code == RAW_JSON:
+        return RawJSON(payload.decode())
+    return msgpack.ExtType(code, payload)
+
+
+def decoded(messages):
+    """
+    Decode messages from the bus, dropping any that are not valid. The
+    managers are handed dicts, so python-socketio never unpickles anything.
+    """
+    for message in messages:
+        try:
+            data = decode_message(message)
+        except Exception:
+            log.warning('dropped a bad bus message')
+            continue
+        if isinstance(data, dict):
+            yield data
+        else:
+            log.warning('dropped a bad bus message')
+
+
+class BusManager(socketio.PubSubManager):
+    """Client manager that reaches clients on other workers through a bus."""
+
+    name = 'bus'
+
+    def __init__(self, bus, channel='undercover', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.bus = bus
+        self.published = 0  # messages sent to other workers
+
+    def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, **kwargs):
+        if callback is None and self.is_local(namespace or '/', room):
+            kwargs['ignore_queue'] = True
+        return super().emit(event, data, namespace=namespace, room=room, skip_sid=skip_sid,
+                            callback=callback, **kwargs)
+
+    def is_local(self, namespace, room):
+        """Whether a room (or client) is on this worker, and only here."""
+        return isinstance(room, str) and room in self.rooms.get(namespace, {})
+
+    def _publish(self, data):
+        self.published += 1
+        self.bus.publish(encode_message(data))
+
+    def _listen(self):
+        yield from decoded(self.bus.listen())
+
+
+class AsyncBusManager(AsyncPubSubManager):
+    """BusManager for socketio.AsyncServer."""
+
+    name = 'bus'
+
+    def __init__(self, bus, channel='undercover', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.bus = bus
+        self.published = 0
+
+    async def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, **kwargs):
+        if callback is None and self.is_local(namespace or '/', room):
+            kwargs['ignore_queue'] = True
+        return await super().emit(event, data, namespace=namespace, room=room, skip_sid=skip_sid,
+                                  callback=callback, **kwargs)
+
+    is_local = BusManager.is_local
+
+    async def _publish(self, data):
+        self.published += 1
+        await self.bus.publish(encode_message(data))
+
+    async def _listen(self):
+        async for message in self.bus.listen():
+            for data in decoded((message,)):
+                yield data
+
+
+class InProcessBus:
+    """Delivers every message to every listener in this process."""
+
+    def __init__(self):
+        self.listeners = []  # [queue.Queue]
+
+    def publish(self, message):
+        for listener in list(self.listeners):
+            listener.put(message)
+
+    def listen(self):
+        listener = queue.Queue()
+        self.listeners.append(listener)
+        while True:
+            yield listener.get()
+
+
+def parse_address(address):
+    """
+    (family, address) for 'unix:/path' or 'tcp:host:port'. The relay has
+    no authentication, so a TCP host must be a loopback address.
+    """
+    kind, _, rest = address.partition(':')
+    if kind == 'unix':
+        return socket.AF_UNIX, rest
+    if kind == 'tcp':
+        host, _, port = rest.rpartition(':')
+        if host != 'localhost':
+            try:
+                loopback = ipaddress.ip_address(host.strip('[]')).is_loopback
+            except ValueError:
+                loopback = False
+            if not loopback:
+                raise ValueError(f"Bus TCP host must be a loopback address, got {host!r}")
+        family = socket.AF_INET6 if ':' in host else socket.AF_INET
+        return family, (host.strip('[]'), int(port))
+    raise ValueError(f"Bus address must start with unix: or tcp:, got {address!r}")
+
+
+def read_frames(sock):
+    """Yield each length-prefixed frame received on a socket, header included."""
+    stream = sock.makefile('rb')
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return
+        payload = stream.read(FRAME_HEADER.unpack(header)[0])
+        yield header + payload
+
+
+class SocketBus:
+    """A connection to a Relay; each message is one length-prefixed frame."""
+
+    def __init__(self, address):
+        family, target = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(target)
+        self.lock = threading.Lock()  # frames from concurrent emits must not interleave
+
+    def publish(self, message):
+        frame = FRAME_HEADER.pack(len(message)) + message
+        with self.lock:
+            self.sock.sendall(frame)
+
+    def listen(self):
+        for frame in read_frames(self.sock):
+            yield frame[FRAME_HEADER.size:]
+        log.error('bus connection closed')
+
+
+class AsyncSocketBus:
+    """SocketBus for asyncio workers: the same frames to the same Relay."""
+
+    def __init__(self, address):
+        self.address = address
+        self.reader = self.writer = None
+        self.connecting = None  # the connection attempt both directions wait for
+
+    async def connect(self):
+        if self.connecting is None:
+            self.connecting = asyncio.ensure_future(self.open())
+        await self.connecting
+
+    async def open(self):
+        family, target = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            self.reader, self.writer = await asyncio.open_unix_connection(target)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(*target)
+
+    async def publish(self, message):
+        await self.connect()
+        # One write() per frame, so frames from concurrent emits never interleave
+        self.writer.write(FRAME_HEADER.pack(len(message)) + message)
+        await self.writer.drain()
+
+    async def listen(self):
+        await self.connect()
+        while True:
+            try:
+                header = await self.reader.readexactly(FRAME_HEADER.size)
+                yield await self.reader.readexactly(FRAME_HEADER.unpack(header)[0])
+            except asyncio.IncompleteReadError:
+                log.error('bus connection closed')
+                return
+
+
+class Relay:
+    """Forwards every frame a worker sends to all the other workers."""
+
+    def __init__(self, address):
+        family, target = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.remove(target)
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(target)
+        self.server.listen()
+        self.peers = {}  # {socket: lock held while writing to it}
+        self.lock = threading.Lock()
+
+    def serve_forever(self):
+        """Accept workers forever, one thread each."""
+        while True:
+            sock, _ = self.server.accept()
+            with self.lock:
+                self.peers[sock] = threading.Lock()
+            threading.Thread(target=self.forward, args=(sock,), daemon=True).start()
+
+    def forward(self, sock):
+        try:
+            for frame in read_frames(sock):
+                with self.lock:
+                    others = [(peer, lock) for peer, lock in self.peers.items() if peer is not sock]
+                for peer, lock in others:
+                    try:
+                        with lock:
+                            peer.sendall(frame)
+                    except OSError:
+                        pass  # its own forward() thread drops it
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.peers.pop(sock, None)
+            sock.close()
+
+
+def client_manager_from_env():
+    """A BusManager on the relay at BUS_ADDRESS, or None (the default manager) if unset."""
+    address = os.getenv('BUS_ADDRESS')
+    return BusManager(SocketBus(address)) if address else None
+
+
+def async_client_manager_from_env():
+    """client_manager_from_env for socketio.AsyncServer."""
+    address = os.getenv('BUS_ADDRESS')
+    return AsyncBusManager(AsyncSocketBus(address)) if address else None
@@ -0,0 +1,102 @@
+"""
+Run the backend as several worker processes on one machine.
+
+Worker i is an ordinary `gunicorn --worker-class eventlet -w 1` server on
+port PORT + i. Rooms are sharded across the workers (see sharding.py): a
+client can connect to any of them, and one that names a room is sent on to
+the worker that owns it. The workers reach each other's clients through a
+message bus relayed by this process (see bus.py).
+
+    python cluster.py --workers 4 --port 5000
+
+--public-url sets how clients reach each worker, e.g. behind a proxy:
+    --public-url 'https://game.example.com/w{index}'
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bus import Relay
+from log_config import get_logger, setup_logging
+
+log = get_logger('cluster')
+
+
+def worker_env(index, args, urls):
+    """Environment for worker `index`."""
+    env = dict(os.environ)
+    env.update({
+        'WORKERS': str(args.workers),
+        'WORKER_INDEX': str(index),
+        'WORKER_URLS': ','.join(urls),
+        'BUS_ADDRESS': args.bus,
+        'PORT': str(args.port + index)
+    })
+    # Each worker journals its own rooms
+    if os.getenv('JOURNAL_DIR'):
+        env['JOURNAL_DIR'] = os.path.join(os.getenv('JOURNAL_DIR'), f"worker-{index}")
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the backend as several worker processes.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')),
+                        help='port of the first worker; the others follow it')
+    parser.add_argument('--public-url', default='http://localhost:{port}',
+                        help='URL clients use for a worker; {port} and {index} are filled in')
+    parser.add_argument('--bus', default=None,
+                        help='bus relay address, unix:/path or tcp:127.0.0.1:port (default: a temporary Unix socket)')
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.bus is None:
+        args.bus = 'unix:' + os.path.join(tempfile.mkdtemp(prefix='undercover-'), 'bus.sock')
+    relay = Relay(args.bus)
+    threading.Thread(target=relay.serve_forever, daemon=True).start()
+
+    urls = [args.public_url.format(port=args.port + i, index=i) for i in range(args.workers)]
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    workers = [
+        subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--worker-class', 'eventlet', '-w', '1',
+             '--bind', f"{args.host}:{args.port + i}", 'app:app'],
+            cwd=backend_dir, env=worker_env(i, args, urls)
+        )
+        for i in range(args.workers)
+    ]
+    log.info('workers started', extra={'workers': args.workers, 'bus': args.bus, 'urls': ','.join(urls)})
+
+    stopping = []
+
+    def stop(signum=None, frame=None):
+        stopping.append(signum)
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # If any worker dies, its rooms are unreachable; stop everything
+    while not stopping and all(worker.poll() is None for worker in workers):
+        time.sleep(0.5)
+    failed = [worker for worker in workers if worker.poll() is not None and not stopping]
+    stop()
+    for worker in workers:
+        worker.wait()
+    if failed:
+        log.error('worker exited', extra={'pid': failed[0].pid, 'code': failed[0].returncode})
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Merging bursts of room broadcasts, such as many players joining at once."""
+
+import heapq
+import time
+
+
+class BroadcastCoalescer:
+    """
+    Sends at most one state-change broadcast per room per window.
+
+    A room's first broadcast after a quiet spell goes out at once and opens
+    a window of `window` seconds. Broadcasts asked for while it is open are
+    held, and when it closes the room gets a single one, named after the
+    latest held event, carrying everything that changed meanwhile. That
+    starts another window, so a storm of joins costs one broadcast per
+    window instead of one per join. Replies to a single client are never
+    held.
+
+    Windows close in a background task, like the reaper's deadlines: a
+    heap of (deadline, room_code), and each closing goes through dispatch
+    so it happens in the room's turn (see room_queue.py).
+    """
+
+    def __init__(self, window=0.03, on_flush=None):
+        self.window = window  # seconds; 0 sends every broadcast at once
+        self.interval = window / 2  # seconds between checks for closed windows
+        self.on_flush = on_flush  # called with (room_code, event) to send a held broadcast
+        self.dispatch = lambda room_code, fn, *args: fn(*args)  # runs fn(*args) in the room's turn
+
+        self.heap = []  # [(deadline, room_code)] of open windows
+        self.open = set()  # rooms with an open window
+        self.held = {}  # {room_code: latest event held for the end of its window}
+        self.merged = 0  # broadcasts held and merged into another
+
+    def may_send(self, room_code, event):
+        """True if a room's broadcast can go out now; otherwise it is held and merged into the next."""
+        if not self.window:
+            return True
+        if room_code in self.open:
+            if room_code in self.held:
+                self.merged += 1
+            self.held[room_code] = event
+            return False
+        self.open_window(room_code)
+        return True
+
+    def open_window(self, room_code):
+        self.open.add(room_code)
+        heapq.heappush(self.heap, (time.monotonic() + self.window, room_code))
+
+    def close_window(self, room_code):
+        """Send what a room held, which keeps its window open for another round, or close it."""
+        event = self.held.pop(room_code, None)
+        if event is None:
+            self.open.discard(room_code)
+            return
+        heapq.heappush(self.heap, (time.monotonic() + self.window, room_code))
+        if self.on_flush:
+            self.on_flush(room_code, event)
+
+    def tick(self, now=None):
+        """Close the windows that are due; run every interval."""
+        if now is None:
+            now = time.monotonic()
+        while self.heap and self.heap[0][0] <= now:
+            _, room_code = heapq.heappop(self.heap)
+            self.dispatch(room_code, self.close_window, room_code)
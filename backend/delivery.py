@@ -0,0 +1,57 @@
+"""Sending many players their own payload for the same event."""
+
+from engineio import packet as eio_packet
+from socketio import packet
+
+from msgpack_wire import pack, packed_sids
+from wire import encode
+
+
+def encode_private(server, event, payloads, namespace='/'):
+    """
+    Build the packets for send_private: ([(eio_sid, engine.io packet)] for
+    clients connected here, [(sid, data)] for the others and for those
+    taking msgpack, whose data is packed already).
+    """
+    manager = server.manager
+    outgoing = []
+    remote = []
+    for sid, data in payloads.items():
+        if sid in packed_sids:
+            remote.append((sid, pack(data)))
+            continue
+        eio_sid = manager.eio_sid_from_sid(sid, namespace)
+        if eio_sid is None:
+            remote.append((sid, data))
+            continue
+        # Payloads are plain JSON, so skip the scans for binary and RawJSON parts
+        encoded = server.packet_class(
+            packet.EVENT, namespace=namespace, data=[event, encode(data)], binary=False).encode()
+        outgoing.append((eio_sid, eio_packet.Packet(eio_packet.MESSAGE, encoded)))
+    return outgoing, remote
+
+
+def send_private(server, event, payloads, namespace='/'):
+    """
+    Send every sid in `payloads` ({sid: data}) its own version of an event.
+
+    All packets are built and encoded before the first one is sent, then
+    written straight to each client's socket, so the sends happen as one
+    step with no room lookups in between. If anything fails to encode,
+    nobody receives the event. Sids that are not connected to this
+    process are handed to the normal emit path.
+    """
+    outgoing, remote = encode_private(server, event, payloads, namespace)
+    for eio_sid, eio_pkt in outgoing:
+        server._send_eio_packet(eio_sid, eio_pkt)
+    for sid, data in remote:
+        server.emit(event, data, to=sid, namespace=namespace)
+
+
+async def send_private_async(server, event, payloads, namespace='/'):
+    """send_private for a socketio.AsyncServer."""
+    outgoing, remote = encode_private(server, event, payloads, namespace)
+    for eio_sid, eio_pkt in outgoing:
+        await server._send_eio_packet(eio_sid, eio_pkt)
+    for sid, data in remote:
+        await server.emit(event, data, to=sid, namespace=namespace)
@@ -42,12 +42,16 @@ def assign_roles(player_count, undercover_count=None):
     return roles
 
 
-def assign_words(roles):
+def assign_words(roles, deck=None):
     """
     Assign words based on roles.
     Returns a list of words matching the roles list.
+    
+    Args:
+        roles: List of roles from assign_roles
+        deck: Optional word_bank.WordDeck to deal the pair from (random pair if None)
     """
-    civilian_word, undercover_word = get_random_word_pair()
+    civilian_word, undercover_word = deck.draw() if deck else get_random_word_pair()
     
     words = []
     for role in roles:
@@ -70,14 +74,23 @@ def check_win_condition(players):
     - Civilians win: All undercovers and mr white eliminated
     - Undercovers/Mr White win: Undercovers+MrWhite > Civilians (strictly outnumber)
     """
-    alive_players = [p for p in players if p['is_alive']]
+    alive_players = [p for p in players if p.is_alive]
     
-    if not alive_players:
-        return None
+    civilians = sum(1 for p in alive_players if p.role == 'civilian')
+    undercovers = sum(1 for p in alive_players if p.role == 'undercover')
+    mr_white = sum(1 for p in alive_players if p.role == 'mrwhite')
     
-    civilians = sum(1 for p in alive_players if p['role'] == 'civilian')
-    undercovers = sum(1 for p in alive_players if p['role'] == 'undercover')
-    mr_white = sum(1 for p in alive_players if p['role'] == 'mrwhite')
+    return check_win_counts(len(alive_players), civilians, undercovers, mr_white)
+
+
+def check_win_counts(alive, civilians, undercovers, mr_white):
+    """
+    Same as check_win_condition, from running counts of alive players.
+    alive: number of alive players (including any without a role yet)
+    civilians, undercovers, mr_white: alive players with each role
+    """
+    if not alive:
+        return None
     
     # Civilians win if all enemies eliminated
     if undercovers == 0 and mr_white == 0:
@@ -94,27 +107,95 @@ def tally_votes(votes, players):
     """
     Tally votes and determine who gets eliminated.
     votes: dict of {voter_id: voted_for_id}
-    players: list of player dicts
+    players: list of Player records
     
     Returns: (eliminated_player_id, vote_counts)
     """
-    vote_counts = {}
-    
-    # Count votes
-    for voted_for in votes.values():
-        vote_counts[voted_for] = vote_counts.get(voted_for, 0) + 1
+    tally = VoteTally()
+    for voter_id, voted_for in votes.items():
+        tally.cast(voter_id, voted_for)
     
-    if not vote_counts:
-        return None, {}
-    
-    # Find player with most votes
-    max_votes = max(vote_counts.values())
-    candidates = [pid for pid, count in vote_counts.items() if count == max_votes]
-    
-    # If tie, randomly select one
-    eliminated_id = random.choice(candidates)
+    return tally.pick(), dict(tally.counts)
+
+
+class VoteTally:
+    """
+    Running vote count for one voting phase.
+    Keeps the counts and the current leaders up to date as votes are cast
+    or changed, so the result is known without recounting.
+    """
     
-    return eliminated_id, vote_counts
+    def __init__(self):
+        self.votes = {}  # {voter_id: voted_for_id}
+        self.counts = {}  # {voted_for_id: vote_count}
+        self.leaders = set()  # players with max_votes
+        self.max_votes = 0
+    
+    def cast(self, voter_id, voted_for_id):
+        """Record a vote, replacing the voter's previous one."""
+        previous = self.votes.get(voter_id)
+        if previous == voted_for_id:
+            return
+        self.votes[voter_id] = voted_for_id
+        if previous is not None:
+            self._remove(previous)
+        self._add(voted_for_id)
+    
+    def retract(self, voter_id):
+        """Drop a voter's vote, if any."""
+        previous = self.votes.pop(voter_id, None)
+        if previous is not None:
+            self._remove(previous)
+    
+    def drop_candidate(self, voted_for_id):
+        """Drop every vote for a player, e.g. one who left. Their voters vote again."""
+        for voter_id in [v for v, target in self.votes.items() if target == voted_for_id]:
+            self.retract(voter_id)
+    
+    def is_decided(self, remaining):
+        """
+        Whether `remaining` uncast votes can no longer change who is eliminated.
+        A tie is never decided, since it is broken at random.
+        """
+        if len(self.leaders) != 1:
+            return False
+        runner_up = max(
+            (count for pid, count in self.counts.items() if pid not in self.leaders),
+            default=0
+        )
+        return self.max_votes - runner_up > remaining
+    
+    def pick(self):
+        """Get the player to eliminate, choosing randomly between tied leaders."""
+        if not self.leaders:
+            return None
+        # Follow vote order so results are reproducible under a fixed seed
+        return random.choice([pid for pid in self.counts if pid in self.leaders])
+    
+    def _add(self, voted_for_id):
+        count = self.counts.get(voted_for_id, 0) + 1
+        self.counts[voted_for_id] = count
+        if count > self.max_votes:
+            self.max_votes = count
+            self.leaders = {voted_for_id}
+        elif count == self.max_votes:
+            self.leaders.add(voted_for_id)
+    
+    def _remove(self, voted_for_id):
+        count = self.counts[voted_for_id] - 1
+        if count:
+            self.counts[voted_for_id] = count
+        else:
+            del self.counts[voted_for_id]
+        
+        if voted_for_id not in self.leaders:
+            return
+        if len(self.leaders) > 1:
+            self.leaders.discard(voted_for_id)
+        else:
+            # The sole leader lost a vote, so others may now share the lead
+            self.max_votes = max(self.counts.values(), default=0)
+            self.leaders = {pid for pid, c in self.counts.items() if c == self.max_votes}
 
 
 def validate_mr_white_guess(guess, civilian_word):
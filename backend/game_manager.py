@@ -1,39 +1,112 @@
 """Game room and state management."""
 
 import random
+import secrets
+import time
+from collections import deque
 from datetime import datetime
-from game_logic import assign_roles, assign_words, check_win_condition, tally_votes
+from game_logic import VoteTally, assign_roles, assign_words, check_win_counts
+from room_codes import RoomCodeAllocator
+from room_store import MemoryRoomStore
+from state_patch import diff_public_state
+from wire import encode
+from word_bank import DEFAULT_BANK
+
+# How many state versions a room remembers for clients catching up
+PATCH_LOG_SIZE = 64
+
+
+class Player:
+    """
+    A player seated in a room.
+    
+    The id is the socket id the player joined with and never changes. The
+    session token lets the player take the seat back from a new socket,
+    whose id is kept in `sid` (None while disconnected).
+    """
+    __slots__ = ('id', 'name', 'seat', 'is_host', 'role', 'word', 'is_alive', 'joined_at', 'token', 'sid')
+    
+    def __init__(self, player_id, name, seat, is_host=False, token=None):
+        self.id = player_id
+        self.name = name
+        self.seat = seat  # index into Room.seats
+        self.is_host = is_host
+        self.role = None
+        self.word = None
+        self.is_alive = True
+        self.joined_at = time.time()
+        self.token = token or secrets.token_urlsafe(16)
+        self.sid = player_id
+
+
+class Clue:
+    """A clue given during a round, referring to its player by seat."""
+    __slots__ = ('seat', 'clue', 'round')
+    
+    def __init__(self, seat, clue, round_number):
+        self.seat = seat
+        self.clue = clue
+        self.round = round_number
 
 
 class Room:
     """Manages a game room with players and game state."""
+    __slots__ = (
+        'room_code', 'host_id', 'manager', 'created_at', 'last_activity',
+        'undercover_count', 'early_vote_close', 'word_categories', 'word_deck',
+        'phase', 'players', 'seats', 'turn_order', 'current_turn_index', 'round_number',
+        'clues', 'tally', 'civilian_word', 'undercover_word', 'eliminated_player_id', 'winner',
+        'alive_count', 'alive_roles',
+        '_public_state', '_public_state_json',
+        'state_version', 'committed_state', 'patch_log', 'broadcast_version',
+    )
     
-    def __init__(self, room_code, host_id, host_name):
+    def __init__(self, room_code, host_id, host_name, manager=None, host_token=None):
         self.room_code = room_code
         self.host_id = host_id
+        self.manager = manager  # GameManager keeping the player index, if any
         self.created_at = datetime.now()
+        self.last_activity = time.monotonic()  # updated by mark_dirty()
         
         # Game settings (configurable by host)
         self.undercover_count = 2  # Default: 2 undercovers
+        self.early_vote_close = False  # End voting once the result is decided
+        self.word_categories = []  # Word bank categories to play (empty: all)
+        self.word_deck = None  # Deals word pairs without repeats, made on first game
         
         # Game state
         self.phase = 'lobby'  # lobby, playing, voting, mr_white_guess, results
-        self.players = {}  # {socket_id: player_data}
+        self.players = {}  # {socket_id: Player}
+        self.seats = []  # every Player who joined since clues were last cleared, indexed by Player.seat
         self.turn_order = []
         self.current_turn_index = 0
         self.round_number = 1
-        self.clues = []  # [{player_id, player_name, clue, round}]
-        self.votes = {}  # {voter_id: voted_for_id}
+        self.clues = []  # [Clue]
+        self.tally = VoteTally()  # votes of the current voting phase
         self.civilian_word = None
         self.undercover_word = None
         self.eliminated_player_id = None
         self.winner = None
         
+        # Running counts of alive players, kept in step with self.players
+        self.alive_count = 0
+        self.alive_roles = {'civilian': 0, 'undercover': 0, 'mrwhite': 0}
+        
+        # Cached public state, dropped by mark_dirty() on every mutation
+        self._public_state = None
+        self._public_state_json = None
+        
+        # Versioned public state (see state_patch.py)
+        self.state_version = 0
+        self.committed_state = None  # public state as of state_version
+        self.patch_log = deque(maxlen=PATCH_LOG_SIZE)  # [(version, ops)]
+        self.broadcast_version = 0  # last version sent to the whole room
+        
         # Add host as first player
-        self.add_player(host_id, host_name, is_host=True)
+        self.add_player(host_id, host_name, is_host=True, token=host_token)
     
-    def add_player(self, socket_id, player_name, is_host=False):
-        """Add a player to the room."""
+    def add_player(self, socket_id, player_name, is_host=False, token=None):
+        """Add a player to the room. Returns the Player, with its session token."""
         # If room is empty, first player is always host
         if not self.players:
             is_host = True
@@ -42,29 +115,102 @@ class Room:
         elif self.host_id not in self.players:
             is_host = True
             self.host_id = socket_id
-            
-
-
-        self.players[socket_id] = {
-            'id': socket_id,
-            'name': player_name,
-            'is_host': is_host,
-            'role': None,
-            'word': None,
-            'is_alive': True,
-            'joined_at': datetime.now()
-        }
+        
+        player = Player(socket_id, player_name, len(self.seats), is_host, token)
+        self.players[socket_id] = player
+        self.seats.append(player)
+        self.alive_count += 1
+        self.mark_dirty()
+        
+        if self.manager:
+            self.manager.index_player(socket_id, self.room_code, player.token)
+            self.manager.sid_players[socket_id] = socket_id
+        self.record('join', socket_id, player_name, is_host, player.token)
+        return player
     
     def remove_player(self, socket_id):
-        """Remove a player from the room."""
-        if socket_id in self.players:
-            del self.players[socket_id]
-            
-            # If host left, assign new host
-            if socket_id == self.host_id and self.players:
-                new_host_id = list(self.players.keys())[0]
-                self.host_id = new_host_id
-                self.players[new_host_id]['is_host'] = True
+        """
+        Remove a player from the room, keeping a game in progress playable.
+        Returns the players whose votes for them were dropped, who must vote again.
+        """
+        if socket_id not in self.players:
+            return []
+        voters = [v for v, target in self.tally.votes.items() if target == socket_id]
+        vote_due = self.drop_player(socket_id)
+        # Leaving can complete the vote, so the pick is journaled with the leave
+        eliminated_id = self.tally.pick() if vote_due else None
+        self.record('leave', socket_id, eliminated_id)
+        if vote_due:
+            self.process_votes(eliminated_id)
+        if self.phase != 'voting':
+            return []
+        return [v for v in voters if v in self.players]
+    
+    def drop_player(self, socket_id):
+        """
+        Take a player out of the room and out of the game in progress.
+        Returns True if everyone left has now voted, so the vote needs processing.
+        """
+        player = self.players.pop(socket_id)
+        if player.is_alive:
+            self.count_death(player)
+        self.compact_seats()  # in the lobby, where there are no clues
+        self.tally.retract(socket_id)
+        self.tally.drop_candidate(socket_id)
+        self.mark_dirty()
+        
+        if self.manager:
+            self.manager.unindex_player(socket_id, self.room_code, player.token)
+        self.detach(player)
+        
+        # If host left, assign new host
+        if socket_id == self.host_id and self.players:
+            new_host_id = list(self.players.keys())[0]
+            self.host_id = new_host_id
+            self.players[new_host_id].is_host = True
+        
+        if self.phase in ('lobby', 'results') or not self.players:
+            return False
+        
+        if socket_id in self.turn_order:
+            index = self.turn_order.index(socket_id)
+            self.turn_order = self.turn_order[:index] + self.turn_order[index + 1:]
+            if index < self.current_turn_index:
+                self.current_turn_index -= 1
+        
+        if self.phase == 'mr_white_guess':
+            if socket_id == self.eliminated_player_id:
+                # Mr. White left without guessing
+                self.winner = self.check_winner()
+                self.phase = 'results'
+            return False
+        
+        winner = self.check_winner()
+        if winner:
+            self.winner = winner
+            self.phase = 'results'
+            return False
+        
+        if self.phase == 'playing' and self.current_turn_index >= self.alive_count:
+            # Everyone still here has given a clue
+            self.phase = 'voting'
+            self.tally = VoteTally()
+        return self.phase == 'voting' and len(self.tally.votes) >= self.alive_count
+    
+    def attach(self, player, sid):
+        """Point a player's seat at a new socket."""
+        self.detach(player)
+        player.sid = sid
+        if self.manager:
+            self.manager.sid_players[sid] = player.id
+            self.manager.rooms.changed(self)
+    
+    def detach(self, player):
+        """Mark a player as disconnected, keeping their seat."""
+        if self.manager and player.sid is not None:
+            self.manager.sid_players.pop(player.sid, None)
+            self.manager.rooms.changed(self)
+        player.sid = None
     
     def start_game(self):
         """Initialize game with role and word assignments."""
@@ -77,37 +223,116 @@ class Room:
         # Validate undercover count
         max_undercovers = player_count - 2  # At least 1 civilian + 1 mr white
         if self.undercover_count > max_undercovers:
-            self.undercover_count = max_undercovers
+            self.set_undercover_count(max_undercovers)
         
         # Assign roles and words
         roles = assign_roles(player_count, self.undercover_count)
-        words, civilian_word, undercover_word = assign_words(roles)
-        
-        self.civilian_word = civilian_word
-        self.undercover_word = undercover_word
-        
-        # Assign to players
-        for i, player_id in enumerate(player_ids):
-            self.players[player_id]['role'] = roles[i]
-            self.players[player_id]['word'] = words[i]
+        if self.word_deck is None:
+            self.word_deck = DEFAULT_BANK.deck(self.word_categories)
+        words, civilian_word, undercover_word = assign_words(roles, self.word_deck)
         
         # Set random turn order, ensuring Mr. White never goes first
-        self.turn_order = player_ids.copy()
-        random.shuffle(self.turn_order)
+        turn_order = player_ids.copy()
+        random.shuffle(turn_order)
         
         # Check if first player is Mr. White
-        first_player_id = self.turn_order[0]
-        if self.players[first_player_id]['role'] == 'mrwhite':
+        role_of = dict(zip(player_ids, roles))
+        if role_of[turn_order[0]] == 'mrwhite':
             # Find a non-Mr. White player to swap with
-            for i in range(1, len(self.turn_order)):
-                if self.players[self.turn_order[i]]['role'] != 'mrwhite':
+            for i in range(1, len(turn_order)):
+                if role_of[turn_order[i]] != 'mrwhite':
                     # Swap Mr. White with this player
-                    self.turn_order[0], self.turn_order[i] = self.turn_order[i], self.turn_order[0]
+                    turn_order[0], turn_order[i] = turn_order[i], turn_order[0]
                     break
         
+        self.begin_game(roles, words, civilian_word, undercover_word, turn_order)
+    
+    def begin_game(self, roles, words, civilian_word, undercover_word, turn_order):
+        """Deal roles and words, in player order, and start the first round."""
+        self.civilian_word = civilian_word
+        self.undercover_word = undercover_word
+        
+        # Assign to players
+        for i, player in enumerate(self.players.values()):
+            player.role = roles[i]
+            player.word = words[i]
+        
+        self.alive_count = len(self.players)
+        self.alive_roles = {'civilian': 0, 'undercover': 0, 'mrwhite': 0}
+        for role in roles:
+            self.alive_roles[role] += 1
+        
+        self.turn_order = turn_order
         self.current_turn_index = 0
         self.phase = 'playing'
         self.round_number = 1
+        self.mark_dirty()
+        self.record('start', roles, words, civilian_word, undercover_word, turn_order)
+    
+    def set_undercover_count(self, undercover_count):
+        """Change the number of undercovers for the next game."""
+        self.undercover_count = undercover_count
+        self.mark_dirty()
+        self.record('undercover_count', undercover_count)
+    
+    def set_early_vote_close(self, enabled):
+        """Turn closing the vote as soon as the result is decided on or off."""
+        self.early_vote_close = enabled
+        self.mark_dirty()
+        self.record('early_vote_close', enabled)
+    
+    def set_word_categories(self, categories):
+        """Restrict word pairs to some categories (all if empty)."""
+        self.word_deck = DEFAULT_BANK.deck(categories)  # raises ValueError if unknown
+        self.word_categories = list(categories)
+        self.mark_dirty()
+        self.record('word_categories', self.word_categories)
+    
+    def reset(self):
+        """Reset the room to the lobby for another game."""
+        self.phase = 'lobby'
+        self.round_number = 1
+        self.current_turn_index = 0
+        self.clues = []
+        self.tally = VoteTally()
+        self.civilian_word = None
+        self.undercover_word = None
+        self.eliminated_player_id = None
+        self.winner = None
+        
+        for player in self.players.values():
+            player.role = None
+            player.word = None
+            player.is_alive = True
+        
+        self.alive_count = len(self.players)
+        self.alive_roles = {'civilian': 0, 'undercover': 0, 'mrwhite': 0}
+        self.compact_seats()
+        self.mark_dirty()
+        self.record('reset')
+    
+    def compact_seats(self):
+        """Drop the seats of players who left, unless a clue still refers to them."""
+        if self.clues or len(self.seats) == len(self.players):
+            return
+        self.seats = [p for p in self.seats if self.players.get(p.id) is p]
+        for seat, player in enumerate(self.seats):
+            player.seat = seat
+    
+    def count_death(self, player):
+        """Update the alive counts for a player who was eliminated or left."""
+        self.alive_count -= 1
+        if player.role:
+            self.alive_roles[player.role] -= 1
+    
+    def check_winner(self):
+        """Check the win condition from the alive counts."""
+        return check_win_counts(
+            self.alive_count,
+            self.alive_roles['civilian'],
+            self.alive_roles['undercover'],
+            self.alive_roles['mrwhite']
+        )
     
     def get_current_player(self):
         """Get the player whose turn it is."""
@@ -121,53 +346,57 @@ class Room:
             raise ValueError("Not your turn")
         
         # Record clue
-        self.clues.append({
-            'player_id': player_id,
-            'player_name': self.players[player_id]['name'],
-            'clue': clue,
-            'round': self.round_number
-        })
+        self.clues.append(Clue(self.players[player_id].seat, clue, self.round_number))
         
         # Move to next player
         self.current_turn_index += 1
+        self.mark_dirty()
+        self.record('clue', player_id, clue)
         
         # Check if round is complete
-        alive_players = [pid for pid in self.turn_order if self.players[pid]['is_alive']]
-        if self.current_turn_index >= len(alive_players):
+        if self.current_turn_index >= self.alive_count:
             # Round complete, move to voting
             self.phase = 'voting'
-            self.votes = {}
+            self.tally = VoteTally()
     
     def submit_vote(self, voter_id, voted_for_id):
         """Submit a vote for elimination."""
-        if not self.players[voter_id]['is_alive']:
+        if not self.players[voter_id].is_alive:
             raise ValueError("Dead players cannot vote")
         
-        self.votes[voter_id] = voted_for_id
+        self.tally.cast(voter_id, voted_for_id)
+        self.mark_dirty()
         
-        # Check if all alive players have voted
-        alive_players = [pid for pid in self.players if self.players[pid]['is_alive']]
-        if len(self.votes) >= len(alive_players):
-            # All votes in, process elimination
-            self.process_votes()
+        # Process elimination once all alive players have voted, or earlier
+        # if enabled and the remaining votes cannot change the result
+        remaining = self.alive_count - len(self.tally.votes)
+        if remaining <= 0 or (self.early_vote_close and self.tally.is_decided(remaining)):
+            eliminated_id = self.tally.pick()
+            self.record('vote', voter_id, voted_for_id, True, eliminated_id)
+            self.process_votes(eliminated_id)
+        else:
+            self.record('vote', voter_id, voted_for_id, False, None)
     
-    def process_votes(self):
-        """Process votes and eliminate a player."""
-        from game_logic import tally_votes
-        
-        eliminated_id, vote_counts = tally_votes(self.votes, list(self.players.values()))
-        
+    @property
+    def votes(self):
+        """Votes of the current voting phase: {voter_id: voted_for_id}."""
+        return self.tally.votes
+    
+    def process_votes(self, eliminated_id):
+        """Eliminate the player picked by the vote (none if nobody voted)."""
         if eliminated_id:
             self.eliminated_player_id = eliminated_id
             eliminated_player = self.players[eliminated_id]
-            eliminated_player['is_alive'] = False
+            eliminated_player.is_alive = False
+            self.count_death(eliminated_player)
+            self.mark_dirty()
             
             # Check if eliminated player is Mr. White
-            if eliminated_player['role'] == 'mrwhite':
+            if eliminated_player.role == 'mrwhite':
                 self.phase = 'mr_white_guess'
             else:
                 # Check win condition
-                winner = check_win_condition(list(self.players.values()))
+                winner = self.check_winner()
                 if winner:
                     self.winner = winner
                     self.phase = 'results'
@@ -179,13 +408,14 @@ class Room:
         """Start a new round of clue giving."""
         self.round_number += 1
         self.current_turn_index = 0
-        self.votes = {}
+        self.tally = VoteTally()
         self.eliminated_player_id = None
         
         # Update turn order to only include alive players
-        self.turn_order = [pid for pid in self.turn_order if self.players[pid]['is_alive']]
+        self.turn_order = [pid for pid in self.turn_order if self.players[pid].is_alive]
         
         self.phase = 'playing'
+        self.mark_dirty()
     
     def process_mr_white_guess(self, guess):
         """Process Mr. White's final guess."""
@@ -196,32 +426,99 @@ class Room:
             self.winner = 'mrwhite'
         else:
             # Check normal win condition
-            self.winner = check_win_condition(list(self.players.values()))
+            self.winner = self.check_winner()
         
         self.phase = 'results'
+        self.mark_dirty()
+        self.record('guess', guess)
+    
+    def record(self, op, *args):
+        """Journal an accepted mutation, if this room's manager keeps a journal."""
+        manager = self.manager
+        # Rooms are only journaled once created, so the host's join is part of 'create'
+        if manager and manager.journal and manager.rooms.holds(self):
+            manager.journal.append(self.room_code, op, args)
+    
+    def mark_dirty(self):
+        """Drop the cached public state after a mutation, and tell the store."""
+        self.last_activity = time.monotonic()
+        self._public_state = None
+        self._public_state_json = None
+        if self.manager:
+            self.manager.rooms.changed(self)
     
     def get_public_state(self):
-        """Get public game state (no sensitive info)."""
+        """Get public game state (no sensitive info), cached until the next mutation."""
+        if self._public_state is None:
+            self._public_state = self.build_public_state()
+        return self._public_state
+    
+    def get_public_state_json(self):
+        """Get the public state pre-encoded as JSON for emits."""
+        if self._public_state_json is None:
+            self._public_state_json = encode(self.get_public_state())
+        return self._public_state_json
+    
+    def build_public_state(self):
+        """Build the public state dict from scratch."""
+        seats = self.seats
         return {
             'room_code': self.room_code,
             'phase': self.phase,
             'player_count': len(self.players),
             'undercover_count': self.undercover_count,
+            'early_vote_close': self.early_vote_close,
+            'word_categories': self.word_categories,
             'players': [
                 {
-                    'id': p['id'],
-                    'name': p['name'],
-                    'is_host': p['is_host'],
-                    'is_alive': p['is_alive']
+                    'id': p.id,
+                    'name': p.name,
+                    'is_host': p.is_host,
+                    'is_alive': p.is_alive
                 }
                 for p in self.players.values()
             ],
             'current_turn': self.get_current_player() if self.phase == 'playing' else None,
             'round_number': self.round_number,
-            'clues': self.clues,
+            'clues': [
+                {
+                    'player_id': seats[c.seat].id,
+                    'player_name': seats[c.seat].name,
+                    'clue': c.clue,
+                    'round': c.round
+                }
+                for c in self.clues
+            ],
             'winner': self.winner
         }
     
+    def commit_state(self):
+        """Record public state changes since the last commit as a new version."""
+        state = self.get_public_state()
+        if state is self.committed_state:
+            return
+        if self.committed_state is not None:
+            ops = diff_public_state(self.committed_state, state)
+            if ops:
+                self.state_version += 1
+                self.patch_log.append((self.state_version, ops))
+        self.committed_state = state
+    
+    def get_patch_since(self, version):
+        """Get [version, ops] entries newer than version, or None if too old."""
+        if version >= self.state_version:
+            return []
+        if not self.patch_log or self.patch_log[0][0] > version + 1:
+            return None
+        return [[v, ops] for v, ops in self.patch_log if v > version]
+    
+    def take_broadcast_patch(self):
+        """Commit the state and get the entries not yet sent to the room."""
+        self.commit_state()
+        patch = self.get_patch_since(self.broadcast_version)
+        self.broadcast_version = self.state_version
+        return patch
+    
     def get_player_private_state(self, player_id):
         """Get private state for a specific player."""
         player = self.players.get(player_id)
@@ -229,36 +526,197 @@ class Room:
             return None
         
         return {
-            'role': player['role'],
-            'word': player['word'],
-            'is_alive': player['is_alive']
+            'role': player.role,
+            'word': player.word,
+            'is_alive': player.is_alive
+        }
+    
+    def to_record(self):
+        """The room's game state as compact JSON-ready data, for snapshots."""
+        return {
+            'code': self.room_code,
+            'host': self.host_id,
+            'created': self.created_at.timestamp(),
+            'settings': [self.undercover_count, self.early_vote_close, self.word_categories],
+            'deck': self.word_deck.to_record() if self.word_deck else None,
+            'phase': self.phase,
+            # Every seat, and whether its player is still in the room
+            'seats': [
+                [p.id, p.name, p.is_host, p.role, p.word, p.is_alive, p.joined_at,
+                 self.players.get(p.id) is p, p.token, p.sid]
+                for p in self.seats
+            ],
+            'turn_order': self.turn_order,
+            'turn': self.current_turn_index,
+            'round': self.round_number,
+            'clues': [[c.seat, c.clue, c.round] for c in self.clues],
+            'votes': list(self.tally.votes.items()),
+            'words': [self.civilian_word, self.undercover_word],
+            'eliminated': self.eliminated_player_id,
+            'winner': self.winner,
+            'version': self.state_version
+        }
+    
+    @classmethod
+    def from_record(cls, record, manager=None):
+        """Rebuild a room from to_record() output."""
+        room = cls.__new__(cls)
+        room.room_code = record['code']
+        room.host_id = record['host']
+        room.manager = manager
+        room.created_at = datetime.fromtimestamp(record['created'])
+        room.last_activity = time.monotonic()
+        
+        room.undercover_count, room.early_vote_close, room.word_categories = record['settings']
+        room.word_deck = DEFAULT_BANK.restore_deck(record['deck']) if record['deck'] else None
+        
+        room.phase = record['phase']
+        room.players = {}
+        room.seats = []
+        for seat, (player_id, name, is_host, role, word, is_alive, joined_at, seated, token, sid) in enumerate(record['seats']):
+            player = Player(player_id, name, seat, is_host, token)
+            player.role = role
+            player.word = word
+            player.is_alive = is_alive
+            player.joined_at = joined_at
+            player.sid = sid  # a socket of this process, unless restarted since
+            room.seats.append(player)
+            if seated:
+                room.players[player_id] = player
+                if manager:
+                    manager.index_player(player_id, room.room_code, token)
+        
+        room.turn_order = record['turn_order']
+        room.current_turn_index = record['turn']
+        room.round_number = record['round']
+        room.clues = [Clue(*clue) for clue in record['clues']]
+        room.tally = VoteTally()
+        for voter_id, voted_for_id in record['votes']:
+            room.tally.cast(voter_id, voted_for_id)
+        room.civilian_word, room.undercover_word = record['words']
+        room.eliminated_player_id = record['eliminated']
+        room.winner = record['winner']
+        
+        room.alive_count = 0
+        room.alive_roles = {'civilian': 0, 'undercover': 0, 'mrwhite': 0}
+        for player in room.players.values():
+            if player.is_alive:
+                room.alive_count += 1
+                if player.role:
+                    room.alive_roles[player.role] += 1
+        
+        room._public_state = None
+        room._public_state_json = None
+        room.state_version = record['version']
+        # Clients hold this state at this version; the next change is patched against it
+        room.committed_state = room.get_public_state()
+        room.patch_log = deque(maxlen=PATCH_LOG_SIZE)
+        room.broadcast_version = room.state_version
+        return room
+    
+    def resume_versions(self, replayed):
+        """
+        Start versioning again after recovery. Clients may have seen up to one
+        version per mutation replayed from the journal, so the version moves
+        past all of them, and the empty patch log sends everyone a full state.
+        """
+        self.state_version += replayed + 1
+        self.committed_state = None
+        self.patch_log.clear()
+        self.commit_state()
+        self.broadcast_version = self.state_version
+    
+    def get_private_states(self):
+        """Get private state for every player, as {player_id: state}."""
+        return {
+            player.id: {
+                'role': player.role,
+                'word': player.word,
+                'is_alive': player.is_alive
+            }
+            for player in self.players.values()
         }
 
 
 class GameManager:
     """Manages all game rooms."""
     
-    def __init__(self):
-        self.rooms = {}  # {room_code: Room}
+    def __init__(self, room_code_cooldown=0, owns=None, store=None):
+        self.rooms = store if store is not None else MemoryRoomStore()  # {room_code: Room}, see room_store.py
+        self.rooms.manager = self
+        self.player_rooms = {}  # {player_id: room_code}
+        self.sessions = {}  # {session token: player_id}
+        self.sid_players = {}  # {connected socket id: player_id}
+        # Only codes this worker owns, when rooms are sharded across workers
+        self.room_codes = RoomCodeAllocator(cooldown=room_code_cooldown, accept=owns)
+        for room_code in self.rooms.keys():
+            self.room_codes.reserve(room_code)  # kept by a persistent store
+        self.journal = None  # journal.Journal recording room mutations, if enabled
     
-    def create_room(self, room_code, host_id, host_name):
+    def new_room_code(self):
+        """Get an unused room code for create_room."""
+        return self.room_codes.allocate()
+    
+    def create_room(self, room_code, host_id, host_name, host_token=None):
         """Create a new game room."""
-        room = Room(room_code, host_id, host_name)
+        self.room_codes.reserve(room_code)
+        room = Room(room_code, host_id, host_name, manager=self, host_token=host_token)
         self.rooms[room_code] = room
+        if self.journal:
+            self.journal.append(room_code, 'create', (host_id, host_name, room.players[host_id].token))
         return room
     
+    def add_room(self, room):
+        """Take over a room rebuilt by Room.from_record."""
+        self.room_codes.reserve(room.room_code)
+        self.rooms[room.room_code] = room
+    
     def get_room(self, room_code):
         """Get a room by code."""
         return self.rooms.get(room_code)
     
     def delete_room(self, room_code):
         """Delete a room."""
-        if room_code in self.rooms:
-            del self.rooms[room_code]
+        room = self.rooms.pop(room_code, None)
+        if room:
+            for player in room.players.values():
+                self.unindex_player(player.id, room_code, player.token)
+                room.detach(player)
+            self.room_codes.release(room_code)
+            if self.journal:
+                self.journal.append(room_code, 'delete', ())
     
     def get_room_by_player(self, player_id):
         """Find which room a player is in."""
-        for room in self.rooms.values():
-            if player_id in room.players:
-                return room
-        return None
+        room_code = self.player_rooms.get(player_id)
+        if room_code is None:
+            return None
+        return self.rooms.get(room_code)
+    
+    def player_id_for(self, sid):
+        """The player a connected socket is playing as, or None."""
+        return self.sid_players.get(sid)
+    
+    def find_session(self, token):
+        """Get (room, player) for a session token, or (None, None) if it has expired."""
+        player_id = self.sessions.get(token)
+        if player_id is None:
+            # A room in a persistent store is indexed once it is loaded
+            room_code = self.rooms.find_session(token)
+            if room_code and self.get_room(room_code):
+                player_id = self.sessions.get(token)
+        room = self.get_room_by_player(player_id) if player_id else None
+        if room is None:
+            return None, None
+        return room, room.players[player_id]
+    
+    def index_player(self, player_id, room_code, token):
+        """Record which room a player is in, and their session token."""
+        self.player_rooms[player_id] = room_code
+        self.sessions[token] = player_id
+    
+    def unindex_player(self, player_id, room_code, token):
+        """Forget a player's room, unless they have since moved to another."""
+        if self.player_rooms.get(player_id) == room_code:
+            del self.player_rooms[player_id]
+        self.sessions.pop(token, None)
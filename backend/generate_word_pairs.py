@@ -0,0 +1,128 @@
+"""
+Generate word pairs for the word bank.
+
+Pairs are two words from the same category. Every possible pair is
+numbered, a sample of those numbers is drawn without replacement, and each
+number is turned back into its pair, so the run time is linear in the
+number of pairs written, however close the target is to the total.
+
+The output is a tab-separated file (category, civilian word, undercover
+word per line) that word_bank.py loads at startup, alongside its built-in
+pairs.
+
+Usage:
+    python generate_word_pairs.py [--target N] [--words words.json] [--output FILE] [--seed N]
+"""
+
+import argparse
+import json
+import random
+from bisect import bisect_right
+from math import comb, isqrt
+
+from word_bank import WORD_PAIRS_FILE
+
+CATEGORIES = {
+    "food": [
+        "coffee","tea","juice","soda","beer","wine","burger","sandwich","pizza","pasta",
+        "rice","noodles","bread","toast","cake","pie","soup","stew","chicken","turkey",
+        "beef","pork","fish","shrimp","carrot","potato","tomato","pepper","apple","orange",
+        "banana","grape","mango","lemon","cheese","butter","milk","yogurt","egg","bacon"
+    ],
+    "animals": [
+        "dog","cat","wolf","fox","lion","tiger","bear","panda","horse","donkey","zebra",
+        "cow","goat","sheep","deer","rabbit","mouse","rat","elephant","giraffe","monkey",
+        "eagle","hawk","owl","parrot","crow","duck","goose"
+    ],
+    "objects": [
+        "chair","sofa","table","desk","bed","lamp","clock","watch","phone","tablet",
+        "laptop","desktop","keyboard","mouse","monitor","camera","fan","fridge","oven",
+        "bottle","cup","mug","glass","plate","bowl","fork","spoon","knife"
+    ],
+    "nature": [
+        "sun","moon","star","cloud","rain","snow","storm","wind","thunder","lightning",
+        "fire","flame","ice","frost","river","stream","lake","ocean","sea","pond",
+        "mountain","hill","forest","desert","beach","tree","bush","grass","rose","tulip"
+    ],
+    "sports": [
+        "football","cricket","tennis","basketball","volleyball","baseball","hockey",
+        "golf","boxing","cycling","running","swimming","skiing"
+    ],
+    "music": [
+        "guitar","piano","violin","drum","flute","trumpet","saxophone","tabla","sitar",
+        "banjo","ukulele","cello","harp"
+    ],
+    "transport": [
+        "car","bus","truck","van","bike","motorcycle","scooter","train","subway",
+        "tram","ship","boat","plane","jet","helicopter"
+    ],
+    "clothes": [
+        "shirt","blouse","pants","jeans","shorts","skirt","dress","jacket","coat",
+        "sweater","hoodie","scarf","hat","shoes","boots","sandals","sneakers","socks"
+    ]
+}
+
+
+def unrank_pair(rank, n):
+    """Return the (i, j) with i < j < n at position `rank` in row-major order."""
+    i = n - 2 - (isqrt(4 * n * (n - 1) - 8 * rank - 7) - 1) // 2
+    j = rank + i + 1 - n * (n - 1) // 2 + (n - i) * (n - i - 1) // 2
+    return i, j
+
+
+def generate_pairs(categories, target=1000, rng=random):
+    """
+    Sample up to `target` distinct same-category pairs.
+    Yields (category, word_a, word_b) with the two words in random order.
+    """
+    names, word_lists, starts = [], [], []
+    total = 0
+    for name, words in categories.items():
+        words = list(dict.fromkeys(words))  # drop duplicate words
+        if len(words) < 2:
+            continue
+        names.append(name)
+        word_lists.append(words)
+        starts.append(total)
+        total += comb(len(words), 2)
+
+    for rank in rng.sample(range(total), min(target, total)):
+        c = bisect_right(starts, rank) - 1
+        words = word_lists[c]
+        i, j = unrank_pair(rank - starts[c], len(words))
+        a, b = words[i], words[j]
+        yield (names[c], a, b) if rng.random() < 0.5 else (names[c], b, a)
+
+
+def write_pairs(pairs, path):
+    """Write pairs as tab-separated lines. Returns the number written."""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for category, a, b in pairs:
+            f.write(f"{category}\t{a}\t{b}\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', type=int, default=1000, help='number of pairs to generate')
+    parser.add_argument('--words', help='JSON file of {category: [words]} to use instead of the built-in lists')
+    parser.add_argument('--output', default=WORD_PAIRS_FILE, help='file to write')
+    parser.add_argument('--seed', type=int, help='random seed, for reproducible output')
+    args = parser.parse_args()
+
+    categories = CATEGORIES
+    if args.words:
+        with open(args.words, encoding='utf-8') as f:
+            categories = json.load(f)
+
+    rng = random.Random(args.seed)
+    count = write_pairs(generate_pairs(categories, args.target, rng), args.output)
+    if count < args.target:
+        print(f"Only {count} distinct pairs exist in these categories")
+    print(f"Saved {count} pairs to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+Append-only journal of room mutations, with snapshots, for surviving restarts.
+
+Every accepted mutation is appended as one JSON line, [room_code, op, *args].
+Random outcomes (roles, words, turn order, tie-breaks) are recorded with the
+mutation that drew them, so replaying a journal rebuilds the same rooms.
+Lines are buffered and handed over together on an interval to a writer
+thread, which writes and fsyncs them. A crash loses at most that interval
+and the write in progress.
+
+Snapshots hold every room in compact form. Each snapshot starts a new
+journal file, so recovery loads the latest snapshot and replays only the
+journal written after it. The rooms' records are taken between handlers,
+so they are consistent; encoding and writing them is the writer's job.
+
+The writer is an OS thread even under eventlet: fsync is not green, and
+would stall every connection if run on the hub.
+"""
+
+import gc
+import glob
+import json
+import os
+import time
+
+from game_manager import Room
+from log_config import get_logger
+from utils import original_module
+
+log = get_logger('journal')
+
+# Unpatched, for the writer thread, if the server is monkey patched
+threading = original_module('threading')
+queue = original_module('queue')
+
+SNAPSHOT_FILE = 'snapshot.json'
+
+
+class Journal:
+    """Durable record of a GameManager's rooms."""
+
+    def __init__(self, game_manager, directory, fsync_interval=0.1, snapshot_interval=300):
+        self.game_manager = game_manager
+        self.directory = directory
+        self.fsync_interval = fsync_interval  # seconds between batched writes
+        self.snapshot_interval = snapshot_interval  # seconds between snapshots
+        os.makedirs(directory, exist_ok=True)
+
+        self.generation = 0  # journal-<generation>.log follows snapshot <generation>
+        self.buffer = []  # encoded entries not yet handed to the writer
+        self.written_since_snapshot = 0
+        self.last_snapshot = time.monotonic()
+
+        # The writer's state; only the writer thread touches the file
+        self.jobs = queue.Queue()  # (method, args), written in order
+        self.file = None
+        self.file_generation = None
+        self.writer = None
+
+    def journal_path(self, generation):
+        return os.path.join(self.directory, f"journal-{generation:08d}.log")
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    def append(self, room_code, op, args):
+        """Buffer one mutation. It is durable after the next flush()."""
+        self.buffer.append(json.dumps([room_code, op, *args], separators=(',', ':')))
+
+    def flush(self):
+        """Hand everything buffered to the writer, to be written and fsynced as one write."""
+        if not self.buffer:
+            return
+        entries, self.buffer = self.buffer, []
+        self.submit(self.write_entries, self.generation, entries)
+        self.written_since_snapshot += len(entries)
+
+    def snapshot(self):
+        """
+        Take every room's record and start a new journal file; the writer
+        saves the snapshot. Returns the rooms saved.
+        """
+        self.flush()
+        generation = self.generation + 1
+        gc.disable()  # as in recover(), the records are all kept until written
+        try:
+            # Records share no lists that rooms change in place, so the
+            # writer can encode them while the rooms move on
+            rooms = [room.to_record() for room in self.game_manager.rooms.values()]
+        finally:
+            gc.enable()
+        self.submit(self.write_snapshot, generation, rooms)
+        self.generation = generation
+        self.written_since_snapshot = 0
+        self.last_snapshot = time.monotonic()
+        return len(rooms)
+
+    def submit(self, method, *args):
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_forever, name='journal', daemon=True)
+            self.writer.start()
+        self.jobs.put((method, args))
+
+    def wait(self):
+        """Block until everything handed to the writer is on disk."""
+        self.jobs.join()
+
+    def write_forever(self):
+        """The writer thread: run jobs in order until close()."""
+        while True:
+            method, args = self.jobs.get()
+            try:
+                if method is None:
+                    return
+                method(*args)
+            except Exception:
+                log.exception('journal write failed')
+            finally:
+                self.jobs.task_done()
+
+    def write_entries(self, generation, entries):
+        if self.file_generation != generation:
+            self.close_file()
+            self.file = open(self.journal_path(generation), 'a', encoding='utf-8')
+            self.file_generation = generation
+        self.file.write('\n'.join(entries) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def write_snapshot(self, generation, rooms):
+        # One room at a time, so the loop gets the GIL back between them
+        header = json.dumps({'generation': generation, 'taken_at': time.time()}, separators=(',', ':'))
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(header[:-1] + ',"rooms":[')
+            for i, record in enumerate(rooms):
+                # json.dump would use the much slower pure-Python encoder
+                f.write((',' if i else '') + json.dumps(record, separators=(',', ':')))
+            f.write(']}')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        self.close_file()
+
+        # Everything in older journals is in the snapshot now
+        for path, file_generation in self.journal_files():
+            if file_generation < generation:
+                os.remove(path)
+
+    def close_file(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+            self.file_generation = None
+
+    def journal_files(self):
+        """[(path, generation)] of journal files on disk, oldest first."""
+        files = []
+        for path in glob.glob(os.path.join(self.directory, 'journal-*.log')):
+            try:
+                files.append((path, int(os.path.basename(path)[8:-4])))
+            except ValueError:
+                continue
+        return sorted(files, key=lambda item: item[1])
+
+    def recover(self):
+        """
+        Rebuild the game manager's rooms from the latest snapshot and the
+        journal after it, then start journaling into it. Returns counts of
+        what was restored.
+        """
+        # Rebuilding rooms allocates millions of objects that all stay alive;
+        # the cyclic GC would keep rescanning them for nothing
+        gc.disable()
+        try:
+            return self._recover()
+        finally:
+            gc.enable()
+
+    def _recover(self):
+        manager = self.game_manager
+        generation = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            generation = snapshot['generation']
+            for record in snapshot['rooms']:
+                manager.add_room(Room.from_record(record, manager))
+        restored = len(manager.rooms)
+
+        replayed = {}  # {room_code: entries replayed}
+        entries = 0
+        for path, file_generation in self.journal_files():
+            if file_generation < generation:
+                continue
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        room_code, op, *args = json.loads(line)
+                    except ValueError:
+                        log.warning('skipped torn journal entry', extra={'file': path})
+                        continue
+                    try:
+                        apply_entry(manager, room_code, op, args)
+                    except (KeyError, ValueError, IndexError, TypeError):
+                        log.exception('could not replay journal entry',
+                                      extra={'room': room_code, 'op': op})
+                    replayed[room_code] = replayed.get(room_code, 0) + 1
+                    entries += 1
+            self.generation = max(self.generation, file_generation)
+        self.generation = max(self.generation, generation)
+
+        for room_code, room in manager.rooms.items():
+            room.resume_versions(replayed.get(room_code, 0))
+            # Nobody is connected yet; players resume their seats with their tokens
+            for player in room.players.values():
+                room.detach(player)
+
+        manager.journal = self
+        # Start clean: a fresh snapshot, and no appending after a torn line
+        self.snapshot()
+        self.wait()
+        result = {'snapshot_rooms': restored, 'replayed': entries, 'rooms': len(manager.rooms)}
+        log.info('recovered rooms', extra=result)
+        return result
+
+    def close(self):
+        """Write what is left and stop the writer."""
+        self.flush()
+        if self.writer is not None:
+            self.jobs.put((None, ()))
+            self.writer.join()
+            self.writer = None
+            self.close_file()
+
+    def tick(self):
+        """Flush, and snapshot when one is due; run every fsync_interval."""
+        try:
+            self.flush()
+            if (self.written_since_snapshot
+                    and time.monotonic() - self.last_snapshot >= self.snapshot_interval):
+                rooms = self.snapshot()
+                log.info('took snapshot', extra={'rooms': rooms, 'generation': self.generation})
+        except Exception:
+            log.exception('journal snapshot failed')
+
+
+def apply_entry(manager, room_code, op, args):
+    """Replay one journal entry against a game manager that is not journaling."""
+    if op == 'create':
+        manager.create_room(room_code, *args)
+        return
+    room = manager.get_room(room_code)
+    if room is None:
+        raise KeyError(room_code)
+
+    if op == 'delete':
+        manager.delete_room(room_code)
+    elif op == 'join':
+        room.add_player(*args)
+    elif op == 'leave':
+        socket_id, eliminated_id = args
+        if room.drop_player(socket_id):
+            room.process_votes(eliminated_id)
+    elif op == 'undercover_count':
+        room.set_undercover_count(*args)
+    elif op == 'early_vote_close':
+        room.set_early_vote_close(*args)
+    elif op == 'word_categories':
+        room.set_word_categories(*args)
+    elif op == 'start':
+        room.begin_game(*args)
+    elif op == 'clue':
+        room.submit_clue(*args)
+    elif op == 'vote':
+        voter_id, voted_for_id, processed, eliminated_id = args
+        room.tally.cast(voter_id, voted_for_id)
+        room.mark_dirty()
+        if processed:
+            room.process_votes(eliminated_id)
+    elif op == 'guess':
+        room.process_mr_white_guess(*args)
+    elif op == 'reset':
+        room.reset()
+    else:
+        raise ValueError(f"Unknown journal op: {op}")
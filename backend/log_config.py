@@ -0,0 +1,155 @@
+"""
+Structured logging for the backend.
+
+Components log through `get_logger(name)`. Records are put on a bounded
+queue and written by a background thread, so a handler never waits on
+stdout; if the writer falls behind, records are dropped and counted
+instead. The thread and queue are the unpatched ones under eventlet, or
+the writer would be a green thread blocking the hub on stdout. Levels are set per component from the environment:
+
+    LOG_LEVEL=INFO                                  default for every component
+    LOG_LEVELS=connections=WARNING,rooms=DEBUG      per-component overrides
+    LOG_FORMAT=text                                 or json
+    LOG_SAMPLE_CONNECTIONS=10                       log 1 in N connects/disconnects
+    SOCKETIO_LOGGER=0 / ENGINEIO_LOGGER=0           library packet logs, off by default
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import time
+
+from utils import original_module
+
+ROOT = 'undercover'
+
+queue = original_module('queue')
+threading = original_module('threading')
+
+# LogRecord attributes that are not extra fields
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+def get_logger(component):
+    """Logger for one part of the backend, e.g. 'rooms' or 'reaper'."""
+    return logging.getLogger(f"{ROOT}.{component}")
+
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record, as key=value pairs or JSON, including extra fields."""
+
+    def __init__(self, style='text'):
+        super().__init__()
+        self.json = style == 'json'
+
+    def format(self, record):
+        fields = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                  + f".{int(record.msecs):03d}Z",
+            'level': record.levelname.lower(),
+            'component': record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + '.') else record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                fields[key] = value
+        if self.json:
+            return json.dumps(fields, default=str)
+        return ' '.join(f"{key}={_quote(value)}" for key, value in fields.items())
+
+
+def _quote(value):
+    text = str(value)
+    if not text or any(c in text for c in ' ="\n'):
+        return json.dumps(text)
+    return text
+
+
+class SampleFilter(logging.Filter):
+    """Let one record in every `every` through, tagged with the rate."""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+        self.seen = 0
+
+    def filter(self, record):
+        self.seen += 1
+        if (self.seen - 1) % self.every:
+            return False
+        record.sampled = f"1/{self.every}"
+        return True
+
+
+class ThreadQueueListener(logging.handlers.QueueListener):
+    """A QueueListener whose thread is an OS thread, even when threading is monkey patched."""
+
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor, name='log-writer', daemon=True)
+        self._thread.start()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that drops records when the queue is full instead of blocking."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _env_flag(name):
+    return os.getenv(name, '0').lower() in ('1', 'true', 'yes', 'on')
+
+
+def setup_logging():
+    """Configure the backend's loggers from the environment. Safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(_level(os.getenv('LOG_LEVEL', 'INFO'), logging.INFO))
+    root.propagate = False
+
+    for item in filter(None, os.getenv('LOG_LEVELS', '').split(',')):
+        component, _, level = item.partition('=')
+        get_logger(component.strip()).setLevel(_level(level, root.level))
+
+    sample = int(os.getenv('LOG_SAMPLE_CONNECTIONS', '10'))
+    if sample > 1:
+        get_logger('connections').addFilter(SampleFilter(sample))
+
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(StructuredFormatter(os.getenv('LOG_FORMAT', 'text')))
+    log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+    root.addHandler(DroppingQueueHandler(log_queue))
+
+    _listener = ThreadQueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def _level(name, default):
+    level = logging.getLevelName(name.strip().upper())
+    return level if isinstance(level, int) else default
+
+
+def socketio_logger():
+    """The `logger` argument for SocketIO: off unless SOCKETIO_LOGGER is set."""
+    return get_logger('socketio') if _env_flag('SOCKETIO_LOGGER') else False
+
+
+def engineio_logger():
+    """The `engineio_logger` argument for SocketIO: off unless ENGINEIO_LOGGER is set."""
+    return get_logger('engineio') if _env_flag('ENGINEIO_LOGGER') else False
@@ -0,0 +1,71 @@
+"""Event-loop lag measurement for the readiness check."""
+
+import asyncio
+import time
+from collections import deque
+
+
+class LagMonitor:
+    """
+    Measures how late a sleeping background task wakes up.
+
+    The probe sleeps for a fixed interval and records how far past the
+    interval it actually woke. On a healthy loop that is close to zero.
+    When handlers hog the worker, every other greenlet or task, including this
+    one, waits for them, and the lag shows how long.
+    """
+
+    def __init__(self, interval=0.25, window=60, max_p99=0.1, max_lag=1.0):
+        self.interval = interval  # seconds between probes
+        self.max_p99 = max_p99  # degraded above this 99th percentile lag
+        self.max_lag = max_lag  # ... or above this single lag
+        self.samples = deque(maxlen=max(int(window / interval), 1))  # recent lags, in seconds
+        self.next_wake = None  # when the probe in flight should wake up
+
+    def record(self, lag):
+        self.samples.append(max(lag, 0.0))
+
+    def pending_lag(self, now=None):
+        """How overdue the probe in flight is, for a loop blocked right now."""
+        if self.next_wake is None:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+        return max(now - self.next_wake, 0.0)
+
+    def summary(self):
+        """Lag statistics over the window, in seconds."""
+        lags = sorted(self.samples)
+        if not lags:
+            return {'samples': 0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0, 'pending': self.pending_lag()}
+        return {
+            'samples': len(lags),
+            'p50': lags[len(lags) // 2],
+            'p99': lags[min(int(len(lags) * 0.99), len(lags) - 1)],
+            'max': lags[-1],
+            'pending': self.pending_lag()
+        }
+
+    def status(self):
+        """('ready' or 'degraded', summary)."""
+        summary = self.summary()
+        degraded = (
+            summary['p99'] > self.max_p99
+            or summary['max'] > self.max_lag
+            or summary['pending'] > self.max_lag
+        )
+        return ('degraded' if degraded else 'ready'), summary
+
+    def run(self, socketio):
+        """Probe forever; started with socketio.start_background_task."""
+        while True:
+            self.next_wake = time.monotonic() + self.interval
+            socketio.sleep(self.interval)
+            self.record(time.monotonic() - self.next_wake)
+
+    async def run_async(self):
+        """Probe forever as an asyncio task."""
+        while True:
+            self.next_wake = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(time.monotonic() - self.next_wake)
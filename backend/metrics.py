@@ -0,0 +1,207 @@
+"""Counters and latency histograms for Socket.IO handlers, in Prometheus text format."""
+
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Bytes sent outside any handler (background tasks) are counted under this name
+BACKGROUND = 'background'
+
+# The event whose handler is running in this thread, greenlet or task
+current_event = ContextVar('current_event', default=BACKGROUND)
+
+
+class Histogram:
+    """Fixed-bucket histogram, stored as per-bucket counts plus a running sum."""
+
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def cumulative(self):
+        """[(upper bound, observations at or below it)], ending with +Inf."""
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+class EventStats:
+    """What has been measured for one event name."""
+
+    __slots__ = ('calls', 'errors', 'latency', 'bytes_out')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0  # handler raised, or replied with an 'error' event
+        self.latency = Histogram()
+        self.bytes_out = 0  # payload bytes emitted while handling it
+
+
+class Metrics:
+    """
+    Per-event handler metrics plus gauges read from the game manager, the
+    event-loop lag monitor and the rate limiter.
+
+    Handlers are wrapped with track(). Outgoing packets are counted by
+    watch_server(), which charges their size to the handler running when
+    they were sent.
+    """
+
+    def __init__(self, game_manager=None, lag_monitor=None, limiter=None):
+        self.game_manager = game_manager
+        self.lag_monitor = lag_monitor
+        self.limiter = limiter
+        self.events = {}  # {event: EventStats}
+        self.started_at = time.time()
+
+    def stats(self, event):
+        stats = self.events.get(event)
+        if stats is None:
+            stats = self.events[event] = EventStats()
+        return stats
+
+    def track(self, event, handler):
+        """Wrap a handler so its calls, latency and errors are recorded."""
+        stats = self.stats(event)
+
+        if inspect.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def tracked_async(*args, **kwargs):
+                token = current_event.set(event)
+                start = time.perf_counter()
+                try:
+                    return await handler(*args, **kwargs)
+                except Exception:
+                    stats.errors += 1
+                    raise
+                finally:
+                    stats.calls += 1
+                    stats.latency.observe(time.perf_counter() - start)
+                    current_event.reset(token)
+
+            return tracked_async
+
+        @functools.wraps(handler)
+        def tracked(*args, **kwargs):
+            token = current_event.set(event)
+            start = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                stats.calls += 1
+                stats.latency.observe(time.perf_counter() - start)
+                current_event.reset(token)
+
+        return tracked
+
+    def watch_server(self, server):
+        """Count the bytes of every packet a socketio.Server or AsyncServer sends."""
+        send_packet, send_eio_packet = server._send_packet, server._send_eio_packet
+
+        if server.is_asyncio_based():
+            async def counted_send_packet(eio_sid, pkt):
+                self.count_sent(pkt.encode())
+                await send_packet(eio_sid, pkt)
+
+            async def counted_send_eio_packet(eio_sid, eio_pkt):
+                self.count_sent(eio_pkt.data)
+                await send_eio_packet(eio_sid, eio_pkt)
+        else:
+            def counted_send_packet(eio_sid, pkt):
+                self.count_sent(pkt.encode())
+                send_packet(eio_sid, pkt)
+
+            def counted_send_eio_packet(eio_sid, eio_pkt):
+                self.count_sent(eio_pkt.data)
+                send_eio_packet(eio_sid, eio_pkt)
+
+        server._send_packet = counted_send_packet
+        server._send_eio_packet = counted_send_eio_packet
+
+    def count_sent(self, data):
+        """Count an encoded packet: text, a binary attachment, or a list of text and attachments."""
+        stats = self.stats(current_event.get())
+        if isinstance(data, list):
+            stats.bytes_out += sum(len(part) for part in data)
+            data = data[0]
+        else:
+            stats.bytes_out += len(data)
+        if isinstance(data, str) and data.startswith(('2["error",', '51-["error",')):
+            stats.errors += 1
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+
+        events = sorted(self.events.items())
+        metric('undercover_events_total', 'counter', 'Socket.IO events handled.',
+               [(f'{{event="{e}"}}', s.calls) for e, s in events if e != BACKGROUND])
+        metric('undercover_event_errors_total', 'counter',
+               'Events whose handler raised or replied with an error.',
+               [(f'{{event="{e}"}}', s.errors) for e, s in events if e != BACKGROUND])
+        metric('undercover_emitted_bytes_total', 'counter',
+               'Payload bytes sent while handling each event.',
+               [(f'{{event="{e}"}}', s.bytes_out) for e, s in events])
+
+        samples = []
+        for e, s in events:
+            if e == BACKGROUND:
+                continue
+            for bound, count in s.latency.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                samples.append((f'_bucket{{event="{e}",le="{le}"}}', count))
+            samples.append((f'_sum{{event="{e}"}}', round(s.latency.sum, 6)))
+            samples.append((f'_count{{event="{e}"}}', s.latency.count))
+        metric('undercover_event_seconds', 'histogram', 'Handler latency.', samples)
+
+        if self.game_manager is not None:
+            phases = self.game_manager.rooms.count_by_phase()
+            metric('undercover_rooms', 'gauge', 'Live rooms.', [('', sum(phases.values()))])
+            metric('undercover_players', 'gauge', 'Players seated in rooms.',
+                   [('', len(self.game_manager.player_rooms))])
+            metric('undercover_rooms_by_phase', 'gauge', 'Live rooms in each game phase.',
+                   [(f'{{phase="{p}"}}', n) for p, n in sorted(phases.items())])
+
+        if self.lag_monitor is not None:
+            lag = self.lag_monitor.summary()
+            metric('undercover_loop_lag_seconds', 'gauge', 'Event-loop wake-up lag over the recent window.',
+                   [(f'{{quantile="{q}"}}', round(lag[key], 6))
+                    for q, key in (('0.5', 'p50'), ('0.99', 'p99'), ('1', 'max'))])
+
+        if self.limiter is not None:
+            metric('undercover_connections', 'gauge', 'Open connections.', [('', len(self.limiter.sids))])
+            metric('undercover_rate_limited_total', 'counter',
+                   'Connections and events turned away by the rate limits or caps.',
+                   [(f'{{event="{e}"}}', n) for e, n in sorted(self.limiter.rejected.items())])
+
+        metric('undercover_uptime_seconds', 'gauge', 'Seconds since the server started.',
+               [('', round(time.time() - self.started_at, 3))])
+        return '\n'.join(lines) + '\n'
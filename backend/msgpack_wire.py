@@ -0,0 +1,92 @@
+"""
+Opt-in msgpack encoding of event payloads.
+
+A client that connects with auth {'encoding': 'msgpack'} receives the data
+of every event as a single binary attachment instead of JSON text, packed
+with msgpack. Every dict key found in KEYS is replaced by its index there,
+as is the field a patch's 'set' op names (see state_patch.py), so the
+keys repeated in every state (game_state, players, is_alive, player_name,
+...) cost one byte each. Other keys stay strings. The client's 'connected'
+event carries KEYS, so it can map them back. Events the client sends are
+plain JSON either way.
+
+JSON remains the default; see wire.py.
+"""
+
+import json
+
+import msgpack
+
+from wire import RawJSON
+
+# Clients decode keys by their position here, so only ever append
+KEYS = (
+    # Event payloads
+    'game_state', 'patch', 'version', 'player_data', 'all_players', 'room_code', 'player_id',
+    'session_token', 'eliminated_player_id', 'civilian_word', 'undercover_word', 'mr_white_guess',
+    'message', 'reason',
+    # game_state, see Room.build_public_state
+    'phase', 'player_count', 'undercover_count', 'early_vote_close', 'word_categories', 'players',
+    'current_turn', 'round_number', 'clues', 'winner',
+    # Players and clues in game_state and all_players, and player_data
+    'id', 'name', 'is_host', 'is_alive', 'player_name', 'clue', 'round', 'role', 'word'
+)
+KEY_INDEX = {key: index for index, key in enumerate(KEYS)}
+PATCH = KEY_INDEX['patch']
+
+# Sids of the clients connected here that asked for msgpack
+packed_sids = set()
+
+
+def compact(obj):
+    """obj with schema keys replaced by their index; RawJSON is decoded first."""
+    if isinstance(obj, RawJSON):
+        obj = json.loads(obj)
+    if isinstance(obj, dict):
+        obj = {KEY_INDEX.get(key, key): compact(value) for key, value in obj.items()}
+        if PATCH in obj:
+            obj[PATCH] = [[version, [compact_op(op) for op in ops]] for version, ops in obj[PATCH]]
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return [compact(value) for value in obj]
+    return obj
+
+
+def compact_op(op):
+    if op[0] == 'set':
+        return ['set', KEY_INDEX.get(op[1], op[1]), op[2]]
+    return op
+
+
+def pack(data):
+    """An event's data as msgpack bytes."""
+    return msgpack.packb(compact(data))
+
+
+def expand(obj, keys=KEYS):
+    """Undo compact(), as a client does."""
+    if isinstance(obj, dict):
+        obj = {keys[key] if isinstance(key, int) else key: expand(value, keys) for key, value in obj.items()}
+        if 'patch' in obj:
+            for _, ops in obj['patch']:
+                for op in ops:
+                    if op[0] == 'set' and isinstance(op[1], int):
+                        op[1] = keys[op[1]]
+        return obj
+    if isinstance(obj, list):
+        return [expand(value, keys) for value in obj]
+    return obj
+
+
+def unpack(data, keys=KEYS):
+    """Decode what pack() made."""
+    return expand(msgpack.unpackb(data, strict_map_key=False), keys)
+
+
+def packed_members(server, to, namespace='/'):
+    """The clients that take msgpack among those an emit to `to` (a room or sid) reaches."""
+    if not packed_sids:
+        return []
+    if to in packed_sids:
+        return [to]
+    return [sid for sid, _ in server.manager.get_participants(namespace, to) if sid in packed_sids]
@@ -0,0 +1,124 @@
+"""
+What a handler sends, collected while it runs and sent once it returns.
+
+Handlers call emit(), join_room() and the rest much as they would
+Flask-SocketIO's, and read the client's sid from request.sid, but nothing
+is sent yet: each call is recorded in the current Outbox. Whichever server
+ran the handler then delivers it, with send() on the eventlet server
+(socketio.Server, see socket_handlers.py) or send_async() on the asyncio
+one (socketio.AsyncServer, see asgi.py). Game logic never waits on the
+network, so one set of handlers serves both.
+"""
+
+from contextvars import ContextVar
+
+from delivery import send_private as deliver_private, send_private_async as deliver_private_async
+from msgpack_wire import pack, packed_members
+
+# The outbox of the handler or background task running in this context
+current = ContextVar('outbox')
+
+
+class Outbox:
+    """Everything one handler call sends, in order."""
+
+    __slots__ = ('sid', 'actions')
+
+    def __init__(self, sid=None):
+        self.sid = sid  # the client whose event is handled; None in background tasks
+        self.actions = []  # [(method, args)]
+
+
+class Request:
+    """Stands in for flask.request in handlers."""
+
+    @property
+    def sid(self):
+        return current.get().sid
+
+
+request = Request()
+
+
+def emit(event, data, room=None, to=None):
+    """Send an event to a room or client; by default the client being handled."""
+    box = current.get()
+    box.actions.append(('emit', (event, data, room or to or box.sid)))
+
+
+def join_room(room, sid=None):
+    box = current.get()
+    box.actions.append(('enter_room', (sid or box.sid, room)))
+
+
+def leave_room(room, sid=None):
+    box = current.get()
+    box.actions.append(('leave_room', (sid or box.sid, room)))
+
+
+def close_room(room):
+    current.get().actions.append(('close_room', (room,)))
+
+
+def send_private(event, payloads):
+    """Send every sid in `payloads` ({sid: data}) its own version of an event."""
+    current.get().actions.append(('private', (event, payloads)))
+
+
+def collect(sid, handler, *args):
+    """Run a handler for client `sid`; returns (its result, the Outbox it filled)."""
+    box = Outbox(sid)
+    token = current.set(box)
+    try:
+        result = handler(*args)
+    finally:
+        current.reset(token)
+    return result, box
+
+
+def emits(server, data, to, namespace):
+    """
+    How to emit `data` to `to` so each client gets the encoding it asked
+    for, as [(data, to, skip_sid)]: JSON to the room or client, skipping
+    those that take msgpack, and one packed copy addressed to all of those.
+    """
+    packed = packed_members(server, to, namespace)
+    if not packed:
+        return ((data, to, None),)
+    if packed == [to]:
+        return ((pack(data), to, None),)
+    return ((data, to, packed), (pack(data), packed, None))
+
+
+def send(server, box, namespace='/'):
+    """Deliver an outbox through a socketio.Server."""
+    for method, args in box.actions:
+        if method == 'emit':
+            event, data, to = args
+            for data, to, skip_sid in emits(server, data, to, namespace):
+                server.emit(event, data, to=to, skip_sid=skip_sid, namespace=namespace)
+        elif method == 'enter_room':
+            server.enter_room(args[0], args[1], namespace=namespace)
+        elif method == 'leave_room':
+            server.leave_room(args[0], args[1], namespace=namespace)
+        elif method == 'close_room':
+            server.close_room(args[0], namespace=namespace)
+        else:
+            deliver_private(server, args[0], args[1], namespace=namespace)
+
+
+async def send_async(server, box, namespace='/'):
+    """Deliver an outbox through a socketio.AsyncServer."""
+    for method, args in box.actions:
+        if method == 'emit':
+            event, data, to = args
+            for data, to, skip_sid in emits(server, data, to, namespace):
+                await server.emit(event, data, to=to, skip_sid=skip_sid, namespace=namespace)
+        elif method == 'enter_room':
+            await server.enter_room(args[0], args[1], namespace=namespace)
+        elif method == 'leave_room':
+            await server.leave_room(args[0], args[1], namespace=namespace)
+        elif method == 'close_room':
+            await server.close_room(args[0], namespace=namespace)
+        else:
+            await deliver_private_async(server, args[0], args[1], namespace=namespace)
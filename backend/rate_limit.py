@@ -0,0 +1,175 @@
+"""
+Token-bucket rate limits per connection and per client address, and caps
+on this worker's connections and rooms.
+
+Limits are written as `event=rate/burst` pairs separated by commas: up to
+`burst` events at once, refilled at `rate` per second. Per connection,
+`*` is one bucket shared by every event without a limit of its own. Per address,
+`connect` limits new connections.
+"""
+
+import heapq
+import threading
+import time
+
+# Per connection; a client plays at human speed
+DEFAULT_LIMITS = 'create_room=0.2/3,join_room=1/5,update_settings=2/10,submit_clue=1/5,*=10/30'
+# Per address, shared by every connection from it (players behind one NAT)
+DEFAULT_IP_LIMITS = 'connect=2/30,create_room=0.5/10'
+
+
+def parse_limits(text):
+    """{event: (rate, burst)} from 'event=rate/burst,...'."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        try:
+            event, spec = item.split('=')
+            rate, burst = map(float, spec.split('/'))
+        except ValueError:
+            raise ValueError(f"Bad rate limit {item!r}, expected event=rate/burst") from None
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Bad rate limit {item!r}, rate must be positive and burst at least 1")
+        limits[event.strip()] = (rate, burst)
+    return limits
+
+
+def client_address(environ, proxy_hops=0):
+    """
+    The address a connection comes from. Behind `proxy_hops` proxies it is
+    taken from X-Forwarded-For, counting from the right, since entries
+    further left come from the client and can be made up.
+    """
+    if proxy_hops:
+        forwarded = [a.strip() for a in environ.get('HTTP_X_FORWARDED_FOR', '').split(',') if a.strip()]
+        if len(forwarded) >= proxy_hops:
+            return forwarded[-proxy_hops]
+    return environ.get('REMOTE_ADDR') or 'unknown'
+
+
+class TokenBucket:
+    """Up to `burst` tokens, refilled at `rate` per second as they are taken."""
+
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate, burst, now):
+        """Take a token if there is one."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def full_at(self, rate, burst):
+        return self.updated + (burst - self.tokens) / rate
+
+
+class RateLimiter:
+    """
+    Admits connections and events, each check O(1).
+
+    A connection's buckets are dropped when it disconnects. An address's
+    are kept while it has connections, then until they have refilled, so
+    that reconnecting does not reset them; tick() drops those.
+    """
+
+    def __init__(self, limits=None, ip_limits=None, max_connections=0, max_rooms=0, proxy_hops=0):
+        self.limits = limits or {}  # {event: (rate, burst)} per connection, '*' for the rest
+        self.ip_limits = ip_limits or {}  # {event: (rate, burst)} per address
+        self.max_connections = max_connections  # 0 for no cap
+        self.max_rooms = max_rooms  # 0 for no cap
+        self.proxy_hops = proxy_hops
+        self.interval = 10  # seconds between drops of idle addresses
+
+        self.sids = {}  # {sid: (address, {event: TokenBucket})}
+        self.addresses = {}  # {address: [connections, {event: TokenBucket}]}
+        self.idle = []  # [(time its buckets are full, address)] of addresses without connections
+        self.lock = threading.Lock()  # held to count connections in and out
+        self.rejected = {}  # {event: events turned away}
+
+    def reject(self, event):
+        self.rejected[event] = self.rejected.get(event, 0) + 1
+
+    def connect(self, sid, environ, now=None):
+        """Admit a new connection; returns why it is refused, or None."""
+        now = time.monotonic() if now is None else now
+        address = client_address(environ, self.proxy_hops)
+        with self.lock:
+            if self.max_connections and len(self.sids) >= self.max_connections:
+                self.reject('connect')
+                return 'Server is full, try again later'
+            entry = self.addresses.get(address)
+            if entry is None:
+                entry = self.addresses[address] = [0, {}]
+            if not self.take(entry[1], self.ip_limits.get('connect'), 'connect', now):
+                self.reject('connect')
+                if not entry[0]:
+                    self.release(address, entry, now)
+                return 'Too many connections, slow down'
+            entry[0] += 1
+            self.sids[sid] = (address, {})
+        return None
+
+    def disconnect(self, sid, now=None):
+        """Forget a connection."""
+        with self.lock:
+            item = self.sids.pop(sid, None)
+            if item is None:
+                return
+            address = item[0]
+            entry = self.addresses[address]
+            entry[0] -= 1
+            if not entry[0]:
+                self.release(address, entry, time.monotonic() if now is None else now)
+
+    def release(self, address, entry, now):
+        """An address has no connections left: drop it, or once its buckets have refilled."""
+        full_at = max((bucket.full_at(*self.ip_limits[event]) for event, bucket in entry[1].items()),
+                      default=now)
+        if full_at <= now:
+            del self.addresses[address]
+        else:
+            heapq.heappush(self.idle, (full_at, address))
+
+    def allow(self, sid, event, now=None):
+        """True if a connection may send an event now."""
+        item = self.sids.get(sid)
+        if item is None:
+            return True  # connected before limits were checked
+        now = time.monotonic() if now is None else now
+        address, buckets = item
+        key = event if event in self.limits else '*'
+        if not self.take(buckets, self.limits.get(key), key, now):
+            self.reject(event)
+            return False
+        limit = self.ip_limits.get(event)
+        if limit and not self.take(self.addresses[address][1], limit, event, now):
+            self.reject(event)
+            return False
+        return True
+
+    def take(self, buckets, limit, key, now):
+        if not limit:
+            return True
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(limit[1], now)
+        return bucket.take(*limit, now)
+
+    def room_cap_reached(self, rooms):
+        """True if no more rooms may be created, with `rooms` open."""
+        return bool(self.max_rooms) and rooms >= self.max_rooms
+
+    def tick(self, now=None):
+        """Drop the addresses without connections whose buckets have refilled; run every interval."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            while self.idle and self.idle[0][0] <= now:
+                _, address = heapq.heappop(self.idle)
+                entry = self.addresses.get(address)
+                if entry is not None and not entry[0]:
+                    self.release(address, entry, now)  # unless it has been used since
@@ -0,0 +1,138 @@
+"""Background expiry of empty and idle rooms, and of seats left by disconnected players."""
+
+import heapq
+import time
+
+from log_config import get_logger
+
+log = get_logger('reaper')
+
+
+class RoomReaper:
+    """
+    Deletes rooms that stay empty past a grace period or idle past a TTL.
+
+    Every room has one deadline in a heap, and a single background task pops
+    the ones that are due. A popped deadline is checked against the room's
+    current state, so activity simply pushes the room's next check later
+    instead of cancelling anything.
+
+    Seats of disconnected players are held the same way, in a second heap,
+    and the player is removed if they have not resumed by the deadline.
+
+    What is done to a room goes through dispatch, which the server points
+    at the room's command queue (see room_queue.py), so it happens in the
+    room's turn and may happen after sweep() returns.
+    """
+
+    def __init__(self, game_manager, empty_grace=5, idle_ttl=3600, interval=1, on_reap=None,
+                 seat_grace=30, on_seat_expired=None):
+        self.game_manager = game_manager
+        self.empty_grace = empty_grace  # seconds an empty room is kept for reconnects
+        self.idle_ttl = idle_ttl  # seconds without activity before a room is closed
+        self.interval = interval  # seconds between sweeps
+        self.on_reap = on_reap  # called with (room, reason) before deleting a non-empty room
+        self.seat_grace = seat_grace  # seconds a disconnected player's seat is kept
+        # called with (room, player_id, voters who must vote again) after removing them
+        self.on_seat_expired = on_seat_expired
+        self.dispatch = lambda room_code, fn, *args: fn(*args)  # runs fn(*args) in the room's turn
+
+        self.heap = []  # [(deadline, room_code)]
+        self.scheduled = {}  # {room_code: earliest deadline in the heap}
+        self.reclaimed = {'empty': 0, 'idle': 0}
+
+        self.seat_heap = []  # [(deadline, room_code, player_id)]
+        self.held = {}  # {(room_code, player_id): deadline}
+        self.expired_seats = 0
+        self.logged = (0, 0)  # (expired seats, rooms reclaimed) as of the last tick's log
+
+    def deadline(self, room):
+        """When a room should be reaped if nothing else happens to it."""
+        ttl = self.empty_grace if not room.players else self.idle_ttl
+        return room.last_activity + ttl
+
+    def watch(self, room):
+        """Make sure a room is checked by its current deadline."""
+        deadline = self.deadline(room)
+        if deadline < self.scheduled.get(room.room_code, float('inf')):
+            self.scheduled[room.room_code] = deadline
+            heapq.heappush(self.heap, (deadline, room.room_code))
+
+    def hold_seat(self, room, player_id):
+        """Keep a disconnected player's seat until the grace period runs out."""
+        deadline = time.monotonic() + self.seat_grace
+        self.held[(room.room_code, player_id)] = deadline
+        heapq.heappush(self.seat_heap, (deadline, room.room_code, player_id))
+
+    def release_seat(self, room, player_id):
+        """Stop the clock on a seat whose player is back."""
+        self.held.pop((room.room_code, player_id), None)
+
+    def expire_seats(self, now):
+        """Remove players whose held seats are due."""
+        while self.seat_heap and self.seat_heap[0][0] <= now:
+            deadline, room_code, player_id = heapq.heappop(self.seat_heap)
+            if self.held.get((room_code, player_id)) != deadline:
+                continue  # resumed, or held again since
+            del self.held[(room_code, player_id)]
+            self.dispatch(room_code, self.expire_seat, room_code, player_id)
+
+    def expire_seat(self, room_code, player_id):
+        """Remove a player whose seat is due, unless they came back."""
+        room = self.game_manager.get_room(room_code)
+        player = room.players.get(player_id) if room else None
+        if player is None or player.sid is not None:
+            return
+        revoters = room.remove_player(player_id)
+        self.expired_seats += 1
+        if self.on_seat_expired:
+            self.on_seat_expired(room, player_id, revoters)
+        self.watch(room)
+
+    def sweep(self, now=None):
+        """Reap every room and seat that is due."""
+        if now is None:
+            now = time.monotonic()
+        self.expire_seats(now)
+
+        while self.heap and self.heap[0][0] <= now:
+            deadline, room_code = heapq.heappop(self.heap)
+            if self.scheduled.get(room_code) != deadline:
+                continue  # superseded by an earlier deadline
+            del self.scheduled[room_code]
+            self.dispatch(room_code, self.reap, room_code, now)
+
+    def reap(self, room_code, now):
+        """Delete a room whose deadline was due at `now`, unless it has been active since."""
+        room = self.game_manager.get_room(room_code)
+        if not room:
+            return
+        if self.deadline(room) > now:
+            self.watch(room)  # active since it was scheduled
+            return
+
+        reason = 'idle' if room.players else 'empty'
+        if reason == 'idle' and self.on_reap:
+            self.on_reap(room, reason)
+        self.game_manager.delete_room(room_code)
+        self.reclaimed[reason] += 1
+
+    def tick(self):
+        """Sweep and log what was reclaimed since the last tick; run every interval."""
+        try:
+            expired_seats, reclaimed = self.logged
+            self.sweep()
+            self.logged = self.expired_seats, sum(self.reclaimed.values())
+            if self.expired_seats > expired_seats:
+                log.info('expired seats', extra={
+                    'seats': self.expired_seats - expired_seats,
+                    'total_seats': self.expired_seats
+                })
+            if self.logged[1] > reclaimed:
+                log.info('reaped rooms', extra={
+                    'rooms': self.logged[1] - reclaimed,
+                    'total_empty': self.reclaimed['empty'],
+                    'total_idle': self.reclaimed['idle']
+                })
+        except Exception:
+            log.exception('room reaper failed')
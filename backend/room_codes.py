@@ -0,0 +1,96 @@
+"""Allocation of unique room codes."""
+
+import random
+import threading
+import time
+from collections import deque
+from utils import ROOM_CODE_ALPHABET, ROOM_CODE_LENGTH
+
+FEISTEL_ROUNDS = 4
+
+
+class RoomCodeAllocator:
+    """
+    Hands out unused room codes in constant time.
+
+    Fresh codes come from a counter passed through a keyed permutation of the
+    code space, so they look random but cannot repeat until every code has
+    been used once. Released codes are handed out again once their cooldown
+    has passed, which keeps the pool of released codes bounded.
+
+    With `accept`, fresh codes it rejects are skipped, e.g. codes owned by
+    another worker (see sharding.py).
+    """
+
+    def __init__(self, length=ROOM_CODE_LENGTH, alphabet=ROOM_CODE_ALPHABET, cooldown=0, seed=None,
+                 accept=None):
+        self.length = length
+        self.alphabet = alphabet
+        self.size = len(alphabet) ** length
+        self.cooldown = cooldown  # seconds before a released code is reused
+        self.accept = accept  # predicate fresh codes must pass, if any
+
+        self.counter = 0  # fresh codes handed out so far
+        self.released = deque()  # [(reusable_at, code)], oldest first
+        self.in_use = set()
+        self.lock = threading.Lock()  # rooms are created outside any room's queue
+
+        # Permutation over the smallest even number of bits covering the space
+        self.half_bits = (max(self.size - 1, 1).bit_length() + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed) if seed is not None else random.SystemRandom()
+        self.round_keys = [rng.getrandbits(32) for _ in range(FEISTEL_ROUNDS)]
+
+    def allocate(self):
+        """Get an unused code."""
+        with self.lock:
+            while True:
+                if self.released and self.released[0][0] <= time.monotonic():
+                    code = self.released.popleft()[1]
+                elif self.counter < self.size:
+                    code = self.encode(self.permute(self.counter))
+                    self.counter += 1
+                    if self.accept and not self.accept(code):
+                        continue
+                else:
+                    raise RuntimeError("No room codes available")
+
+                # Only codes taken through reserve() can already be in use
+                if code not in self.in_use:
+                    self.in_use.add(code)
+                    return code
+
+    def reserve(self, code):
+        """Mark a code chosen elsewhere as in use. Returns False if it already was."""
+        with self.lock:
+            if code in self.in_use:
+                return False
+            self.in_use.add(code)
+            return True
+
+    def release(self, code):
+        """Return a code to the pool once its cooldown has passed."""
+        with self.lock:
+            if code in self.in_use:
+                self.in_use.discard(code)
+                self.released.append((time.monotonic() + self.cooldown, code))
+
+    def permute(self, n):
+        """Map n to a unique index in the code space (a Feistel network, cycle-walked)."""
+        while True:
+            left, right = n >> self.half_bits, n & self.half_mask
+            for key in self.round_keys:
+                mixed = ((right ^ key) * 0x45D9F3B) & 0xFFFFFFFF
+                left, right = right, left ^ ((mixed ^ (mixed >> 16)) & self.half_mask)
+            n = (left << self.half_bits) | right
+            if n < self.size:
+                return n
+
+    def encode(self, index):
+        """Spell a code-space index with the alphabet."""
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(self.length):
+            index, digit = divmod(index, base)
+            chars.append(self.alphabet[digit])
+        return ''.join(reversed(chars))
@@ -0,0 +1,159 @@
+"""Per-room command queues, so that each room handles one event at a time."""
+
+import asyncio
+import threading
+from collections import deque
+
+import outbox
+from log_config import get_logger
+
+log = get_logger('room_queue')
+
+
+class Command:
+    """A handler call queued for a room, and what came of it."""
+
+    __slots__ = ('sid', 'handler', 'args', 'posted', 'done', 'result', 'error', 'box')
+
+    def __init__(self, sid, handler, args, posted=False):
+        self.sid = sid
+        self.handler = handler
+        self.args = args
+        self.posted = posted  # nobody waits for the result
+        self.done = None  # event set once it has run and been sent, for a caller waiting in line
+        self.result = None
+        self.error = None
+        self.box = None  # the Outbox it filled
+
+    def run(self):
+        try:
+            self.result, self.box = outbox.collect(self.sid, self.handler, *self.args)
+        except Exception as e:
+            self.error = e
+            if self.posted:
+                log.exception('room command failed')
+
+
+class RoomQueues:
+    """
+    Runs each room's commands one at a time, in the order they arrive.
+
+    A room has a queue only while it has commands, and then exactly one
+    worker: whoever finds no queue creates it and drains it, while later
+    arrivals append to it and wait. The worker takes up to max_batch
+    commands at a time, runs them all, then sends their outboxes in order,
+    so a burst of events for one room is handled in one pass and its
+    broadcasts go out in the order the state changed. Nothing is locked
+    while commands run, so rooms never wait on each other.
+
+    run() is for socketio.Server, on threads or greenlets, run_async() for
+    socketio.AsyncServer; post() works with either.
+    """
+
+    def __init__(self, max_batch=100):
+        self.max_batch = max_batch
+        self.queues = {}  # {room_code: deque of Commands}, while a worker drains it
+        self.lock = threading.Lock()  # held to find or drop a queue, never while commands run
+        self.batches = 0
+        self.commands = 0
+
+    def active(self, room_code):
+        """True while a room has commands queued or running."""
+        return room_code in self.queues
+
+    def enqueue(self, room_code, command, create_event=None):
+        """Queue a command; True if the caller is now the room's worker."""
+        with self.lock:
+            queue = self.queues.get(room_code)
+            if queue is None:
+                self.queues[room_code] = deque((command,))
+                return True
+            if create_event:
+                command.done = create_event()
+            queue.append(command)
+            return False
+
+    def run_batch(self, room_code):
+        """Run a room's next batch of commands and return it; [] once the queue is empty and gone."""
+        with self.lock:
+            queue = self.queues[room_code]
+            if not queue:
+                del self.queues[room_code]
+                return []
+            batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch))]
+        self.batches += 1
+        self.commands += len(batch)
+        for command in batch:
+            command.run()
+        return batch
+
+    def run(self, server, room_code, sid, handler, *args):
+        """Run a handler for client `sid` in its room's turn and send what it emits; returns its result."""
+        if room_code is None:
+            result, box = outbox.collect(sid, handler, *args)
+            outbox.send(server, box)
+            return result
+        command = Command(sid, handler, args)
+        if self.enqueue(room_code, command, server.eio.create_event):
+            self.drain(server, room_code)
+        else:
+            command.done.wait()
+        if command.error is not None:
+            raise command.error
+        return command.result
+
+    def drain(self, server, room_code):
+        """Work through a room's queue until it is empty."""
+        while True:
+            batch = self.run_batch(room_code)
+            if not batch:
+                return
+            for command in batch:
+                try:
+                    if command.box is not None:
+                        outbox.send(server, command.box)
+                except Exception:
+                    log.exception('room command failed to send')
+                if command.done is not None:
+                    command.done.set()
+
+    async def run_async(self, sio, room_code, sid, handler, *args):
+        """run() for a socketio.AsyncServer."""
+        if room_code is None:
+            result, box = outbox.collect(sid, handler, *args)
+            await outbox.send_async(sio, box)
+            return result
+        command = Command(sid, handler, args)
+        if self.enqueue(room_code, command, asyncio.Event):
+            await self.drain_async(sio, room_code)
+        else:
+            await command.done.wait()
+        if command.error is not None:
+            raise command.error
+        return command.result
+
+    async def drain_async(self, sio, room_code):
+        while True:
+            batch = self.run_batch(room_code)
+            if not batch:
+                return
+            for command in batch:
+                try:
+                    if command.box is not None:
+                        await outbox.send_async(sio, command.box)
+                except Exception:
+                    log.exception('room command failed to send')
+                if command.done is not None:
+                    command.done.set()
+
+    def post(self, server, room_code, handler, *args):
+        """
+        Queue a call for a room without waiting for it, from a background
+        task. On a socketio.Server it runs right away if the room is idle.
+        """
+        if not self.enqueue(room_code, Command(None, handler, args, posted=True)):
+            return
+        if server.is_asyncio_based():
+            server.start_background_task(self.drain_async, server, room_code)
+        else:
+            self.drain(server, room_code)
@@ -0,0 +1,302 @@
+"""
+Where a GameManager keeps its rooms.
+
+A store maps room codes to Room objects like a dict, and is also told when
+a room changes (Room.mark_dirty and seat changes call changed()). Two
+backends:
+
+    MemoryRoomStore   a plain dict; rooms live only in this process
+    SQLiteRoomStore   rooms saved in an SQLite database (WAL mode), with the
+                      most recently used ones cached as live objects
+
+With SQLite, changed rooms are written together in one transaction on an
+interval, so a crash loses at most that interval. Rooms that fall out of
+the cache are loaded again on their next use, so the number of rooms is
+no longer limited by memory, and workers sharing the database file can
+pick up each other's rooms. Each room is cached by one process at a time:
+the worker that owns it (see sharding.py).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from log_config import get_logger
+
+log = get_logger('room_store')
+
+
+class MemoryRoomStore(dict):
+    """Rooms in a dict: {room_code: Room}."""
+
+    persistent = False
+
+    def changed(self, room):
+        pass
+
+    def holds(self, room):
+        """Whether `room` is the object stored under its code."""
+        return self.get(room.room_code) is room
+
+    def count_by_phase(self):
+        phases = {}
+        for room in self.values():
+            phases[room.phase] = phases.get(room.phase, 0) + 1
+        return phases
+
+    def find_session(self, token):
+        return None  # every session of a room in memory is already indexed
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    code TEXT PRIMARY KEY,
+    phase TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    room_code TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_room ON sessions (room_code);
+"""
+
+
+class SQLiteRoomStore:
+    """
+    Rooms saved in SQLite, with a read-through cache of hot rooms.
+
+    A room being handled is never evicted. One evicted while something else
+    still holds it and then changes it is taken back into the cache, so
+    that its changes are written rather than lost.
+    """
+
+    persistent = True
+
+    def __init__(self, path, cache_size=1000, flush_interval=0.1):
+        self.path = path
+        self.cache_size = cache_size  # rooms kept as live objects
+        self.flush_interval = flush_interval  # seconds between batched writes
+        self.manager = None  # set by GameManager, which rebuilt rooms are indexed in
+
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')  # durable at checkpoints; WAL keeps it consistent
+        self.db.execute('PRAGMA busy_timeout=5000')  # other workers may be writing
+        self.db.executescript(SCHEMA)
+
+        self.cache = OrderedDict()  # {room_code: Room}, least recently used first
+        self.dirty = set()  # cached rooms changed since the last flush
+        self.evicted = {}  # {room_code: record} dropped from the cache, not yet written
+        self.deleted = set()  # codes to delete at the next flush
+        self.tokens = {}  # {room_code: session tokens last written}, for cached rooms
+        # Every room code this process knows of; rooms other workers add are
+        # found when first asked for
+        self.codes = {code for (code,) in self.db.execute('SELECT code FROM rooms')}
+        self.loads = 0  # cache misses served from the database
+        # Rooms that must not be evicted, because a handler may be holding
+        # them; set to RoomQueues.active by socket_handlers.py
+        self.in_use = lambda room_code: False
+        # Under the threading async mode, flushes run beside handlers
+        self.lock = threading.Lock()
+
+    # dict interface used by GameManager and friends
+
+    def get(self, room_code, default=None):
+        room = self.cache.get(room_code)
+        if room is not None:
+            self.cache.move_to_end(room_code)
+            return room
+        if room_code in self.deleted:
+            return default
+        from game_manager import Room
+
+        with self.lock:  # not halfway through a flush
+            record = self.evicted.pop(room_code, None)
+            unwritten = record is not None  # its last changes are not in the database yet
+            if not unwritten:
+                row = self.db.execute('SELECT data FROM rooms WHERE code = ?', (room_code,)).fetchone()
+                if row is None:
+                    return default
+                record = json.loads(row[0])
+                self.tokens[room_code] = session_tokens(record)
+                self.codes.add(room_code)
+        self.loads += 1
+        room = Room.from_record(record, self.manager)
+        self.cache_room(room)
+        if unwritten:
+            self.dirty.add(room_code)
+        return room
+
+    def __getitem__(self, room_code):
+        room = self.get(room_code)
+        if room is None:
+            raise KeyError(room_code)
+        return room
+
+    def __setitem__(self, room_code, room):
+        self.deleted.discard(room_code)
+        self.evicted.pop(room_code, None)
+        self.codes.add(room_code)
+        self.cache_room(room)
+        self.dirty.add(room_code)
+
+    def pop(self, room_code, default=None):
+        room = self.get(room_code)
+        if room is None:
+            return default
+        del self.cache[room_code]
+        self.tokens.pop(room_code, None)
+        self.codes.discard(room_code)
+        self.dirty.discard(room_code)
+        self.deleted.add(room_code)
+        return room
+
+    def __contains__(self, room_code):
+        return self.get(room_code) is not None
+
+    def keys(self):
+        return set(self.codes)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.codes)
+
+    def values(self):
+        """Every room, loading each one. Meant for startup and snapshots."""
+        for code in self.keys():
+            room = self.get(code)
+            if room is not None:
+                yield room
+
+    def items(self):
+        for room in self.values():
+            yield room.room_code, room
+
+    # store interface
+
+    def changed(self, room):
+        code = room.room_code
+        cached = self.cache.get(code)
+        if cached is room:
+            self.dirty.add(code)
+        elif cached is None and code in self.codes and code not in self.deleted:
+            # Evicted while something still held it, and changed since: it is
+            # newer than its record, so it becomes the cached room again
+            self.evicted.pop(code, None)
+            self.cache_room(room)
+            self.dirty.add(code)
+
+    def holds(self, room):
+        code = room.room_code
+        cached = self.cache.get(code)
+        if cached is None:
+            # Evicted, and taken back by changed() if it changes
+            return code in self.codes and code not in self.deleted
+        return cached is room
+
+    def cache_room(self, room):
+        self.cache[room.room_code] = room
+        self.cache.move_to_end(room.room_code)
+        if len(self.cache) <= self.cache_size:
+            return
+        with self.lock:
+            busy = []  # rooms in use, skipped and kept
+            while len(self.cache) > max(self.cache_size - len(busy), 1):
+                code, cold = self.cache.popitem(last=False)
+                if self.in_use(code):
+                    busy.append((code, cold))
+                    continue
+                self.tokens.pop(code, None)
+                if code in self.dirty:
+                    self.dirty.discard(code)
+                    self.evicted[code] = cold.to_record()
+            for code, cold in busy:
+                self.cache[code] = cold
+
+    def count_by_phase(self):
+        self.flush()
+        return dict(self.db.execute('SELECT phase, COUNT(*) FROM rooms GROUP BY phase'))
+
+    def find_session(self, token):
+        """The code of the room a session token belongs to, if any."""
+        self.flush()
+        row = self.db.execute('SELECT room_code FROM sessions WHERE token = ?', (token,)).fetchone()
+        return row[0] if row else None
+
+    def flush(self):
+        """Write every changed and deleted room in one transaction."""
+        if not (self.dirty or self.evicted or self.deleted):
+            return
+        with self.lock:
+            self.write()
+
+    def write(self):
+        """Write what changed since the last write; called with the lock held."""
+        dirty, self.dirty = self.dirty, set()
+        evicted, self.evicted = self.evicted, {}
+        deleted, self.deleted = self.deleted, set()
+        rooms = [self.cache.get(code) for code in dirty]
+        records = [room.to_record() for room in rooms if room is not None]
+        records.extend(evicted.values())
+        now = time.time()
+        rows = [(r['code'], r['phase'], json.dumps(r, separators=(',', ':')), now) for r in records]
+        # Session rows only change when players join or leave
+        reseated, sessions = [], []
+        for r in records:
+            tokens = session_tokens(r)
+            if self.tokens.get(r['code']) != tokens:
+                reseated.append((r['code'],))
+                sessions.extend((token, r['code']) for token in tokens)
+                if r['code'] in self.cache:
+                    self.tokens[r['code']] = tokens
+        deleted = [(code,) for code in deleted]
+
+        with self.db:
+            self.db.execute('BEGIN')
+            self.db.executemany('DELETE FROM sessions WHERE room_code = ?', reseated + deleted)
+            self.db.executemany('DELETE FROM rooms WHERE code = ?', deleted)
+            self.db.executemany('INSERT OR REPLACE INTO rooms VALUES (?, ?, ?, ?)', rows)
+            self.db.executemany('INSERT OR REPLACE INTO sessions VALUES (?, ?)', sessions)
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def tick(self):
+        """Flush; run every flush_interval."""
+        try:
+            self.flush()
+        except Exception:
+            log.exception('room store write failed')
+
+
+def session_tokens(record):
+    """The session tokens of a room record's seated players."""
+    return tuple(seat[8] for seat in record['seats'] if seat[7])
+
+
+def room_store_from_env():
+    """The store ROOM_STORE names: 'memory' (default) or 'sqlite'."""
+    kind = os.getenv('ROOM_STORE', 'memory')
+    if kind == 'memory':
+        return MemoryRoomStore()
+    if kind == 'sqlite':
+        return SQLiteRoomStore(
+            os.getenv('ROOM_STORE_PATH', 'rooms.db'),
+            cache_size=int(os.getenv('ROOM_CACHE_SIZE', '1000')),
+            flush_interval=float(os.getenv('ROOM_STORE_FLUSH_INTERVAL', '0.1'))
+        )
+    raise ValueError(f"Unknown ROOM_STORE: {kind}")
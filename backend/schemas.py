@@ -0,0 +1,117 @@
+"""
+Declarative schemas for the data of inbound events, compiled into validators.
+
+A schema maps each key an event reads to a Field: a function cleaning the
+value, the error to reply with when the value is bad (or missing, for a
+required field), and the default used when it is missing. compile_schema()
+turns a schema into one generated function, which is run before the event
+goes anywhere near a room: it returns either the cleaned data, holding
+exactly the schema's keys, or the error.
+"""
+
+from utils import sanitize_string, validate_player_name, validate_room_code
+
+INVALID = object()  # what a clean function returns for a bad value
+REQUIRED = object()  # the default of a field that must be sent
+MISSING = object()
+
+
+class Field:
+    """How to read one key of an event's data."""
+
+    __slots__ = ('clean', 'message', 'default')
+
+    def __init__(self, clean, message, default=REQUIRED):
+        self.clean = clean  # value -> cleaned value, or INVALID
+        self.message = message
+        self.default = default  # used as is, without cleaning
+
+
+def room_code(value):
+    if isinstance(value, str):
+        value = value.upper()
+        if validate_room_code(value):
+            return value
+    return INVALID
+
+
+def player_name(value):
+    name = sanitize_string(value, 20)
+    return name if validate_player_name(name) else INVALID
+
+
+def text(max_length, allow_empty=True):
+    """Sanitized text, cut to max_length; anything that is not a string is empty."""
+    def clean(value):
+        value = sanitize_string(value, max_length)
+        return value if value or allow_empty else INVALID
+    return clean
+
+
+def string(value):
+    return value if isinstance(value, str) else INVALID
+
+
+def integer(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else INVALID
+
+
+def boolean(value):
+    return value if isinstance(value, bool) else INVALID
+
+
+def strings(value):
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    return INVALID
+
+
+def nullable(clean):
+    """clean, also letting None through."""
+    def clean_nullable(value):
+        return None if value is None else clean(value)
+    return clean_nullable
+
+
+# Fields most events share
+ROOM_CODE = Field(room_code, 'Invalid room code')
+PLAYER_NAME = Field(player_name, 'Invalid player name', default='Player')
+
+
+def compile_schema(schema):
+    """
+    A function taking an event's data and returning (cleaned data, None) or
+    (None, error). Its source is generated from the schema, a block of
+    checks per field, so a call runs straight through without looping over
+    the fields.
+    """
+    namespace = {'MISSING': MISSING, 'INVALID': INVALID}
+    lines = [
+        'def validate(data):',
+        '    if not isinstance(data, dict):',
+        "        return None, 'Invalid request'"
+    ]
+    for i, (key, field) in enumerate(schema.items()):
+        namespace.update({f'clean_{i}': field.clean, f'message_{i}': field.message, f'default_{i}': field.default})
+        lines.append(f'    value_{i} = data.get({key!r}, MISSING)')
+        if field.default is REQUIRED:
+            lines += [
+                f'    if value_{i} is MISSING:',
+                f'        return None, message_{i}',
+                f'    value_{i} = clean_{i}(value_{i})'
+            ]
+        else:
+            lines += [
+                f'    if value_{i} is MISSING:',
+                f'        value_{i} = default_{i}',
+                '    else:',
+                f'        value_{i} = clean_{i}(value_{i})'
+            ]
+        lines += [
+            f'    if value_{i} is INVALID:',
+            f'        return None, message_{i}'
+        ]
+    entries = ', '.join(f'{key!r}: value_{i}' for i, key in enumerate(schema))
+    lines.append(f'    return {{{entries}}}, None')
+    exec('\n'.join(lines), namespace)
+    return namespace['validate']
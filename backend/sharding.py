@@ -0,0 +1,75 @@
+"""
+Room ownership when the backend runs as several worker processes.
+
+Room codes are placed on a consistent-hash ring of workers, so every worker
+agrees on which one owns a room without asking the others. A worker only
+creates rooms it owns, and refuses connections for rooms it does not,
+pointing the client at the owner instead. Everyone in a room is therefore
+connected to the same process as the room's state.
+
+Configured from the environment (see cluster.py, which sets these):
+
+    WORKERS=4                                   number of workers; 1 turns sharding off
+    WORKER_INDEX=0                              which one this process is
+    WORKER_URLS=http://host:5000,http://host:5001,...   where clients reach each worker
+"""
+
+import hashlib
+import os
+from bisect import bisect
+
+# Points per worker on the ring; more points spread rooms more evenly
+RING_REPLICAS = 512
+
+
+def ring_hash(key):
+    """A stable 64-bit hash, the same in every process (unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hashing of keys onto nodes."""
+
+    def __init__(self, nodes, replicas=RING_REPLICAS):
+        points = sorted(
+            (ring_hash(f"{node}#{i}"), node)
+            for node in nodes
+            for i in range(replicas)
+        )
+        self.hashes = [h for h, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, key):
+        """The node responsible for a key."""
+        index = bisect(self.hashes, ring_hash(key))
+        return self.nodes[index % len(self.nodes)]
+
+
+class Shard:
+    """This worker's place among the others."""
+
+    def __init__(self, index, urls):
+        self.index = index
+        self.urls = urls  # URL clients connect to, by worker index
+        self.ring = HashRing(range(len(urls)))
+
+    def owner(self, room_code):
+        return self.ring.owner(room_code)
+
+    def owns(self, room_code):
+        return self.ring.owner(room_code) == self.index
+
+    def url_for(self, room_code):
+        """Where clients should connect for a room."""
+        return self.urls[self.ring.owner(room_code)]
+
+    @classmethod
+    def from_env(cls):
+        """The configured shard, or None when running as a single process."""
+        workers = int(os.getenv('WORKERS', '1'))
+        if workers <= 1:
+            return None
+        urls = [url.strip() for url in os.getenv('WORKER_URLS', '').split(',') if url.strip()]
+        if len(urls) != workers:
+            raise ValueError(f"WORKER_URLS needs one URL per worker ({workers})")
+        return cls(int(os.environ['WORKER_INDEX']), urls)
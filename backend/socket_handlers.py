@@ -1,359 +1,741 @@
 """Socket.IO event handlers for Undercover game."""
 
-from flask_socketio import emit, join_room, leave_room
+import atexit
+import os
+from socketio.exceptions import ConnectionRefusedError
+import outbox
+from coalescer import BroadcastCoalescer
+from msgpack_wire import KEYS as MSGPACK_KEYS, packed_sids
+from outbox import close_room, emit, join_room, leave_room, request, send_private
 from game_manager import GameManager
-from utils import generate_room_code, sanitize_string, validate_room_code, validate_player_name
+from journal import Journal
+from log_config import get_logger
+from loop_monitor import LagMonitor
+from metrics import Metrics
+from rate_limit import DEFAULT_IP_LIMITS, DEFAULT_LIMITS, RateLimiter, parse_limits
+from reaper import RoomReaper
+from room_queue import RoomQueues
+from room_store import room_store_from_env
+from schemas import PLAYER_NAME, ROOM_CODE, Field, boolean, compile_schema, integer, nullable, string, strings, text
+from sharding import Shard
+from utils import validate_room_code
 
-# Global game manager instance
-game_manager = GameManager()
+# Connects and disconnects are sampled, see log_config
+log = get_logger('connections')
 
+# This worker's share of the rooms, when running as several processes
+shard = Shard.from_env()
 
-def register_socket_handlers(socketio):
-    """Register all Socket.IO event handlers."""
-    
-    @socketio.on('connect')
-    def handle_connect(auth=None):
-        """Handle client connection."""
-        from flask import request
-        print(f"Client connected: {request.sid}")
-        emit('connected', {'message': 'Connected to server'})
-    
-    @socketio.on('disconnect')
-    def handle_disconnect():
-        """Handle client disconnection."""
-        from flask import request
-        player_id = request.sid
-        print(f"Client disconnected: {player_id}")
-        
-        # Find and update the room
-        room = game_manager.get_room_by_player(player_id)
-        if room:
-            room.remove_player(player_id)
-            
-            # Notify other players
-            emit('player_left', {
-                'player_id': player_id,
-                'game_state': room.get_public_state()
-            }, room=room.room_code)
-            
-            # Delete room if empty (with grace period for reconnects)
-            if not room.players:
-                def delayed_cleanup(code):
-                    try:
-                        socketio.sleep(5)
-                        r = game_manager.get_room(code)
-                        if r and not r.players:
-                            game_manager.delete_room(code)
-                            print(f"Room {code} deleted after grace period")
-                    except Exception as e:
-                        print(f"Error in cleanup task: {e}")
-
-                socketio.start_background_task(delayed_cleanup, room.room_code)
-    
-    @socketio.on('create_room')
-    def handle_create_room(data):
-        """Create a new game room."""
-        from flask import request
-        player_name = sanitize_string(data.get('player_name', 'Player'), 20)
-        
-        if not validate_player_name(player_name):
-            emit('error', {'message': 'Invalid player name'})
-            return
-        
-        # Generate unique room code
-        room_code = generate_room_code()
-        while game_manager.get_room(room_code):
-            room_code = generate_room_code()
-        
-        # Create room
-        room = game_manager.create_room(room_code, request.sid, player_name)
-        
-        # Join socket room
-        join_room(room_code)
-        
-        # Send response
-        emit('room_created', {
-            'room_code': room_code,
-            'game_state': room.get_public_state(),
-            'player_data': room.get_player_private_state(request.sid)
-        })
+# Global game manager instance, keeping rooms in the store ROOM_STORE names
+game_manager = GameManager(
+    room_code_cooldown=float(os.getenv('ROOM_CODE_COOLDOWN', '600')),
+    owns=shard.owns if shard else None,
+    store=room_store_from_env()
+)
+
+# Journal of room mutations for recovery after a restart, if JOURNAL_DIR is set
+journal = Journal(
+    game_manager,
+    os.getenv('JOURNAL_DIR'),
+    fsync_interval=float(os.getenv('JOURNAL_FSYNC_INTERVAL', '0.1')),
+    snapshot_interval=float(os.getenv('JOURNAL_SNAPSHOT_INTERVAL', '300'))
+) if os.getenv('JOURNAL_DIR') else None
+
+# Expires empty rooms after a grace period for reconnects, idle rooms, and
+# the seats of players who disconnected and did not resume in time
+reaper = RoomReaper(
+    game_manager,
+    empty_grace=float(os.getenv('ROOM_EMPTY_GRACE', '5')),
+    idle_ttl=float(os.getenv('ROOM_IDLE_TTL', '3600')),
+    seat_grace=float(os.getenv('SEAT_GRACE', '30'))
+)
+
+# Event-loop lag, which decides what /ready reports
+lag_monitor = LagMonitor(
+    interval=float(os.getenv('LAG_PROBE_INTERVAL', '0.25')),
+    window=float(os.getenv('LAG_WINDOW', '60')),
+    max_p99=float(os.getenv('READY_MAX_LAG_P99_MS', '100')) / 1000,
+    max_lag=float(os.getenv('READY_MAX_LAG_MS', '1000')) / 1000
+)
+
+# Events allowed per connection and per address, and caps on this worker's
+# connections and rooms, checked before anything is queued. Per-address
+# limits are off by default until PROXY_HOPS is set: behind a proxy nobody
+# told us about, every client has the proxy's address.
+limiter = RateLimiter(
+    limits=parse_limits(os.getenv('RATE_LIMITS', DEFAULT_LIMITS)),
+    ip_limits=parse_limits(os.getenv('IP_RATE_LIMITS', DEFAULT_IP_LIMITS if os.getenv('PROXY_HOPS') else '')),
+    max_connections=int(os.getenv('MAX_CONNECTIONS', '5000')),
+    max_rooms=int(os.getenv('MAX_ROOMS', '50000')),
+    proxy_hops=int(os.getenv('PROXY_HOPS', '0'))
+)
+
+# Handler latency, errors and output per event, served at /metrics
+metrics = Metrics(game_manager, lag_monitor, limiter)
+
+# Bursts of join, leave and settings broadcasts go out once per window
+coalescer = BroadcastCoalescer(window=float(os.getenv('BROADCAST_WINDOW_MS', '30')) / 1000)
+
+# Each room's events are handled one at a time, in order
+room_queues = RoomQueues(max_batch=int(os.getenv('ROOM_QUEUE_BATCH', '100')))
+if game_manager.rooms.persistent:
+    # A room stays cached while its handlers run, see SQLiteRoomStore
+    game_manager.rooms.in_use = room_queues.active
+
+
+def state_update(room):
+    """Payload carrying the room's state changes since its last broadcast."""
+    patch = room.take_broadcast_patch()
+    if patch is None:
+        # Too far behind for the patch log, send everything
+        return {'game_state': room.get_public_state_json(), 'version': room.state_version}
+    return {'patch': patch, 'version': room.state_version}
+
+
+def state_snapshot(room):
+    """Payload carrying the room's full public state."""
+    room.commit_state()
+    return {'game_state': room.get_public_state_json(), 'version': room.state_version}
+
+
+def broadcast_state(room, event, **extra):
+    """
+    Send the room's state changes to everyone in it as `event`, with `extra`
+    fields. In a burst, this is merged into one later broadcast without them.
+    """
+    if coalescer.may_send(room.room_code, event):
+        emit(event, {**extra, **state_update(room)}, to=room.room_code)
+
+
+def send_held_broadcast(room_code, event):
+    """Send a broadcast the coalescer held, unless another has carried its changes since."""
+    room = game_manager.get_room(room_code)
+    if not room:
+        return
+    update = state_update(room)
+    if update.get('patch') == []:
+        return
+    emit(event, update, to=room_code)
+
+
+def session_payload(room, player):
+    """What a client keeps to resume its seat after a reconnect."""
+    return {
+        'player_id': player.id,
+        'session_token': player.token,
+        'player_data': room.get_player_private_state(player.id)
+    }
+
+
+# Event handlers, registered on a server by register_socket_handlers (eventlet)
+# or register_async_handlers (asyncio). They send through outbox.py, and run
+# in the queue of the room they act on, see room_queue.py. Their data has
+# been checked against their schema first, see schemas.py.
+HANDLERS = {}  # {event: handler}
+ROOMS = {}  # {event: (sid, *args) -> code of the room the event acts on, or None}
+VALIDATORS = {}  # {event: compiled schema of its data}
+
+
+def on(event, room=None, schema=None):
+    """
+    Add a handler to HANDLERS, queued on the room that `room` finds for
+    each call, taking data that `schema` describes.
+    """
+    def decorator(handler):
+        HANDLERS[event] = handler
+        ROOMS[event] = room
+        if schema is not None:
+            VALIDATORS[event] = compile_schema(schema)
+        return handler
+    return decorator
+
+
+def room_in_data(sid, data):
+    """The room an event names in its data."""
+    return data['room_code']
+
+
+def room_of_sid(sid, *args):
+    """The room a client is seated in."""
+    return game_manager.player_rooms.get(game_manager.player_id_for(sid))
+
+
+def room_of_session(sid, data):
+    """The room a session token in the event's data holds a seat in."""
+    token = data['session_token']
+    room, _ = game_manager.find_session(token) if token else (None, None)
+    return room.room_code if room else None
+
+
+def reject(message):
+    """Run instead of a handler for an event turned away before it reaches its room."""
+    emit('error', {'message': message})
+
+
+def screen(sid, event, args):
+    """
+    Check an event against the rate limits and its schema. Returns the
+    error to reject it with, or None, and the arguments for its handler.
+    """
+    if not limiter.allow(sid, event):
+        return 'Too many requests, slow down', args
+    validate = VALIDATORS.get(event)
+    if validate is None:
+        return None, args
+    data, error = validate(args[0] if args else None)
+    return error, (data,)
+
+
+def admit(sid, environ):
+    """Count a new connection against the limits, or refuse it."""
+    reason = limiter.connect(sid, environ)
+    if reason:
+        raise ConnectionRefusedError(reason)
+
+
+def close_idle_room(room, reason):
+    emit('room_closed', {'reason': reason}, to=room.room_code)
+    close_room(room.room_code)
+
+
+def expire_seat(room, player_id, revoters):
+    broadcast_state(room, 'player_left', player_id=player_id)
+    ask_to_vote_again(room, player_id, revoters)
+
+
+def ask_to_vote_again(room, player_id, revoters):
+    """Tell the players whose votes went to a player who left that they can vote again."""
+    for voter_id in revoters:
+        sid = room.players[voter_id].sid
+        if sid:
+            emit('vote_cleared', {'voted_for_id': player_id}, to=sid)
+
+
+def setup():
+    """
+    Recover the rooms kept from before a restart and hook up the reaper.
+    Returns the periodic tasks a server must run, as [(seconds, task)];
+    tasks may send through the outbox.
+    """
+    tasks = []
+    if journal:
+        journal.recover()
+        atexit.register(journal.close)
+        tasks.append((journal.fsync_interval, journal.tick))
     
-    @socketio.on('join_room')
-    def handle_join_room(data):
-        """Join an existing game room."""
-        from flask import request
-        room_code = data.get('room_code', '').upper()
-        player_name = sanitize_string(data.get('player_name', 'Player'), 20)
-        
-        if not validate_room_code(room_code):
-            emit('error', {'message': 'Invalid room code'})
-            return
-        
-        if not validate_player_name(player_name):
-            emit('error', {'message': 'Invalid player name'})
-            return
-        
-        room = game_manager.get_room(room_code)
-        if not room:
-            emit('error', {'message': 'Room not found'})
-            return
-        
-        if room.phase != 'lobby':
-            emit('error', {'message': 'Game already in progress'})
-            return
-        
-        # Check if name already exists in room (case-insensitive)
-        # Exclude current socket ID in case they're reconnecting
-        existing_names = [p['name'].lower() for p_id, p in room.players.items() if p_id != request.sid]
-        if player_name.lower() in existing_names:
-            emit('error', {'message': 'A player with this name already exists in the room'})
-            return
-        
-        # Add player to room
-        try:
-            room.add_player(request.sid, player_name)
-        except ValueError as e:
-            emit('error', {'message': str(e)})
-            return
-        
-        # Join socket room
-        join_room(room_code)
-        
-        # Notify all players
-        emit('player_joined', {
-            'game_state': room.get_public_state()
-        }, room=room_code)
-        
-        # Send private data to joining player
-        emit('room_joined', {
-            'room_code': room_code,
-            'game_state': room.get_public_state(),
-            'player_data': room.get_player_private_state(request.sid)
-        })
+    store = game_manager.rooms
+    if store.persistent:
+        atexit.register(store.close)
+        tasks.append((store.flush_interval, store.tick))
     
-    @socketio.on('leave_room')
-    def handle_leave_room(data):
-        """Leave current room."""
-        from flask import request
-        room_code = data.get('room_code', '').upper()
-        
-        room = game_manager.get_room(room_code)
-        if not room:
-            return
-        
-        room.remove_player(request.sid)
-        leave_room(room_code)
-        
-        # Notify other players
-        emit('player_left', {
-            'player_id': request.sid,
-            'game_state': room.get_public_state()
-        }, room=room_code)
-        
-        # Delete room if empty
-        if not room.players:
-            game_manager.delete_room(room_code)
-    
-    @socketio.on('update_settings')
-    def handle_update_settings(data):
-        """Update game settings (host only)."""
-        from flask import request
-        room_code = data.get('room_code', '').upper()
-        
-        room = game_manager.get_room(room_code)
-        if not room:
-            emit('error', {'message': 'Room not found'})
-            return
-        
-        # Verify host
-        if request.sid != room.host_id:
-            emit('error', {'message': 'Only host can update settings'})
-            return
-        
-        # Update undercover count if provided
-        if 'undercover_count' in data:
-            undercover_count = int(data['undercover_count'])
-            max_undercovers = len(room.players) - 2
-            if 1 <= undercover_count <= max_undercovers:
-                room.undercover_count = undercover_count
-                
-                # Notify all players of updated settings
-                emit('settings_updated', {
-                    'game_state': room.get_public_state()
-                }, room=room_code)
-    
-    @socketio.on('start_game')
-    def handle_start_game(data):
-        """Start the game (host only)."""
-        from flask import request
-        room_code = data.get('room_code', '').upper()
-        
+    # Rooms kept from before a restart; their players have until the seat
+    # grace period to resume
+    for room_code in game_manager.rooms.keys():
+        if shard and not shard.owns(room_code):
+            continue  # another worker's, in a shared database
         room = game_manager.get_room(room_code)
-        if not room:
-            emit('error', {'message': 'Room not found'})
-            return
-        
-        # Verify host
-        if request.sid != room.host_id:
-            emit('error', {'message': 'Only host can start game'})
-            return
-        
+        reaper.watch(room)
+        for player in room.players.values():
+            room.detach(player)
+            reaper.hold_seat(room, player.id)
+    
+    reaper.on_reap = close_idle_room
+    reaper.on_seat_expired = expire_seat
+    tasks.append((reaper.interval, reaper.tick))
+    
+    if coalescer.window:
+        coalescer.on_flush = send_held_broadcast
+        tasks.append((coalescer.interval, coalescer.tick))
+    tasks.append((limiter.interval, limiter.tick))
+    # reaper.dispatch and coalescer.dispatch are set by the server, to go
+    # through the room queues
+    return tasks
+
+
+def register_socket_handlers(socketio):
+    """Register all Socket.IO event handlers on a Flask-SocketIO server, and start its background tasks."""
+    server = socketio.server
+    
+    def dispatch(room_code, fn, *args):
+        room_queues.post(server, room_code, fn, *args)
+    reaper.dispatch = coalescer.dispatch = dispatch
+    for interval, task in setup():
+        socketio.start_background_task(run_every, socketio, interval, task)
+    socketio.start_background_task(lag_monitor.run, socketio)
+    
+    metrics.watch_server(server)
+    for event, handler in HANDLERS.items():
+        socketio.on(event)(metrics.track(event, queued(server, event, handler)))
+
+
+def queued(server, event, handler):
+    """Wrap a handler to run in its room's queue, which delivers its outbox."""
+    room = ROOMS[event]
+    
+    def run(*args):
+        from flask import request as flask_request
+        sid = flask_request.sid
+        if event == 'connect':
+            admit(sid, flask_request.environ)
+        elif event == 'disconnect':
+            limiter.disconnect(sid)
+        else:
+            error, args = screen(sid, event, args)
+            if error:
+                return room_queues.run(server, None, sid, reject, error)
+        room_code = room(sid, *args) if room else None
         try:
-            room.start_game()
-            
-            # Send public state to all
-            emit('game_started', {
-                'game_state': room.get_public_state()
-            }, room=room_code)
-            
-            # Send private role/word to each player
-            for player_id in room.players:
-                emit('role_assigned', {
-                    'player_data': room.get_player_private_state(player_id)
-                }, room=player_id)
-            
-        except ValueError as e:
-            emit('error', {'message': str(e)})
+            return room_queues.run(server, room_code, sid, handler, *args)
+        except ConnectionRefusedError:
+            limiter.disconnect(sid)
+            raise
+    return run
+
+
+def run_every(socketio, interval, task):
+    """Run a task forever, delivering what it sends; started with socketio.start_background_task."""
+    while True:
+        socketio.sleep(interval)
+        _, box = outbox.collect(None, task)
+        outbox.send(socketio.server, box)
+
+
+def register_async_handlers(sio):
+    """
+    Register all Socket.IO event handlers on a socketio.AsyncServer.
+    Returns a coroutine function that starts the background tasks, to be
+    called once the event loop is running.
+    """
+    def dispatch(room_code, fn, *args):
+        room_queues.post(sio, room_code, fn, *args)
+    reaper.dispatch = coalescer.dispatch = dispatch
+    tasks = setup()
+    metrics.watch_server(sio)
+    for event, handler in HANDLERS.items():
+        sio.on(event)(metrics.track(event, queued_async(sio, event, handler)))
     
-    @socketio.on('submit_clue')
-    def handle_submit_clue(data):
-        """Submit a word clue."""
-        from flask import request
-        room_code = data.get('room_code', '').upper()
-        clue = sanitize_string(data.get('clue', ''), 50)
-        
-        if not clue:
-            emit('error', {'message': 'Clue cannot be empty'})
-            return
-        
-        room = game_manager.get_room(room_code)
-        if not room:
-            emit('error', {'message': 'Room not found'})
-            return
-        
+    async def start_background_tasks():
+        for interval, task in tasks:
+            sio.start_background_task(run_every_async, sio, interval, task)
+        sio.start_background_task(lag_monitor.run_async)
+    return start_background_tasks
+
+
+def queued_async(sio, event, handler):
+    """queued() as a coroutine, for a socketio.AsyncServer."""
+    room = ROOMS[event]
+    
+    async def run(sid, *args):
+        if event == 'connect':
+            admit(sid, args[0])
+            args = args[1:]  # the handler takes auth, not the environ
+        elif event == 'disconnect':
+            limiter.disconnect(sid)
+        else:
+            error, args = screen(sid, event, args)
+            if error:
+                return await room_queues.run_async(sio, None, sid, reject, error)
+        room_code = room(sid, *args) if room else None
         try:
-            room.submit_clue(request.sid, clue)
-            
-            # Notify all players
-            emit('clue_submitted', {
-                'game_state': room.get_public_state()
-            }, room=room_code)
-            
-        except ValueError as e:
-            emit('error', {'message': str(e)})
+            return await room_queues.run_async(sio, room_code, sid, handler, *args)
+        except ConnectionRefusedError:
+            limiter.disconnect(sid)
+            raise
+    return run
+
+
+async def run_every_async(sio, interval, task):
+    """run_every as an asyncio task."""
+    while True:
+        await sio.sleep(interval)
+        _, box = outbox.collect(None, task)
+        await outbox.send_async(sio, box)
+
+
+@on('connect')
+def handle_connect(auth=None):
+    """Handle client connection."""
+    # A client that names its room must be connected to the worker owning it
+    room_code = auth.get('room_code') if isinstance(auth, dict) else None
+    if shard and validate_room_code(room_code) and not shard.owns(room_code):
+        raise ConnectionRefusedError('Room is on another worker', {'url': shard.url_for(room_code)})
+    log.info('client connected', extra={'sid': request.sid})
+    if isinstance(auth, dict) and auth.get('encoding') == 'msgpack':
+        # Events sent to this client are packed from here on, this reply included;
+        # what it sends stays JSON, see msgpack_wire.py
+        packed_sids.add(request.sid)
+        emit('connected', {'message': 'Connected to server', 'encoding': 'msgpack', 'keys': MSGPACK_KEYS})
+        return
+    emit('connected', {'message': 'Connected to server'})
+
+
+@on('disconnect', room=room_of_sid)
+def handle_disconnect():
+    """Handle client disconnection."""
+    log.info('client disconnected', extra={'sid': request.sid})
+    packed_sids.discard(request.sid)
     
-    @socketio.on('submit_vote')
-    def handle_submit_vote(data):
-        """Submit a vote for elimination."""
-        from flask import request
-        room_code = data.get('room_code', '').upper()
-        voted_for_id = data.get('voted_for_id')
-        
-        room = game_manager.get_room(room_code)
-        if not room:
-            emit('error', {'message': 'Room not found'})
-            return
-        
-        if voted_for_id not in room.players:
-            emit('error', {'message': 'Invalid vote target'})
-            return
-        
+    # Keep the seat for a while; the player can resume it with their token
+    player_id = game_manager.player_id_for(request.sid)
+    room = game_manager.get_room_by_player(player_id)
+    if room:
+        room.detach(room.players[player_id])
+        reaper.hold_seat(room, player_id)
+
+
+# Not queued: nobody knows the new room's code before this returns
+@on('create_room', schema={'player_name': PLAYER_NAME})
+def handle_create_room(data):
+    """Create a new game room."""
+    if limiter.room_cap_reached(len(game_manager.rooms)):
+        emit('error', {'message': 'Too many rooms open, try again later'})
+        return
+    
+    player_name = data['player_name']
+    
+    # Allocate unique room code
+    room_code = game_manager.new_room_code()
+    
+    # Create room
+    room = game_manager.create_room(room_code, request.sid, player_name)
+    reaper.watch(room)
+    
+    # Join socket room
+    join_room(room_code)
+    
+    # Send response
+    emit('room_created', {
+        'room_code': room_code,
+        **state_snapshot(room),
+        **session_payload(room, room.players[request.sid])
+    })
+
+
+@on('join_room', room=room_in_data, schema={'room_code': ROOM_CODE, 'player_name': PLAYER_NAME})
+def handle_join_room(data):
+    """Join an existing game room."""
+    room_code = data['room_code']
+    player_name = data['player_name']
+    
+    room = game_manager.get_room(room_code)
+    if not room:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    if room.phase != 'lobby':
+        emit('error', {'message': 'Game already in progress'})
+        return
+    
+    # Check if name already exists in room (case-insensitive)
+    # Exclude current socket ID in case they're reconnecting
+    existing_names = [p.name.lower() for p_id, p in room.players.items() if p_id != request.sid]
+    if player_name.lower() in existing_names:
+        emit('error', {'message': 'A player with this name already exists in the room'})
+        return
+    
+    # Add player to room
+    try:
+        player = room.add_player(request.sid, player_name)
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+        return
+    
+    # Join socket room
+    join_room(room_code)
+    
+    # Notify all players, once for a burst of joins
+    broadcast_state(room, 'player_joined')
+    
+    # Send full state and private data to joining player
+    emit('room_joined', {
+        'room_code': room_code,
+        **state_snapshot(room),
+        **session_payload(room, player)
+    })
+
+
+@on('resume_session', room=room_of_session, schema={
+    'session_token': Field(nullable(string), 'Invalid session token', default=None),
+    'version': Field(nullable(integer), 'Invalid version', default=None)
+})
+def handle_resume_session(data):
+    """Put a reconnecting player back in their seat and send what they missed."""
+    token = data['session_token']
+    version = data['version']
+    
+    room, player = game_manager.find_session(token) if token else (None, None)
+    if not player:
+        emit('session_expired', {'message': 'Your seat is no longer held'})
+        return
+    
+    # A socket still attached to the seat (e.g. another tab) stops getting updates
+    if player.sid is not None and player.sid != request.sid:
+        leave_room(room.room_code, sid=player.sid)
+    room.attach(player, request.sid)
+    reaper.release_seat(room, player.id)
+    join_room(room.room_code)
+    
+    room.commit_state()
+    patch = room.get_patch_since(version) if version is not None else None
+    if patch is None:
+        # Too far behind for the patch log, send everything
+        update = state_snapshot(room)
+    else:
+        update = {'patch': patch, 'version': room.state_version}
+    emit('session_resumed', {
+        'room_code': room.room_code,
+        **update,
+        **session_payload(room, player)
+    })
+
+
+@on('leave_room', room=room_in_data, schema={'room_code': ROOM_CODE})
+def handle_leave_room(data):
+    """Leave current room."""
+    room_code = data['room_code']
+    
+    room = game_manager.get_room(room_code)
+    if not room:
+        return
+    
+    player_id = game_manager.player_id_for(request.sid)
+    revoters = room.remove_player(player_id)
+    leave_room(room_code)
+    
+    # Notify other players
+    broadcast_state(room, 'player_left', player_id=player_id)
+    ask_to_vote_again(room, player_id, revoters)
+    
+    # Delete room if empty
+    if not room.players:
+        game_manager.delete_room(room_code)
+
+
+@on('update_settings', room=room_in_data, schema={
+    'room_code': ROOM_CODE,
+    'word_categories': Field(strings, 'Invalid word categories', default=None),
+    'undercover_count': Field(integer, 'Invalid undercover count', default=None),
+    'early_vote_close': Field(boolean, 'Invalid early vote close', default=None)
+})
+def handle_update_settings(data):
+    """Update game settings (host only)."""
+    room_code = data['room_code']
+    
+    room = game_manager.get_room(room_code)
+    if not room:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    # Verify host
+    if game_manager.player_id_for(request.sid) != room.host_id:
+        emit('error', {'message': 'Only host can update settings'})
+        return
+    
+    updated = False
+    
+    # Update word categories if provided (first, since it can be rejected)
+    if data['word_categories'] is not None:
         try:
-            room.submit_vote(request.sid, voted_for_id)
-            
-            # Check if game ended (transitioned to results)
-            if room.phase == 'results':
-                # Reveal all roles and send results
-                emit('game_ended', {
-                    'game_state': room.get_public_state(),
-                    'all_players': [
-                        {
-                            'id': p['id'],
-                            'name': p['name'],
-                            'role': p['role'],
-                            'word': p['word'],
-                            'is_alive': p['is_alive']
-                        }
-                        for p in room.players.values()
-                    ],
-                    'civilian_word': room.civilian_word,
-                    'undercover_word': room.undercover_word
-                }, room=room_code)
-            else:
-                # Notify all players of vote result
-                emit('vote_submitted', {
-                    'game_state': room.get_public_state(),
-                    'eliminated_player_id': room.eliminated_player_id
-                }, room=room_code)
-            
+            room.set_word_categories(data['word_categories'])
         except ValueError as e:
             emit('error', {'message': str(e)})
-    
-    @socketio.on('mr_white_guess')
-    def handle_mr_white_guess(data):
-        """Handle Mr. White's final guess."""
-        from flask import request
-        room_code = data.get('room_code', '').upper()
-        guess = sanitize_string(data.get('guess', ''), 50)
-        
-        room = game_manager.get_room(room_code)
-        if not room:
-            emit('error', {'message': 'Room not found'})
-            return
-        
-        # Verify it's Mr. White
-        player = room.players.get(request.sid)
-        if not player or player['role'] != 'mrwhite':
-            emit('error', {'message': 'Only Mr. White can guess'})
             return
+        updated = True
+    
+    # Update undercover count if provided
+    if data['undercover_count'] is not None:
+        undercover_count = data['undercover_count']
+        max_undercovers = len(room.players) - 2
+        if 1 <= undercover_count <= max_undercovers:
+            room.set_undercover_count(undercover_count)
+            updated = True
+    
+    # Update early vote close if provided
+    if data['early_vote_close'] is not None:
+        room.set_early_vote_close(data['early_vote_close'])
+        updated = True
+    
+    if updated:
+        # Notify all players of updated settings
+        broadcast_state(room, 'settings_updated')
+
+
+@on('start_game', room=room_in_data, schema={'room_code': ROOM_CODE})
+def handle_start_game(data):
+    """Start the game (host only)."""
+    room_code = data['room_code']
+    
+    room = game_manager.get_room(room_code)
+    if not room:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    # Verify host
+    if game_manager.player_id_for(request.sid) != room.host_id:
+        emit('error', {'message': 'Only host can start game'})
+        return
+    
+    try:
+        room.start_game()
+        
+        # Send public state to all
+        emit('game_started', state_update(room), room=room_code)
+        
+        # Send private role/word to each connected player, all in one step;
+        # the others get theirs when they resume
+        send_private('role_assigned', {
+            room.players[player_id].sid: {'player_data': private}
+            for player_id, private in room.get_private_states().items()
+            if room.players[player_id].sid
+        })
         
-        room.process_mr_white_guess(guess)
-        
-        # Reveal all roles and send results
-        emit('game_ended', {
-            'game_state': room.get_public_state(),
-            'all_players': [
-                {
-                    'id': p['id'],
-                    'name': p['name'],
-                    'role': p['role'],
-                    'word': p['word']
-                }
-                for p in room.players.values()
-            ],
-            'civilian_word': room.civilian_word,
-            'undercover_word': room.undercover_word,
-            'mr_white_guess': guess
-        }, room=room_code)
-    
-    @socketio.on('play_again')
-    def handle_play_again(data):
-        """Reset game to lobby."""
-        from flask import request
-        room_code = data.get('room_code', '').upper()
-        
-        room = game_manager.get_room(room_code)
-        if not room:
-            emit('error', {'message': 'Room not found'})
-            return
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+
+
+@on('submit_clue', room=room_in_data, schema={
+    'room_code': ROOM_CODE,
+    'clue': Field(text(50, allow_empty=False), 'Clue cannot be empty')
+})
+def handle_submit_clue(data):
+    """Submit a word clue."""
+    room_code = data['room_code']
+    clue = data['clue']
+    
+    room = game_manager.get_room(room_code)
+    if not room:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    try:
+        room.submit_clue(game_manager.player_id_for(request.sid), clue)
         
-        # Reset room to lobby state
-        room.phase = 'lobby'
-        room.round_number = 1
-        room.current_turn_index = 0
-        room.clues = []
-        room.votes = {}
-        room.civilian_word = None
-        room.undercover_word = None
-        room.eliminated_player_id = None
-        room.winner = None
+        # Notify all players
+        emit('clue_submitted', state_update(room), room=room_code)
         
-        # Reset all players
-        for player in room.players.values():
-            player['role'] = None
-            player['word'] = None
-            player['is_alive'] = True
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+
+
+@on('submit_vote', room=room_in_data, schema={
+    'room_code': ROOM_CODE,
+    'voted_for_id': Field(string, 'Invalid vote target')
+})
+def handle_submit_vote(data):
+    """Submit a vote for elimination."""
+    room_code = data['room_code']
+    voted_for_id = data['voted_for_id']
+    
+    room = game_manager.get_room(room_code)
+    if not room:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    if voted_for_id not in room.players:
+        emit('error', {'message': 'Invalid vote target'})
+        return
+    
+    voter_id = game_manager.player_id_for(request.sid)
+    if voter_id not in room.players:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    try:
+        room.submit_vote(voter_id, voted_for_id)
+        
+        # Check if game ended (transitioned to results)
+        if room.phase == 'results':
+            # Reveal all roles and send results
+            emit('game_ended', {
+                **state_update(room),
+                'all_players': [
+                    {
+                        'id': p.id,
+                        'name': p.name,
+                        'role': p.role,
+                        'word': p.word,
+                        'is_alive': p.is_alive
+                    }
+                    for p in room.players.values()
+                ],
+                'civilian_word': room.civilian_word,
+                'undercover_word': room.undercover_word
+            }, room=room_code)
+        else:
+            # Notify all players of vote result
+            emit('vote_submitted', {
+                **state_update(room),
+                'eliminated_player_id': room.eliminated_player_id
+            }, room=room_code)
         
-        emit('game_reset', {
-            'game_state': room.get_public_state()
-        }, room=room_code)
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+
+
+@on('mr_white_guess', room=room_in_data, schema={
+    'room_code': ROOM_CODE,
+    'guess': Field(text(50), 'Invalid guess', default='')
+})
+def handle_mr_white_guess(data):
+    """Handle Mr. White's final guess."""
+    room_code = data['room_code']
+    guess = data['guess']
+    
+    room = game_manager.get_room(room_code)
+    if not room:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    # Verify it's Mr. White
+    player = room.players.get(game_manager.player_id_for(request.sid))
+    if not player or player.role != 'mrwhite':
+        emit('error', {'message': 'Only Mr. White can guess'})
+        return
+    
+    room.process_mr_white_guess(guess)
+    
+    # Reveal all roles and send results
+    emit('game_ended', {
+        **state_update(room),
+        'all_players': [
+            {
+                'id': p.id,
+                'name': p.name,
+                'role': p.role,
+                'word': p.word
+            }
+            for p in room.players.values()
+        ],
+        'civilian_word': room.civilian_word,
+        'undercover_word': room.undercover_word,
+        'mr_white_guess': guess
+    }, room=room_code)
+
+
+@on('play_again', room=room_in_data, schema={'room_code': ROOM_CODE})
+def handle_play_again(data):
+    """Reset game to lobby."""
+    room_code = data['room_code']
+    
+    room = game_manager.get_room(room_code)
+    if not room:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    # Reset room to lobby state
+    room.reset()
+    
+    emit('game_reset', state_update(room), room=room_code)
+
+
+@on('sync_state', room=room_in_data, schema={'room_code': ROOM_CODE})
+def handle_sync_state(data):
+    """Resend the full state to a client that missed patches."""
+    room_code = data['room_code']
+    
+    room = game_manager.get_room(room_code)
+    if not room or game_manager.player_id_for(request.sid) not in room.players:
+        emit('error', {'message': 'Room not found'})
+        return
+    
+    emit('state_sync', state_snapshot(room))
@@ -0,0 +1,77 @@
+"""Patches between successive public game states.
+
+A patch is a list of ops that turns one `Room.get_public_state()` dict into
+the next one:
+
+    ['set', key, value]          replace a top-level field (phase, winner, ...)
+    ['clue', clue]               append a clue
+    ['player', player_id, data]  add a player, or update some of its fields
+    ['remove_player', player_id] drop a player
+
+Rooms keep a short log of versioned patches so clients only need a full
+snapshot when they join or fall behind.
+"""
+
+LIST_KEYS = ('players', 'clues')
+
+
+def diff_public_state(old, new):
+    """Return the ops that turn public state `old` into `new`."""
+    ops = []
+
+    for key, value in new.items():
+        if key not in LIST_KEYS and old.get(key) != value:
+            ops.append(['set', key, value])
+
+    # Clues only ever grow during a game; anything else (a reset) is a full set
+    old_clues, new_clues = old['clues'], new['clues']
+    if new_clues[:len(old_clues)] == old_clues:
+        ops.extend(['clue', clue] for clue in new_clues[len(old_clues):])
+    else:
+        ops.append(['set', 'clues', new_clues])
+
+    old_players = {p['id']: p for p in old['players']}
+    new_ids = {p['id'] for p in new['players']}
+    kept_order = [p['id'] for p in new['players'] if p['id'] in old_players]
+    if kept_order != [pid for pid in old_players if pid in new_ids]:
+        # Seating order changed (a player left and rejoined); resend the roster
+        ops.append(['set', 'players', new['players']])
+        return ops
+
+    for player in new['players']:
+        previous = old_players.get(player['id'])
+        if previous is None:
+            ops.append(['player', player['id'], player])
+            continue
+        changes = {k: v for k, v in player.items() if previous.get(k) != v}
+        if changes:
+            ops.append(['player', player['id'], changes])
+
+    ops.extend(['remove_player', pid] for pid in old_players if pid not in new_ids)
+    return ops
+
+
+def apply_patch(state, ops):
+    """Apply ops to a public state dict and return the updated copy."""
+    state = dict(state, players=list(state['players']), clues=list(state['clues']))
+
+    for op in ops:
+        kind = op[0]
+        if kind == 'set':
+            state[op[1]] = op[2]
+        elif kind == 'clue':
+            state['clues'].append(op[1])
+        elif kind == 'player':
+            player_id, data = op[1], op[2]
+            for i, player in enumerate(state['players']):
+                if player['id'] == player_id:
+                    state['players'][i] = dict(player, **data)
+                    break
+            else:
+                state['players'].append(data)
+        elif kind == 'remove_player':
+            state['players'] = [p for p in state['players'] if p['id'] != op[1]]
+        else:
+            raise ValueError(f"Unknown patch op: {kind}")
+
+    return state
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the backend modules as the server does, run from the backend directory
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, 'benchmarks'))
@@ -0,0 +1,144 @@
+"""Game scenarios through the real event handlers, on both servers.
+
+Every scenario runs on the Flask-SocketIO server of app.py and on the
+asyncio server of asgi.py, which must behave the same.
+"""
+
+import time
+
+import pytest
+
+from loopback import AsyncLoopbackServer, LoopbackServer
+from socket_handlers import game_manager, limiter
+
+
+@pytest.fixture(scope='module', params=[LoopbackServer, AsyncLoopbackServer], ids=['flask', 'asyncio'])
+def loopback(request):
+    limits = limiter.limits, limiter.ip_limits
+    limiter.limits = limiter.ip_limits = {}  # many events from a few clients, on purpose
+    yield request.param()
+    limiter.limits, limiter.ip_limits = limits
+
+
+def reply(client, event):
+    """The data of the first `event` a client received, dropping what came before it."""
+    events = client.events()
+    for name, data in events:
+        if name == event:
+            return data
+    raise AssertionError(f"no {event} in {[name for name, _ in events]}")
+
+
+def make_room(loopback, players):
+    """A room of `players`; returns (room_code, {player_id: client}), the host first."""
+    host = loopback.connect()
+    host.emit('create_room', {'player_name': 'Host'})
+    created = reply(host, 'room_created')
+    room_code = created['room_code']
+    clients = {created['player_id']: host}
+    for i in range(1, players):
+        client = loopback.connect()
+        client.emit('join_room', {'room_code': room_code, 'player_name': f"Player {i}"})
+        clients[reply(client, 'room_joined')['player_id']] = client
+    loopback.flush_broadcasts(time.monotonic() + 1)
+    return room_code, clients
+
+
+def give_clues(room_code, clients):
+    room = game_manager.get_room(room_code)
+    while room.phase == 'playing':
+        clients[room.get_current_player()].emit('submit_clue', {'room_code': room_code, 'clue': 'warm'})
+
+
+def test_create_room(loopback):
+    host = loopback.connect()
+    host.emit('create_room', {'player_name': 'Alice'})
+    created = reply(host, 'room_created')
+    assert created['game_state']['phase'] == 'lobby'
+    assert [p['name'] for p in created['game_state']['players']] == ['Alice']
+    assert created['session_token']
+    host.disconnect()
+
+
+def test_join_room(loopback):
+    room_code, clients = make_room(loopback, 1)
+    host, = clients.values()
+    guest = loopback.connect()
+    guest.emit('join_room', {'room_code': room_code, 'player_name': 'Bob'})
+    joined = reply(guest, 'room_joined')
+    assert [p['name'] for p in joined['game_state']['players']] == ['Host', 'Bob']
+    loopback.flush_broadcasts(time.monotonic() + 1)
+    assert reply(host, 'player_joined')['version'] == joined['version']
+
+    other = loopback.connect()
+    other.emit('join_room', {'room_code': 'ZZZZZZ', 'player_name': 'Eve'})
+    assert reply(other, 'error')['message'] == 'Room not found'
+
+
+def test_start_game(loopback):
+    room_code, clients = make_room(loopback, 4)
+    host = next(iter(clients.values()))
+    host.emit('start_game', {'room_code': room_code})
+    roles = {}
+    for player_id, client in clients.items():
+        events = dict(client.events())
+        assert events['game_started']
+        roles[player_id] = events['role_assigned']['player_data']['role']
+    room = game_manager.get_room(room_code)
+    assert room.phase == 'playing'
+    assert roles == {player_id: player.role for player_id, player in room.players.items()}
+    assert list(roles.values()).count('undercover') == room.undercover_count
+
+
+def test_clue_out_of_turn_is_refused(loopback):
+    room_code, clients = make_room(loopback, 4)
+    next(iter(clients.values())).emit('start_game', {'room_code': room_code})
+    room = game_manager.get_room(room_code)
+    waiting = next(c for pid, c in clients.items() if pid != room.get_current_player())
+    waiting.events()
+    waiting.emit('submit_clue', {'room_code': room_code, 'clue': 'cold'})
+    assert reply(waiting, 'error')
+    assert room.clues == []
+
+    give_clues(room_code, clients)
+    assert room.phase == 'voting'
+    assert len(room.clues) == 4
+
+
+def test_vote_eliminates_a_player(loopback):
+    room_code, clients = make_room(loopback, 5)
+    next(iter(clients.values())).emit('start_game', {'room_code': room_code})
+    give_clues(room_code, clients)
+    room = game_manager.get_room(room_code)
+    target = next(pid for pid, p in room.players.items() if p.role == 'civilian')
+    for player_id, client in clients.items():
+        client.events()
+        voted_for = target if player_id != target else next(p for p in clients if p != target)
+        client.emit('submit_vote', {'room_code': room_code, 'voted_for_id': voted_for})
+    assert not room.players[target].is_alive
+    assert room.phase in ('playing', 'results')
+    loopback.flush_broadcasts(time.monotonic() + 1)
+    updates = [data for event, data in clients[target].events() if event in ('vote_submitted', 'game_ended')]
+    assert updates and updates[-1]['version'] == room.state_version
+
+
+def test_reconnect_resumes_the_seat(loopback):
+    room_code, clients = make_room(loopback, 4)
+    next(iter(clients.values())).emit('start_game', {'room_code': room_code})
+    room = game_manager.get_room(room_code)
+    player_id = list(clients)[1]
+    token = room.players[player_id].token
+    version = room.state_version
+
+    clients[player_id].disconnect()
+    assert room.players[player_id].sid is None
+    back = loopback.connect()
+    back.emit('resume_session', {'session_token': token, 'version': version})
+    resumed = reply(back, 'session_resumed')
+    assert resumed['player_id'] == player_id
+    assert resumed['player_data']['role'] == room.players[player_id].role
+    assert room.players[player_id].sid == back.sid
+
+    stale = loopback.connect()
+    stale.emit('resume_session', {'session_token': 'x' * 32, 'version': None})
+    assert reply(stale, 'session_expired') is not None
@@ -0,0 +1,75 @@
+"""Room code allocation never hands out a code that is in use."""
+
+import random
+
+import pytest
+
+from room_codes import RoomCodeAllocator
+from utils import validate_room_code
+
+SMALL_LENGTH = 3  # a code space small enough to fill
+
+
+def test_full_space_is_handed_out_once():
+    allocator = RoomCodeAllocator(length=SMALL_LENGTH, seed=1)
+    codes = [allocator.allocate() for _ in range(allocator.size)]
+    assert len(set(codes)) == allocator.size
+    with pytest.raises(RuntimeError):
+        allocator.allocate()
+
+
+def test_churn_at_high_occupancy_never_collides():
+    allocator = RoomCodeAllocator(length=SMALL_LENGTH, seed=2)
+    live = set()
+    live_list = []
+    target = int(allocator.size * 0.99)
+    rng = random.Random(3)
+    for _ in range(200_000):
+        if len(live) < target:
+            code = allocator.allocate()
+            assert code not in live
+            live.add(code)
+            live_list.append(code)
+        else:
+            i = rng.randrange(len(live_list))
+            live_list[i], live_list[-1] = live_list[-1], live_list[i]
+            code = live_list.pop()
+            live.discard(code)
+            allocator.release(code)
+    assert len(allocator.released) < allocator.size - target + 1
+
+
+def test_reserved_codes_are_skipped():
+    allocator = RoomCodeAllocator(length=SMALL_LENGTH, seed=4)
+    reserved = {allocator.encode(i) for i in range(0, allocator.size, 7)}
+    for code in reserved:
+        assert allocator.reserve(code)
+    codes = set()
+    while True:
+        try:
+            codes.add(allocator.allocate())
+        except RuntimeError:
+            break
+    assert not codes & reserved
+    assert len(codes) + len(reserved) == allocator.size
+
+
+def test_released_codes_wait_out_their_cooldown():
+    allocator = RoomCodeAllocator(length=SMALL_LENGTH, cooldown=3600, seed=5)
+    codes = [allocator.allocate() for _ in range(allocator.size)]
+    allocator.release(codes[0])
+    with pytest.raises(RuntimeError):
+        allocator.allocate()
+
+
+def test_released_codes_are_reused_after_their_cooldown():
+    allocator = RoomCodeAllocator(length=SMALL_LENGTH, cooldown=0, seed=6)
+    codes = [allocator.allocate() for _ in range(allocator.size)]
+    allocator.release(codes[0])
+    assert allocator.allocate() == codes[0]
+
+
+def test_codes_are_valid_room_codes():
+    allocator = RoomCodeAllocator()
+    for _ in range(10_000):
+        assert validate_room_code(allocator.allocate())
@@ -1,13 +1,13 @@
 """Utility functions for the Undercover game."""
 
-import random
+import importlib
 import string
 import re
+import sys
 
-
-def generate_room_code(length=6):
-    """Generate a unique room code with uppercase letters and numbers."""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
+# Room codes are uppercase letters and digits (see room_codes.py)
+ROOM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+ROOM_CODE_LENGTH = 6
 
 
 def sanitize_string(text, max_length=50):
@@ -28,10 +28,12 @@ def sanitize_string(text, max_length=50):
 
 
 def validate_room_code(code):
-    """Validate room code format (6 alphanumeric characters)."""
+    """Validate room code format (6 uppercase letters or digits)."""
     if not isinstance(code, str):
         return False
-    return len(code) == 6 and code.isalnum()
+    # Stripping the alphabet leaves nothing only if every character is in it;
+    # twice as fast as a regex, and this runs for nearly every event
+    return len(code) == ROOM_CODE_LENGTH and not code.strip(ROOM_CODE_ALPHABET)
 
 
 def validate_player_name(name):
@@ -40,3 +42,15 @@ def validate_player_name(name):
         return False
     name = name.strip()
     return 1 <= len(name) <= 20
+
+
+def original_module(name):
+    """
+    The standard library module `name` without eventlet's monkey patching,
+    for code that must block a real thread, not the hub. eventlet is only
+    imported if the server has already loaded it.
+    """
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        return patcher.original(name)
+    return importlib.import_module(name)
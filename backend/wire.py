@@ -0,0 +1,61 @@
+"""JSON module used by Socket.IO to encode and decode packets.
+
+It behaves like the standard library `json`, except that `RawJSON` values are
+written out verbatim instead of being encoded again. Payloads that are
+encoded once and sent many times, like a room's public state, are wrapped in
+`RawJSON` so each emit only pays for the small envelope around them.
+"""
+
+import json
+
+# How far into a packet to look for RawJSON values: [event, {key: {key: value}}]
+RAW_DEPTH = 3
+
+
+class RawJSON(str):
+    """Text that is already valid JSON and must be embedded as-is."""
+    __slots__ = ()
+
+
+def encode(obj):
+    """Encode obj compactly as RawJSON."""
+    return RawJSON(json.dumps(obj, separators=(',', ':')))
+
+
+def dumps(obj, **kwargs):
+    """Serialize obj like json.dumps, splicing in any RawJSON values."""
+    if not _has_raw(obj, RAW_DEPTH):
+        return json.dumps(obj, **kwargs)
+    item_sep, key_sep = kwargs.get('separators') or (', ', ': ')
+    return _splice(obj, kwargs, item_sep, key_sep, RAW_DEPTH)
+
+
+def loads(s, **kwargs):
+    """Deserialize a JSON document."""
+    return json.loads(s, **kwargs)
+
+
+def _has_raw(obj, depth):
+    if isinstance(obj, RawJSON):
+        return True
+    if depth:
+        if isinstance(obj, dict):
+            return any(_has_raw(value, depth - 1) for value in obj.values())
+        if isinstance(obj, (list, tuple)):
+            return any(_has_raw(value, depth - 1) for value in obj)
+    return False
+
+
+def _splice(obj, kwargs, item_sep, key_sep, depth):
+    if isinstance(obj, RawJSON):
+        return obj
+    if depth and isinstance(obj, dict):
+        return '{' + item_sep.join(
+            json.dumps(str(key)) + key_sep + _splice(value, kwargs, item_sep, key_sep, depth - 1)
+            for key, value in obj.items()
+        ) + '}'
+    if depth and isinstance(obj, (list, tuple)):
+        return '[' + item_sep.join(
+            _splice(value, kwargs, item_sep, key_sep, depth - 1) for value in obj
+        ) + ']'
+    return json.dumps(obj, **kwargs)
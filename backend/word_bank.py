@@ -4,163 +4,319 @@ Each tuple contains (civilian_word, undercover_word).
 Expanded with 100+ Indian English word pairs.
 """
 
+import os
 import random
+from bisect import bisect_right
 
-WORD_PAIRS = [
+# Extra pairs written by generate_word_pairs.py, loaded if the file exists
+WORD_PAIRS_FILE = os.getenv(
+    'WORD_PAIRS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'word_pairs.tsv'))
+
+WORD_PAIRS_BY_CATEGORY = {
     # Food & Beverages (Indian context)
-    ("chai", "coffee"),
-    ("samosa", "pakora"),
-    ("dosa", "uttapam"),
-    ("idli", "vada"),
-    ("biryani", "pulao"),
-    ("roti", "paratha"),
-    ("naan", "kulcha"),
-    ("paneer", "tofu"),
-    ("dal", "soup"),
-    ("rice", "wheat"),
-    ("chutney", "pickle"),
-    ("lassi", "buttermilk"),
-    ("gulab jamun", "rasgulla"),
-    ("jalebi", "imarti"),
-    ("ladoo", "barfi"),
-    ("curry", "gravy"),
-    ("masala", "spice"),
-    ("papad", "chips"),
-    ("bhel", "chaat"),
-    ("vada pav", "sandwich"),
+    'food': [
+        ("chai", "coffee"),
+        ("samosa", "pakora"),
+        ("dosa", "uttapam"),
+        ("idli", "vada"),
+        ("biryani", "pulao"),
+        ("roti", "paratha"),
+        ("naan", "kulcha"),
+        ("paneer", "tofu"),
+        ("dal", "soup"),
+        ("rice", "wheat"),
+        ("chutney", "pickle"),
+        ("lassi", "buttermilk"),
+        ("gulab jamun", "rasgulla"),
+        ("jalebi", "imarti"),
+        ("ladoo", "barfi"),
+        ("curry", "gravy"),
+        ("masala", "spice"),
+        ("papad", "chips"),
+        ("bhel", "chaat"),
+        ("vada pav", "sandwich"),
+    ],
     
     # Transportation
-    ("auto rickshaw", "taxi"),
-    ("metro", "local train"),
-    ("bus", "tempo"),
-    ("bike", "scooter"),
-    ("car", "suv"),
-    ("cycle", "bicycle"),
-    ("airplane", "helicopter"),
-    ("rickshaw", "cart"),
+    'transportation': [
+        ("auto rickshaw", "taxi"),
+        ("metro", "local train"),
+        ("bus", "tempo"),
+        ("bike", "scooter"),
+        ("car", "suv"),
+        ("cycle", "bicycle"),
+        ("airplane", "helicopter"),
+        ("rickshaw", "cart"),
+    ],
     
     # Places & Locations
-    ("temple", "mosque"),
-    ("school", "college"),
-    ("market", "mall"),
-    ("railway station", "bus stand"),
-    ("hospital", "clinic"),
-    ("park", "garden"),
-    ("flat", "bungalow"),
-    ("village", "town"),
-    ("city", "metro"),
-    ("beach", "river"),
+    'places': [
+        ("temple", "mosque"),
+        ("school", "college"),
+        ("market", "mall"),
+        ("railway station", "bus stand"),
+        ("hospital", "clinic"),
+        ("park", "garden"),
+        ("flat", "bungalow"),
+        ("village", "town"),
+        ("city", "metro"),
+        ("beach", "river"),
+    ],
     
     # Occupations
-    ("doctor", "nurse"),
-    ("teacher", "professor"),
-    ("engineer", "architect"),
-    ("lawyer", "judge"),
-    ("businessman", "shopkeeper"),
-    ("farmer", "gardener"),
-    ("driver", "conductor"),
-    ("chef", "cook"),
-    ("actor", "dancer"),
-    ("cricketer", "footballer"),
+    'occupations': [
+        ("doctor", "nurse"),
+        ("teacher", "professor"),
+        ("engineer", "architect"),
+        ("lawyer", "judge"),
+        ("businessman", "shopkeeper"),
+        ("farmer", "gardener"),
+        ("driver", "conductor"),
+        ("chef", "cook"),
+        ("actor", "dancer"),
+        ("cricketer", "footballer"),
+    ],
     
     # Entertainment & Sports
-    ("cricket", "football"),
-    ("bollywood", "hollywood"),
-    ("movie", "serial"),
-    ("song", "music"),
-    ("dance", "drama"),
-    ("kabaddi", "kho kho"),
-    ("carrom", "chess"),
-    ("cards", "dice"),
-    ("youtube", "instagram"),
-    ("whatsapp", "telegram"),
+    'entertainment': [
+        ("cricket", "football"),
+        ("bollywood", "hollywood"),
+        ("movie", "serial"),
+        ("song", "music"),
+        ("dance", "drama"),
+        ("kabaddi", "kho kho"),
+        ("carrom", "chess"),
+        ("cards", "dice"),
+        ("youtube", "instagram"),
+        ("whatsapp", "telegram"),
+    ],
     
     # Clothing & Fashion
-    ("saree", "salwar kameez"),
-    ("kurta", "shirt"),
-    ("dhoti", "pajama"),
-    ("dupatta", "scarf"),
-    ("jeans", "trousers"),
-    ("sandals", "slippers"),
-    ("bindi", "sindoor"),
-    ("bangles", "bracelet"),
-    ("shawl", "stole"),
+    'clothing': [
+        ("saree", "salwar kameez"),
+        ("kurta", "shirt"),
+        ("dhoti", "pajama"),
+        ("dupatta", "scarf"),
+        ("jeans", "trousers"),
+        ("sandals", "slippers"),
+        ("bindi", "sindoor"),
+        ("bangles", "bracelet"),
+        ("shawl", "stole"),
+    ],
     
     # Education & Study
-    ("school bag", "backpack"),
-    ("notebook", "textbook"),
-    ("exam", "test"),
-    ("principal", "headmaster"),
-    ("class", "lecture"),
-    ("homework", "assignment"),
-    ("pen", "pencil"),
-    ("eraser", "sharpener"),
-    ("blackboard", "whiteboard"),
+    'education': [
+        ("school bag", "backpack"),
+        ("notebook", "textbook"),
+        ("exam", "test"),
+        ("principal", "headmaster"),
+        ("class", "lecture"),
+        ("homework", "assignment"),
+        ("pen", "pencil"),
+        ("eraser", "sharpener"),
+        ("blackboard", "whiteboard"),
+    ],
     
     # Home & Family
-    ("kitchen", "bedroom"),
-    ("balcony", "terrace"),
-    ("sofa", "chair"),
-    ("table", "desk"),
-    ("fan", "ac"),
-    ("tv", "computer"),
-    ("fridge", "freezer"),
-    ("stove", "oven"),
-    ("bucket", "mug"),
-    ("towel", "napkin"),
+    'home': [
+        ("kitchen", "bedroom"),
+        ("balcony", "terrace"),
+        ("sofa", "chair"),
+        ("table", "desk"),
+        ("fan", "ac"),
+        ("tv", "computer"),
+        ("fridge", "freezer"),
+        ("stove", "oven"),
+        ("bucket", "mug"),
+        ("towel", "napkin"),
+    ],
     
     # Festival & Culture
-    ("diwali", "holi"),
-    ("rakhi", "bhai dooj"),
-    ("eid", "ramadan"),
-    ("christmas", "new year"),
-    ("wedding", "engagement"),
-    ("puja", "aarti"),
-    ("rangoli", "mehendi"),
-    ("crackers", "fireworks"),
+    'festivals': [
+        ("diwali", "holi"),
+        ("rakhi", "bhai dooj"),
+        ("eid", "ramadan"),
+        ("christmas", "new year"),
+        ("wedding", "engagement"),
+        ("puja", "aarti"),
+        ("rangoli", "mehendi"),
+        ("crackers", "fireworks"),
+    ],
     
     # Nature & Weather
-    ("summer", "winter"),
-    ("monsoon", "spring"),
-    ("rain", "storm"),
-    ("sun", "moon"),
-    ("tree", "plant"),
-    ("flower", "leaf"),
-    ("mountain", "hill"),
-    ("river", "lake"),
-    ("ocean", "sea"),
+    'nature': [
+        ("summer", "winter"),
+        ("monsoon", "spring"),
+        ("rain", "storm"),
+        ("sun", "moon"),
+        ("tree", "plant"),
+        ("flower", "leaf"),
+        ("mountain", "hill"),
+        ("river", "lake"),
+        ("ocean", "sea"),
+    ],
     
     # Technology & Gadgets
-    ("mobile", "phone"),
-    ("laptop", "computer"),
-    ("charger", "adapter"),
-    ("earphones", "headphones"),
-    ("wifi", "internet"),
-    ("bluetooth", "hotspot"),
-    ("camera", "video"),
-    ("app", "website"),
+    'technology': [
+        ("mobile", "phone"),
+        ("laptop", "computer"),
+        ("charger", "adapter"),
+        ("earphones", "headphones"),
+        ("wifi", "internet"),
+        ("bluetooth", "hotspot"),
+        ("camera", "video"),
+        ("app", "website"),
+    ],
     
     # Daily Life
-    ("morning", "evening"),
-    ("breakfast", "lunch"),
-    ("water", "juice"),
-    ("bed", "mattress"),
-    ("pillow", "cushion"),
-    ("blanket", "quilt"),
-    ("soap", "shampoo"),
-    ("toothbrush", "toothpaste"),
-    ("comb", "brush"),
+    'daily_life': [
+        ("morning", "evening"),
+        ("breakfast", "lunch"),
+        ("water", "juice"),
+        ("bed", "mattress"),
+        ("pillow", "cushion"),
+        ("blanket", "quilt"),
+        ("soap", "shampoo"),
+        ("toothbrush", "toothpaste"),
+        ("comb", "brush"),
+    ],
     
     # Common Objects
-    ("bottle", "flask"),
-    ("bag", "purse"),
-    ("umbrella", "raincoat"),
-    ("key", "lock"),
-    ("wallet", "purse"),
-    ("watch", "clock"),
-    ("candle", "lamp"),
-    ("mirror", "glass"),
-]
+    'objects': [
+        ("bottle", "flask"),
+        ("bag", "purse"),
+        ("umbrella", "raincoat"),
+        ("key", "lock"),
+        ("wallet", "purse"),
+        ("watch", "clock"),
+        ("candle", "lamp"),
+        ("mirror", "glass"),
+    ],
+}
+
+
+class WordBank:
+    """Word pairs indexed by category."""
+    
+    def __init__(self, pairs_by_category):
+        self.pairs = []  # every pair, grouped by category
+        self.ranges = {}  # {category: (start, end)} slices of self.pairs
+        for category, pairs in pairs_by_category.items():
+            start = len(self.pairs)
+            self.pairs.extend(pairs)
+            self.ranges[category] = (start, len(self.pairs))
+    
+    @property
+    def categories(self):
+        """Category names, in bank order."""
+        return list(self.ranges)
+    
+    def deck(self, categories=None):
+        """A new shuffled deck over some categories (all of them by default)."""
+        return WordDeck(self, categories or self.categories)
+    
+    def restore_deck(self, record):
+        """
+        Rebuild a deck from WordDeck.to_record(). Returns a fresh deck if the
+        bank has changed since, or None if its categories are gone.
+        """
+        try:
+            deck = self.deck(record['categories'])
+        except ValueError:
+            return None
+        if deck.size == record['size']:
+            deck.remaining = record['remaining']
+            deck.swaps = dict(record['swaps'])
+        return deck
+
+
+class WordDeck:
+    """
+    Deals word pairs from some categories without repeats until all are used.
+    
+    The shuffle is a Fisher-Yates shuffle done one draw at a time over pair
+    indexes. Only the positions touched so far are stored, so a deck costs
+    memory per draw rather than per pair in the bank.
+    """
+    
+    def __init__(self, bank, categories):
+        unknown = set(categories) - set(bank.ranges)
+        if unknown:
+            raise ValueError(f"Unknown word categories: {', '.join(sorted(unknown))}")
+        
+        self.bank = bank
+        self.categories = list(categories)
+        # Selected categories laid end to end as one range of deck indexes
+        self.deck_starts = []  # where each selected category starts in the deck
+        self.bank_starts = []  # ... and in the bank
+        self.size = 0
+        for category in self.categories:
+            start, end = bank.ranges[category]
+            if end > start:
+                self.deck_starts.append(self.size)
+                self.bank_starts.append(start)
+                self.size += end - start
+        if not self.size:
+            raise ValueError("No word pairs in the selected categories")
+        
+        self.remaining = self.size
+        self.swaps = {}  # {position: deck index moved there}
+    
+    def draw(self):
+        """Deal the next (civilian_word, undercover_word) pair."""
+        if not self.remaining:
+            # Every pair has been dealt, start a new shuffle
+            self.remaining = self.size
+            self.swaps = {}
+        
+        last = self.remaining - 1
+        position = random.randint(0, last)
+        index = self.swaps.get(position, position)
+        # Move the last undealt index into the dealt slot
+        moved = self.swaps.pop(last, last)
+        if position != last:
+            self.swaps[position] = moved
+        self.remaining = last
+        return self.bank.pairs[self.bank_index(index)]
+    
+    def to_record(self):
+        """The deck's position as JSON-ready data."""
+        return {
+            'categories': self.categories,
+            'size': self.size,
+            'remaining': self.remaining,
+            'swaps': list(self.swaps.items())
+        }
+    
+    def bank_index(self, index):
+        """Map a deck index to an index into the bank's pairs."""
+        segment = bisect_right(self.deck_starts, index) - 1
+        return self.bank_starts[segment] + index - self.deck_starts[segment]
+
+
+def load_word_pairs(path, pairs_by_category):
+    """
+    Add pairs from a tab-separated file (category, civilian, undercover per
+    line) to pairs_by_category. Returns the number of pairs added.
+    """
+    count = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) != 3:
+                continue
+            category, civilian, undercover = fields
+            pairs_by_category.setdefault(category, []).append((civilian, undercover))
+            count += 1
+    return count
+
+
+if os.path.exists(WORD_PAIRS_FILE):
+    load_word_pairs(WORD_PAIRS_FILE, WORD_PAIRS_BY_CATEGORY)
+
+WORD_PAIRS = [pair for pairs in WORD_PAIRS_BY_CATEGORY.values() for pair in pairs]
+
+DEFAULT_BANK = WordBank(WORD_PAIRS_BY_CATEGORY)
 
 
 def get_random_word_pair():
@@ -2,7 +2,7 @@
 
 import { useState } from 'react';
 import { useRouter } from 'next/navigation';
-import { connectSocket } from '@/lib/socket';
+import { clearSession, connectSocket, getSession, saveSession } from '@/lib/socket';
 import { Gamepad2, DoorOpen } from 'lucide-react';
 
 export default function HomePage() {
@@ -26,7 +26,13 @@ export default function HomePage() {
             setIsCreating(false);
             // Store the initial game state and player data in sessionStorage
             sessionStorage.setItem('gameState', JSON.stringify(data.game_state));
+            sessionStorage.setItem('stateVersion', String(data.version));
             sessionStorage.setItem('playerData', JSON.stringify(data.player_data));
+            saveSession({
+                room_code: data.room_code,
+                player_id: data.player_id,
+                session_token: data.session_token,
+            });
             // Store player name for reconnection
             sessionStorage.setItem('playerName', playerName);
             // Navigate without query params
@@ -52,6 +58,10 @@ export default function HomePage() {
 
         // Store player name in sessionStorage
         sessionStorage.setItem('playerName', playerName);
+        // A seat held in another room is given up; one in this room is resumed
+        if (!getSession(roomCode.toUpperCase())) {
+            clearSession();
+        }
         // Navigate without query params
         router.push(`/room/${roomCode.toUpperCase()}`);
     };
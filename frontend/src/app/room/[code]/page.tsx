@@ -1,9 +1,10 @@
 'use client';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useParams, useRouter } from 'next/navigation';
-import { connectSocket, removeAllSocketListeners } from '@/lib/socket';
-import type { GameState, PlayerData } from '@/types/game';
+import { clearSession, connectSocket, getSession, onSocketChange, removeAllSocketListeners, saveSession } from '@/lib/socket';
+import { applyPatch } from '@/lib/statePatch';
+import type { GameState, PlayerData, StateUpdate } from '@/types/game';
 import Lobby from '@/components/Lobby';
 import GamePlay from '@/components/GamePlay';
 import Voting from '@/components/Voting';
@@ -21,6 +22,12 @@ export default function RoomPage() {
     const [allPlayers, setAllPlayers] = useState<any[]>([]);
     const [error, setError] = useState<string | null>(null);
     const [isConnected, setIsConnected] = useState(false);
+    // Latest state and its version, read synchronously when patches arrive
+    const syncRef = useRef<{ state: GameState | null; version: number }>({ state: null, version: 0 });
+    // Bumped when we are sent to another worker's socket, to listen on that one
+    const [socketGeneration, setSocketGeneration] = useState(0);
+
+    useEffect(() => onSocketChange(() => setSocketGeneration(n => n + 1)), []);
 
 
 
@@ -37,28 +44,65 @@ export default function RoomPage() {
 
     useEffect(() => {
         if (!roomCode || !playerName) return;
+        const socket = connectSocket(roomCode);
+
+        const setSnapshot = (state: GameState, version: number) => {
+            syncRef.current = { state, version };
+            setGameState(state);
+        };
+
+        // Apply a room broadcast: either a full state or patches since our version
+        const applyUpdate = (data: StateUpdate) => {
+            if (data.game_state) {
+                setSnapshot(data.game_state, data.version);
+                return;
+            }
+            const current = syncRef.current;
+            if (!current.state || !data.patch) return;  // our snapshot is still on its way
+            const next = applyPatch(current.state, current.version, data.patch);
+            if (!next) {
+                socket.emit('sync_state', { room_code: roomCode });
+                return;
+            }
+            setSnapshot(next.state, next.version);
+        };
+
         const storedGameState = sessionStorage.getItem('gameState');
         const storedPlayerData = sessionStorage.getItem('playerData');
         const hasStoredState = storedGameState && storedPlayerData;
         if (hasStoredState) {
-            setGameState(JSON.parse(storedGameState));
+            setSnapshot(JSON.parse(storedGameState), Number(sessionStorage.getItem('stateVersion') || 0));
             setPlayerData(JSON.parse(storedPlayerData));
             sessionStorage.removeItem('gameState');
+            sessionStorage.removeItem('stateVersion');
             sessionStorage.removeItem('playerData');
         }
-        const socket = connectSocket();
+        // The socket that created the room is already in it
+        const createdOnSocket = hasStoredState ? socket.id : undefined;
+        const joinRoom = () => {
+            console.log('Joining room:', roomCode, 'as', playerName);
+            socket.emit('join_room', {
+                room_code: roomCode,
+                player_name: playerName,
+            });
+        };
         const handleJoin = () => {
             console.log('Socket connected, checking join...');
             setIsConnected(true);
-            // Only join room if we don't have stored state (meaning we're joining, not creating)
-            if (playerName && !hasStoredState) {
-                console.log('Joining room:', roomCode, 'as', playerName);
-                socket.emit('join_room', {
-                    room_code: roomCode,
-                    player_name: playerName,
-                });
-            } else if (hasStoredState) {
+            if (createdOnSocket && socket.id === createdOnSocket) {
                 console.log('Room created - using stored state, not joining');
+                return;
+            }
+            // After a reconnect or reload, take our seat back and catch up
+            const session = getSession(roomCode);
+            if (session) {
+                const current = syncRef.current;
+                socket.emit('resume_session', {
+                    session_token: session.session_token,
+                    version: current.state ? current.version : null,
+                });
+            } else if (playerName) {
+                joinRoom();
             }
         };
 
@@ -75,54 +119,62 @@ export default function RoomPage() {
 
         // Room events
         socket.on('room_created', (data) => {
-            setGameState(data.game_state);
+            setSnapshot(data.game_state, data.version);
             setPlayerData(data.player_data);
         });
 
         socket.on('room_joined', (data) => {
-            setGameState(data.game_state);
+            saveSession({
+                room_code: data.room_code,
+                player_id: data.player_id,
+                session_token: data.session_token,
+            });
+            setSnapshot(data.game_state, data.version);
             setPlayerData(data.player_data);
         });
 
-        socket.on('player_joined', (data) => {
-            setGameState(data.game_state);
+        socket.on('session_resumed', (data) => {
+            applyUpdate(data);
+            setPlayerData(data.player_data);
         });
 
-        socket.on('player_left', (data) => {
-            setGameState(data.game_state);
+        socket.on('session_expired', () => {
+            // Our seat was given up; join again if the room is still in the lobby
+            clearSession();
+            joinRoom();
         });
 
-        socket.on('settings_updated', (data) => {
-            setGameState(data.game_state);
+        socket.on('state_sync', (data) => {
+            setSnapshot(data.game_state, data.version);
         });
 
+        socket.on('player_joined', applyUpdate);
+
+        socket.on('player_left', applyUpdate);
+
+        socket.on('settings_updated', applyUpdate);
+
         // Game events
-        socket.on('game_started', (data) => {
-            setGameState(data.game_state);
-        });
+        socket.on('game_started', applyUpdate);
 
         socket.on('role_assigned', (data) => {
             setPlayerData(data.player_data);
         });
 
-        socket.on('clue_submitted', (data) => {
-            setGameState(data.game_state);
-        });
+        socket.on('clue_submitted', applyUpdate);
 
-        socket.on('vote_submitted', (data) => {
-            setGameState(data.game_state);
-        });
+        socket.on('vote_submitted', applyUpdate);
 
         socket.on('game_ended', (data) => {
             console.log('Game ended event received:', data);
-            setGameState(data.game_state);
+            applyUpdate(data);
             if (data.all_players) {
                 setAllPlayers(data.all_players);
             }
         });
 
         socket.on('game_reset', (data) => {
-            setGameState(data.game_state);
+            applyUpdate(data);
             // Reset player data
             setPlayerData({
                 role: 'civilian',
@@ -131,6 +183,11 @@ export default function RoomPage() {
             });
         });
 
+        socket.on('room_closed', () => {
+            setError('Room closed after being inactive');
+            setTimeout(() => router.push('/'), 2000);
+        });
+
         socket.on('error', (data) => {
             setError(data.message);
             // If room not found, redirect to home
@@ -143,7 +200,7 @@ export default function RoomPage() {
             // Remove all event listeners but keep socket connected
             removeAllSocketListeners();
         };
-    }, [roomCode, playerName, router]);
+    }, [roomCode, playerName, router, socketGeneration]);
 
     if (!isConnected) {
         return (
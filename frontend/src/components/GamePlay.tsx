@@ -1,7 +1,7 @@
 'use client';
 
 import { useState } from 'react';
-import { getSocket } from '@/lib/socket';
+import { getPlayerId, getSocket } from '@/lib/socket';
 import type { GameState, PlayerData } from '@/types/game';
 import { Circle, Triangle, Square, Users, MessageCircle, FileText, Clock } from 'lucide-react';
 
@@ -14,9 +14,10 @@ interface GamePlayProps {
 export default function GamePlay({ gameState, playerData, roomCode }: GamePlayProps) {
     const [clue, setClue] = useState('');
     const socket = getSocket();
+    const playerId = getPlayerId();
 
-    const currentPlayer = gameState.players.find(p => p.id === socket.id);
-    const isMyTurn = gameState.current_turn === socket.id;
+    const currentPlayer = gameState.players.find(p => p.id === playerId);
+    const isMyTurn = gameState.current_turn === playerId;
     const currentTurnPlayer = gameState.players.find(p => p.id === gameState.current_turn);
 
     const handleSubmitClue = () => {
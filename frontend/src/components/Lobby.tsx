@@ -1,7 +1,7 @@
 'use client';
 
 import { useState } from 'react';
-import { getSocket } from '@/lib/socket';
+import { getPlayerId, getSocket } from '@/lib/socket';
 import { getPlayerAvatar } from '@/lib/avatars';
 import type { GameState, PlayerData } from '@/types/game';
 import {
@@ -22,8 +22,9 @@ interface LobbyProps {
 export default function Lobby({ gameState, roomCode }: LobbyProps) {
     const [copied, setCopied] = useState(false);
     const socket = getSocket();
+    const playerId = getPlayerId();
 
-    const currentPlayer = gameState.players.find(p => p.id === socket.id);
+    const currentPlayer = gameState.players.find(p => p.id === playerId);
     const isHost = currentPlayer?.is_host || false;
     const canStart = gameState.player_count >= 4;
 
@@ -215,6 +216,19 @@ export default function Lobby({ gameState, roomCode }: LobbyProps) {
                                     : `Max ${gameState.player_count - 2} undercovers`}
                             </p>
                         </div>
+                        <label style={{ display: 'flex', alignItems: 'center', gap: '0.5rem', fontSize: '0.75rem', fontWeight: 500, color: '#94a3b8', marginTop: '1rem', cursor: 'pointer' }}>
+                            <input
+                                type="checkbox"
+                                checked={gameState.early_vote_close}
+                                onChange={(e) => {
+                                    socket.emit('update_settings', {
+                                        room_code: roomCode,
+                                        early_vote_close: e.target.checked
+                                    });
+                                }}
+                            />
+                            End voting as soon as the result is decided
+                        </label>
                     </div>
                 )}
             </div>
@@ -1,7 +1,7 @@
 'use client';
 
 import { useState } from 'react';
-import { getSocket } from '@/lib/socket';
+import { getPlayerId, getSocket } from '@/lib/socket';
 import type { GameState, PlayerData } from '@/types/game';
 import { Target, Clock, Square, Send } from 'lucide-react';
 
@@ -15,8 +15,9 @@ export default function MrWhiteGuess({ gameState, playerData, roomCode }: MrWhit
     const [guess, setGuess] = useState('');
     const [hasGuessed, setHasGuessed] = useState(false);
     const socket = getSocket();
+    const playerId = getPlayerId();
 
-    const currentPlayer = gameState.players.find(p => p.id === socket.id);
+    const currentPlayer = gameState.players.find(p => p.id === playerId);
     const isMrWhite = playerData?.role === 'mrwhite';
 
     const handleSubmitGuess = () => {
@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
-import { getSocket } from '@/lib/socket';
+import { clearSession, getSocket } from '@/lib/socket';
 import { getPlayerAvatar } from '@/lib/avatars';
 import type { GameState } from '@/types/game';
 import { Trophy, Users, Circle, Triangle, Square, RotateCcw, DoorOpen } from 'lucide-react';
@@ -28,6 +28,7 @@ export default function Results({ gameState, roomCode, allPlayers = [] }: Result
 
     const handleLeave = () => {
         socket.emit('leave_room', { room_code: roomCode });
+        clearSession();
         router.push('/');
     };
 
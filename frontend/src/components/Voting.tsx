@@ -1,7 +1,7 @@
 'use client';
 
-import { useState } from 'react';
-import { getSocket } from '@/lib/socket';
+import { useEffect, useState } from 'react';
+import { getPlayerId, getSocket } from '@/lib/socket';
 import { getPlayerAvatar } from '@/lib/avatars';
 import type { GameState, PlayerData } from '@/types/game';
 import { Vote, CheckCircle2, Clock, FileText, Crown } from 'lucide-react';
@@ -16,9 +16,22 @@ export default function Voting({ gameState, playerData, roomCode }: VotingProps)
     const [selectedPlayer, setSelectedPlayer] = useState<string | null>(null);
     const [hasVoted, setHasVoted] = useState(false);
     const socket = getSocket();
+    const playerId = getPlayerId();
+
+    // Our vote went to a player who left; vote again
+    useEffect(() => {
+        const voteAgain = () => {
+            setHasVoted(false);
+            setSelectedPlayer(null);
+        };
+        socket.on('vote_cleared', voteAgain);
+        return () => {
+            socket.off('vote_cleared', voteAgain);
+        };
+    }, [socket]);
 
     const alivePlayers = gameState.players.filter(p => p.is_alive);
-    const currentPlayer = gameState.players.find(p => p.id === socket.id);
+    const currentPlayer = gameState.players.find(p => p.id === playerId);
 
     const handleVote = () => {
         if (!selectedPlayer) {
@@ -52,7 +65,7 @@ export default function Voting({ gameState, playerData, roomCode }: VotingProps)
                         <h3 className="font-semibold mb-4" style={{ color: '#cbd5e1' }}>Select a player to eliminate:</h3>
                         <div className="grid grid-cols-1 md:grid-cols-2 gap-3">
                             {alivePlayers
-                                .filter(p => p.id !== socket.id) // Can't vote for yourself
+                                .filter(p => p.id !== playerId) // Can't vote for yourself
                                 .map((player) => (
                                     <button
                                         key={player.id}
@@ -7,21 +7,65 @@ import { io, Socket } from 'socket.io-client';
 const SOCKET_URL = process.env.NEXT_PUBLIC_SOCKET_URL || 'http://localhost:5000';
 
 let socket: Socket | null = null;
+// The room the socket was connected for; only that room's worker is known to be right
+let socketRoom: string | undefined;
+const changeListeners = new Set<(socket: Socket) => void>();
+
+const createSocket = (url: string): Socket => {
+    const created = io(url, {
+        autoConnect: false,
+        reconnection: true,
+        reconnectionDelay: 1000,
+        reconnectionAttempts: 5,
+    });
+
+    // With several backend workers, one that does not own our room
+    // refuses the connection and names the worker that does
+    created.on('connect_error', (err: Error & { data?: { url?: string } }) => {
+        const url = err.data?.url;
+        if (url && created === socket) {
+            created.disconnect();
+            socket = createSocket(url);
+            socket.auth = created.auth;
+            changeListeners.forEach(listener => listener(socket!));
+            socket.connect();
+        }
+    });
+    // A room is created on the worker that owns it
+    created.onAny((event: string, data?: { room_code?: string }) => {
+        if (event === 'room_created' && data?.room_code) {
+            socketRoom = data.room_code;
+        }
+    });
+    return created;
+};
 
 export const getSocket = (): Socket => {
     if (!socket) {
-        socket = io(SOCKET_URL, {
-            autoConnect: false,
-            reconnection: true,
-            reconnectionDelay: 1000,
-            reconnectionAttempts: 5,
-        });
+        socket = createSocket(SOCKET_URL);
     }
     return socket;
 };
 
-export const connectSocket = () => {
+// Called with the new socket when we are sent to another worker; returns an unsubscribe
+export const onSocketChange = (listener: (socket: Socket) => void) => {
+    changeListeners.add(listener);
+    return () => {
+        changeListeners.delete(listener);
+    };
+};
+
+// Naming the room lets the backend route us to the worker that owns it
+export const connectSocket = (roomCode?: string) => {
     const socket = getSocket();
+    if (roomCode && roomCode !== socketRoom) {
+        socketRoom = roomCode;
+        socket.auth = { room_code: roomCode };
+        if (socket.active) {
+            // Connected for another room: connect again so the worker is checked
+            socket.disconnect();
+        }
+    }
     if (!socket.connected) {
         socket.connect();
     }
@@ -34,6 +78,34 @@ export const disconnectSocket = () => {
     }
 };
 
+// The seat held in a room, kept in sessionStorage so a new socket can resume it
+export interface Session {
+    room_code: string;
+    player_id: string;
+    session_token: string;
+}
+
+export const saveSession = (session: Session) => {
+    sessionStorage.setItem('session', JSON.stringify(session));
+};
+
+export const getSession = (roomCode: string): Session | null => {
+    const stored = sessionStorage.getItem('session');
+    if (!stored) return null;
+    const session: Session = JSON.parse(stored);
+    return session.room_code === roomCode ? session : null;
+};
+
+export const clearSession = () => {
+    sessionStorage.removeItem('session');
+};
+
+// Our player id stays the one we joined with, across reconnects
+export const getPlayerId = (): string | undefined => {
+    const stored = typeof window !== 'undefined' ? sessionStorage.getItem('session') : null;
+    return stored ? JSON.parse(stored).player_id : getSocket().id;
+};
+
 export const removeAllSocketListeners = () => {
     if (socket) {
         // Only remove our custom game listeners, not internal socket.io ones
@@ -42,12 +114,17 @@ export const removeAllSocketListeners = () => {
             'room_joined',
             'player_joined',
             'player_left',
+            'settings_updated',
             'game_started',
             'role_assigned',
             'clue_submitted',
             'vote_submitted',
             'game_ended',
             'game_reset',
+            'state_sync',
+            'session_resumed',
+            'session_expired',
+            'room_closed',
             'error',
             'connected'
         ];
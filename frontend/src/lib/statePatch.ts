@@ -0,0 +1,53 @@
+/**
+ * Apply versioned state patches sent by the server (see backend/state_patch.py)
+ */
+
+import type { GameState, PatchEntry, PatchOp, Player } from '@/types/game';
+
+const applyOps = (state: GameState, ops: PatchOp[]): GameState => {
+    const next: GameState = { ...state, players: [...state.players], clues: [...state.clues] };
+
+    for (const op of ops) {
+        switch (op[0]) {
+            case 'set':
+                (next as any)[op[1]] = op[2];
+                break;
+            case 'clue':
+                next.clues.push(op[1]);
+                break;
+            case 'player': {
+                const [, playerId, data] = op;
+                const index = next.players.findIndex(p => p.id === playerId);
+                if (index >= 0) {
+                    next.players[index] = { ...next.players[index], ...data };
+                } else {
+                    next.players.push(data as Player);
+                }
+                break;
+            }
+            case 'remove_player':
+                next.players = next.players.filter(p => p.id !== op[1]);
+                break;
+        }
+    }
+
+    return next;
+};
+
+/**
+ * Apply the entries newer than `version`.
+ * Returns null when an entry is missing and a full resync is needed.
+ */
+export const applyPatch = (
+    state: GameState,
+    version: number,
+    patch: PatchEntry[]
+): { state: GameState; version: number } | null => {
+    for (const [entryVersion, ops] of patch) {
+        if (entryVersion <= version) continue;
+        if (entryVersion !== version + 1) return null;
+        state = applyOps(state, ops);
+        version = entryVersion;
+    }
+    return { state, version };
+};
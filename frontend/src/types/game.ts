@@ -27,6 +27,8 @@ export interface GameState {
     phase: GamePhase;
     player_count: number;
     undercover_count: number;
+    early_vote_close: boolean;
+    word_categories: string[];
     players: Player[];
     current_turn: string | null;
     round_number: number;
@@ -34,12 +36,36 @@ export interface GameState {
     winner: 'civilians' | 'undercovers' | 'mrwhite' | null;
 }
 
+export type PatchOp =
+    | ['set', string, any]
+    | ['clue', Clue]
+    | ['player', string, Partial<Player>]
+    | ['remove_player', string];
+
+// [version, ops]
+export type PatchEntry = [number, PatchOp[]];
+
+// Room broadcasts carry a patch; joins and resyncs carry the full state
+export interface StateUpdate {
+    version: number;
+    game_state?: GameState;
+    patch?: PatchEntry[];
+}
+
 export interface PlayerData {
     role: Role;
     word: string | null;
     is_alive: boolean;
 }
 
+// Sent with a seat: what a client needs to resume it after a reconnect
+export interface SessionData {
+    room_code: string;
+    player_id: string;
+    session_token: string;
+    player_data: PlayerData;
+}
+
 // Socket event types
 export interface SocketEvents {
     // Client -> Server
@@ -51,24 +77,30 @@ export interface SocketEvents {
     submit_vote: (data: { room_code: string; voted_for_id: string }) => void;
     mr_white_guess: (data: { room_code: string; guess: string }) => void;
     play_again: (data: { room_code: string }) => void;
+    sync_state: (data: { room_code: string }) => void;
+    resume_session: (data: { session_token: string; version: number | null }) => void;
 
     // Server -> Client
     connected: (data: { message: string }) => void;
-    room_created: (data: { room_code: string; game_state: GameState; player_data: PlayerData }) => void;
-    room_joined: (data: { room_code: string; game_state: GameState; player_data: PlayerData }) => void;
-    player_joined: (data: { game_state: GameState }) => void;
-    player_left: (data: { player_id: string; game_state: GameState }) => void;
-    game_started: (data: { game_state: GameState }) => void;
+    room_created: (data: SessionData & { game_state: GameState; version: number }) => void;
+    room_joined: (data: SessionData & { game_state: GameState; version: number }) => void;
+    session_resumed: (data: SessionData & StateUpdate) => void;
+    session_expired: (data: { message: string }) => void;
+    player_joined: (data: StateUpdate) => void;
+    player_left: (data: StateUpdate & { player_id: string }) => void;
+    settings_updated: (data: StateUpdate) => void;
+    game_started: (data: StateUpdate) => void;
     role_assigned: (data: { player_data: PlayerData }) => void;
-    clue_submitted: (data: { game_state: GameState }) => void;
-    vote_submitted: (data: { game_state: GameState; eliminated_player_id: string | null }) => void;
-    game_ended: (data: {
-        game_state: GameState;
+    clue_submitted: (data: StateUpdate) => void;
+    vote_submitted: (data: StateUpdate & { eliminated_player_id: string | null }) => void;
+    game_ended: (data: StateUpdate & {
         all_players: Player[];
         civilian_word: string;
         undercover_word: string;
         mr_white_guess?: string;
     }) => void;
-    game_reset: (data: { game_state: GameState }) => void;
+    game_reset: (data: StateUpdate) => void;
+    state_sync: (data: { game_state: GameState; version: number }) => void;
+    room_closed: (data: { reason: 'idle' }) => void;
     error: (data: { message: string }) => void;
 }